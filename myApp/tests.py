@@ -1,3 +1,56 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from turnos.models import Cita, PerfilDocente
+from user.models import Rol, User
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PanelAdminTests(TestCase):
+    """Panel de administración: dashboard y agenda global."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", email="admin@colegio.test", password="x",
+                                              rol=Rol.objects.create(nombre="Administrador"))
+        self.client.force_login(self.admin)
+
+    def test_metricas_desde_la_instantanea(self):
+        self.assertEqual(self.client.get(reverse("dashboard_admin")).status_code, 200)
+        with CaptureQueriesContext(connection) as consultas:
+            r = self.client.get(reverse("dashboard_admin"))
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("total_hoy", r.context)
+        self.assertFalse([q for q in consultas if "COUNT(" in q["sql"]])
+
+    def test_agenda_global_por_cursor(self):
+        docente = PerfilDocente.objects.create(
+            usuario=User.objects.create(username="docente", email="docente@colegio.test"), minutos_por_bloque=20)
+        rep = User.objects.create(username="rep", email="rep@colegio.test")
+        base = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=2), time(7, 0)))
+        with self.captureOnCommitCallbacks(execute=True):
+            propias = [Cita.objects.create(docente=docente, representante=rep, curso_estudiante="1A",
+                                           nombre_estudiante="Est", motivo="m", inicio=base + timedelta(minutes=20 * i),
+                                           fin=base + timedelta(minutes=20 * i + 20)).pk for i in range(30)]
+
+        vistas, url, paginas = [], reverse("agenda_global_admin"), 0
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            citas = r.context["citas"]
+            self.assertEqual(citas.total_aproximado, 30)  # desde EstadisticaDiaria, sin COUNT(*) sobre Cita
+            self.assertFalse([q for q in consultas if "COUNT(" in q["sql"] and 'FROM "turnos_cita"' in q["sql"]])
+            vistas += [c.pk for c in citas]
+            paginas += 1
+            url = citas.url_siguiente and reverse("agenda_global_admin") + citas.url_siguiente
+        self.assertEqual(paginas, 2)
+        self.assertEqual(vistas, propias)
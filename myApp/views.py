@@ -1,7 +1,7 @@
 from django.shortcuts import render,redirect, get_object_or_404
+from django.http import HttpResponseBadRequest
 from django.utils import timezone
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
 from django.shortcuts import render
 from user.decorators import requiere_rol
 from turnos.models import PerfilDocente, PerfilRepresentante, Cita, EstadoCita, ExcepcionDisponibilidad, TipoExcepcion
@@ -14,9 +14,11 @@ from turnos.models import (
     PerfilDocente, PerfilRepresentante, Cita, EstadoCita, ExcepcionDisponibilidad, TipoExcepcion, Cita, EstadoCita
 )
 from turnos.forms import FiltroCitasForm
+from turnos.estadisticas import estadisticas
+from turnos.metricas import metricas_dashboard
+from turnos.paginacion import paginar
 
-import csv
-from django.http import HttpResponse
+from turnos.exportacion import TAM_BLOQUE, hora_local, nombre_completo, respuesta_csv
 from turnos.forms import FiltroCitasForm
 
 
@@ -29,22 +31,12 @@ def registro(request):
 
 @requiere_rol("Administrador")
 def dashboard_admin(request):
-    print("INICIE AL USUARIO ADMINISTRADOR.")
     tz = timezone.get_current_timezone()
     hoy = timezone.localdate()
     ahora = timezone.localtime(timezone.now(), tz)
 
-    # Métricas superiores (igual que antes)
-    docentes_activos = PerfilDocente.objects.filter(activo=True).count()
-    reps = PerfilRepresentante.objects.count()
-
-    citas_hoy_qs = Cita.objects.filter(inicio__date=hoy)
-    total_hoy = citas_hoy_qs.count()
-    pend_hoy = citas_hoy_qs.filter(estado=EstadoCita.PENDIENTE).count()
-    conf_hoy = citas_hoy_qs.filter(estado=EstadoCita.CONFIRMADA).count()
-    canc_hoy = citas_hoy_qs.filter(estado=EstadoCita.CANCELADA).count()
-
-    bloqueos_hoy = ExcepcionDisponibilidad.objects.filter(fecha=hoy, tipo=TipoExcepcion.BLOQUEO).count()
+    # Métricas superiores: instantánea en caché (ver turnos/metricas.py)
+    metricas = metricas_dashboard()
 
     # Filtros (GET)
     form = FiltroCitasForm(request.GET or None)
@@ -56,12 +48,12 @@ def dashboard_admin(request):
         estado = form.cleaned_data.get("estado")
 
         if fecha:
-            citas = citas.filter(inicio__date=fecha)
+            citas = citas.en_fecha(fecha)
         else:
             # Por defecto, muestra próximas 7 días
             desde = hoy
             hasta = hoy + timezone.timedelta(days=7)
-            citas = citas.filter(inicio__date__range=(desde, hasta))
+            citas = citas.entre(desde, hasta)
 
         if docente:
             citas = citas.filter(docente=docente)
@@ -72,22 +64,16 @@ def dashboard_admin(request):
         # fallback si form inválido: próximas 7 días
         desde = hoy
         hasta = hoy + timezone.timedelta(days=7)
-        citas = citas.filter(inicio__date__range=(desde, hasta))
+        citas = citas.entre(desde, hasta)
 
     # Próximas 5 (para el widget)
     proximas = Cita.objects.filter(
         estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA],
         inicio__gte=ahora
-    ).order_by("inicio")[:5]
+    ).select_related("docente__usuario").order_by("inicio")[:5]
 
     context = {
-        "docentes_activos": docentes_activos,
-        "reps": reps,
-        "total_hoy": total_hoy,
-        "pend_hoy": pend_hoy,
-        "conf_hoy": conf_hoy,
-        "canc_hoy": canc_hoy,
-        "bloqueos_hoy": bloqueos_hoy,
+        **metricas,
         "proximas": proximas,
         "hoy": hoy,
         "form": form,
@@ -134,47 +120,45 @@ def cancelar_cita_admin(request, pk):
     
 @requiere_rol("Administrador")
 def exportar_citas_csv(request):
-    # Reusar los filtros del dashboard
+    # Reusar los filtros del dashboard; desde/hasta amplían la ventana por defecto (7 días).
+    # Si los filtros no validan se responde 400 en lugar de exportar otro rango.
     hoy = timezone.localdate()
-    form = FiltroCitasForm(request.GET or None)
-    citas = Cita.objects.select_related("docente__usuario","representante").order_by("inicio")
-
-    if form.is_valid():
-        fecha = form.cleaned_data.get("fecha")
-        docente = form.cleaned_data.get("docente")
-        estado = form.cleaned_data.get("estado")
-        if fecha:
-            citas = citas.filter(inicio__date=fecha)
-        else:
-            desde, hasta = hoy, hoy + timezone.timedelta(days=7)
-            citas = citas.filter(inicio__date__range=(desde, hasta))
-        if docente:
-            citas = citas.filter(docente=docente)
-        if estado:
-            citas = citas.filter(estado=estado)
-    else:
-        desde, hasta = hoy, hoy + timezone.timedelta(days=7)
-        citas = citas.filter(inicio__date__range=(desde, hasta))
-
-    # Armar CSV
-    tz = timezone.get_current_timezone()
-    filename = f"citas_{timezone.now().strftime('%Y%m%d_%H%M')}.csv"
-    resp = HttpResponse(content_type="text/csv; charset=utf-8")
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-    writer = csv.writer(resp)
-    writer.writerow([
-        "inicio", "fin", "estado", "docente", "representante_email",
-        "estudiante_nombre", "curso", "motivo"
-    ])
-    for c in citas:
-        ini = timezone.localtime(c.inicio, tz).strftime("%Y-%m-%d %H:%M")
-        fin = timezone.localtime(c.fin, tz).strftime("%Y-%m-%d %H:%M")
-        docente_nombre = (c.docente.usuario.get_full_name() or c.docente.usuario.username)
-        writer.writerow([
-            ini, fin, c.estado, docente_nombre, c.representante.email,
-            c.nombre_estudiante, c.curso_estudiante, (c.motivo or "")[:150]
-        ])
-    return resp
+    form = FiltroCitasForm(request.GET)
+    if not form.is_valid():
+        # Un rango inválido no cae en la ventana por defecto: se informa el error
+        errores = " ".join(e for lista in form.errors.values() for e in lista)
+        return HttpResponseBadRequest(errores, content_type="text/plain; charset=utf-8")
+
+    citas = Cita.objects.order_by("inicio", "pk")
+    desde, hasta = hoy, hoy + timezone.timedelta(days=7)
+    fecha = form.cleaned_data.get("fecha")
+    docente = form.cleaned_data.get("docente")
+    estado = form.cleaned_data.get("estado")
+    if fecha:
+        desde = hasta = fecha
+    elif form.cleaned_data.get("desde") or form.cleaned_data.get("hasta"):
+        desde = form.cleaned_data.get("desde") or hoy
+        hasta = form.cleaned_data.get("hasta") or desde + timezone.timedelta(days=7)
+    if docente:
+        citas = citas.filter(docente=docente)
+    if estado:
+        citas = citas.filter(estado=estado)
+    citas = citas.entre(desde, hasta)
+
+    filas = (
+        (hora_local(ini), hora_local(fin), estado, nombre_completo(nom, ape, usuario), email,
+         estudiante, curso, (motivo or "")[:150])
+        for ini, fin, estado, nom, ape, usuario, email, estudiante, curso, motivo in citas.values_list(
+            "inicio", "fin", "estado", "docente__usuario__first_name", "docente__usuario__last_name",
+            "docente__usuario__username", "representante__email", "nombre_estudiante", "curso_estudiante",
+            "motivo",
+        ).iterator(chunk_size=TAM_BLOQUE)
+    )
+    return respuesta_csv(
+        ["inicio", "fin", "estado", "docente", "representante_email", "estudiante_nombre", "curso", "motivo"],
+        filas,
+        f"citas_{desde}_a_{hasta}.csv",
+    )
 
 @requiere_rol("Administrador")
 def cita_detalle_admin(request, pk):
@@ -188,18 +172,19 @@ def cita_detalle_admin(request, pk):
 def agenda_global_admin(request):
     hoy = timezone.localdate()
     form = FiltroCitasForm(request.GET or None)
-    qs = Cita.objects.select_related("docente__usuario","representante").order_by("inicio")
+    qs = Cita.objects.select_related("docente__usuario","representante")
+    desde, hasta, docente, estado = hoy, hoy+timezone.timedelta(days=7), None, ""
 
     if form.is_valid():
         fecha = form.cleaned_data.get("fecha")
         docente = form.cleaned_data.get("docente")
-        estado = form.cleaned_data.get("estado")
-        qs = qs.filter(inicio__date=fecha) if fecha else qs.filter(inicio__date__range=(hoy, hoy+timezone.timedelta(days=7)))
+        estado = form.cleaned_data.get("estado") or ""
+        if fecha: desde = hasta = fecha
         if docente: qs = qs.filter(docente=docente)
         if estado: qs = qs.filter(estado=estado)
-    else:
-        qs = qs.filter(inicio__date__range=(hoy, hoy+timezone.timedelta(days=7)))
+    qs = qs.entre(desde, hasta)
 
-    paginator = Paginator(qs, 25)
-    citas = paginator.get_page(request.GET.get("page"))
+    # Por cursor sobre (inicio, id): sin COUNT(*) ni OFFSET; el total sale de EstadisticaDiaria
+    citas = paginar(request, qs, total=lambda: estadisticas(desde, hasta, estado, docente=docente)
+                    .aggregate(n=Sum("citas"))["n"])
     return render(request, "agenda_global.html", {"form": form, "citas": citas})
\ No newline at end of file
@@ -86,6 +86,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # segundos que SQLite espera un bloqueo antes de "database is locked"
+        'OPTIONS': {'timeout': 20},
+        # Base de pruebas en archivo: las pruebas de concurrencia abren una conexión por hilo
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -135,6 +139,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 AUTH_USER_MODEL = "user.User"
 
+# Carga el rol y los perfiles junto con el usuario de la sesión (user/backends.py)
+AUTHENTICATION_BACKENDS = ["user.backends.UsuarioConPerfilesBackend"]
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -145,3 +152,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "CalendarSchool admin@uejuanxxiii.edu.ec"
 
+
+# Slots libres materializados (turnos.SlotLibre): días del horizonte móvil.
+# Reconstruir a diario con `manage.py reconstruir_slots`.
+TURNOS_HORIZONTE_SLOTS_DIAS = 60
+# Variante NumPy de turnos.intervalos.slots_lote: apagada, el bucle en Python
+# fue más rápido en `manage.py bench_intervalos`. Medir antes de activarla.
+TURNOS_INTERVALOS_NUMPY = False
+
+# Caché compartida entre procesos (la usa turnos.cache_slots para los slots
+# por docente/fecha). Alternativa: DatabaseCache + `manage.py createcachetable`.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    }
+}
+TURNOS_CACHE_SLOTS_SEGUNDOS = 600
+# Instantánea de métricas del dashboard admin (se invalida al cambiar una Cita)
+TURNOS_CACHE_METRICAS_SEGUNDOS = 60
+# Lista de administradores a notificar (se invalida al cambiar un User o un Rol)
+TURNOS_CACHE_ADMINS_SEGUNDOS = 3600
+# Recordatorio por correo a las citas que empiezan dentro de estas horas (enviar_recordatorios)
+TURNOS_RECORDATORIO_HORAS = 24
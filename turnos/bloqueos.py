@@ -0,0 +1,175 @@
+# turnos/bloqueos.py
+"""
+Bloqueo masivo por conjuntos (modo "excepciones" de bloqueo_masivo).
+
+Todo se resuelve con un número fijo de consultas, sin importar cuántos
+docentes × días cubra el bloqueo:
+  - una lectura de los BLOQUEO existentes de la ventana y el diff en memoria,
+  - un bulk_create y (si se reemplaza) un borrado masivo,
+  - una UPDATE por lote de ids para cancelar las citas afectadas (solo las
+    que se listaron en la vista previa, no las que aparezcan después).
+Como bulk_create/update no disparan señales (y el borrado masivo se hace con
+las señales suspendidas), al confirmar se recalcula SlotLibre y se invalida
+la caché de slots una sola vez para todos los (docente, fecha) tocados.
+"""
+from datetime import datetime, time, timedelta
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Cita, EstadoCita, ExcepcionDisponibilidad, PerfilDocente, TipoExcepcion
+from .services import fechas_entre, recalcular_slots_libres
+from .cache_slots import invalidar_docentes
+from .emailing import encolar_notificaciones
+from .estadisticas import recalcular_estadisticas
+from .metricas import invalidar_metricas
+from .signals import sin_recalculo
+
+# Sin horas => día completo (mismo rango que usaba el bloqueo por excepciones)
+HORA_INICIO_DIA = time(0, 0)
+HORA_FIN_DIA = time(23, 59)
+ESTADOS_ACTIVOS = [EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA]
+# ids por UPDATE (límite de parámetros de SQLite)
+LOTE_IDS = 500
+
+
+def docentes_destino(departamento: str = ""):
+    docentes = PerfilDocente.objects.filter(activo=True)
+    if departamento:
+        docentes = docentes.filter(departamento__iexact=departamento)
+    return docentes
+
+
+def citas_afectadas(docente_ids, fi, ff, hi=None, hf=None):
+    """Citas PENDIENTE/CONFIRMADA de los docentes que se cruzan con el bloqueo."""
+    tz = timezone.get_current_timezone()
+    qs = Cita.objects.filter(docente_id__in=docente_ids, estado__in=ESTADOS_ACTIVOS)
+    if not (hi and hf):
+        desde = timezone.make_aware(datetime.combine(fi, time.min), tz)
+        hasta = timezone.make_aware(datetime.combine(ff + timedelta(days=1), time.min), tz)
+        return qs.filter(inicio__lt=hasta, fin__gt=desde)
+    rangos = Q()
+    for f in list(fechas_entre(fi, ff)):
+        rangos |= Q(inicio__lt=timezone.make_aware(datetime.combine(f, hf), tz),
+                    fin__gt=timezone.make_aware(datetime.combine(f, hi), tz))
+    return qs.filter(rangos)
+
+
+def plan_excepciones(docente_ids, fi, ff, hi=None, hf=None, reemplazar=False) -> Dict:
+    """
+    Diff contra los BLOQUEO existentes de la ventana (una consulta).
+    Devuelve {"crear": [(docente_id, fecha)], "borrar": n, "existentes": n}.
+    Sin reemplazar solo se omiten los bloqueos idénticos (mismas horas).
+    """
+    h_ini, h_fin = hi or HORA_INICIO_DIA, hf or HORA_FIN_DIA
+    existentes = list(
+        ExcepcionDisponibilidad.objects.filter(
+            docente_id__in=docente_ids, fecha__range=(fi, ff), tipo=TipoExcepcion.BLOQUEO
+        ).values_list("docente_id", "fecha", "hora_inicio", "hora_fin")
+    )
+    if reemplazar:
+        iguales = set()
+    else:
+        iguales = {(d, f) for d, f, i, e in existentes if i == h_ini and e == h_fin}
+    dias = list(fechas_entre(fi, ff))
+    crear = [(d, f) for d in docente_ids for f in dias if (d, f) not in iguales]
+    return {"crear": crear, "borrar": len(existentes) if reemplazar else 0, "existentes": len(existentes)}
+
+
+def refrescar_slots(docente_ids, fechas) -> None:
+    """Recalcula SlotLibre e invalida la caché de los docentes tocados."""
+    docente_ids, fechas = list(docente_ids), sorted(set(fechas))
+    if not docente_ids or not fechas:
+        return
+    docentes = list(PerfilDocente.objects.filter(pk__in=docente_ids))
+    try:
+        for i in range(0, len(docentes), 50):
+            recalcular_slots_libres(docentes[i:i + 50], fechas)
+    finally:
+        invalidar_docentes(docente_ids)
+
+
+def aplicar_excepciones(docente_ids, fi, ff, hi=None, hf=None, nombre="", reemplazar=False) -> Dict:
+    """
+    Crea un BLOQUEO por docente y día del rango: un bulk_create y, si se
+    reemplaza, un borrado masivo. Devuelve {"creadas": n, "borradas": n}.
+    """
+    docente_ids = list(docente_ids)
+    h_ini, h_fin = hi or HORA_INICIO_DIA, hf or HORA_FIN_DIA
+    with transaction.atomic(), sin_recalculo():
+        plan = plan_excepciones(docente_ids, fi, ff, hi, hf, reemplazar)
+        borradas = 0
+        if reemplazar:
+            borradas, _ = ExcepcionDisponibilidad.objects.filter(
+                docente_id__in=docente_ids, fecha__range=(fi, ff), tipo=TipoExcepcion.BLOQUEO
+            ).delete()
+        ExcepcionDisponibilidad.objects.bulk_create(
+            [
+                ExcepcionDisponibilidad(docente_id=d, fecha=f, hora_inicio=h_ini, hora_fin=h_fin,
+                                        tipo=TipoExcepcion.BLOQUEO, motivo=nombre[:200])
+                for d, f in plan["crear"]
+            ],
+            batch_size=1000,
+        )
+        transaction.on_commit(lambda: refrescar_slots(docente_ids, list(fechas_entre(fi, ff))), robust=True)
+    return {"creadas": len(plan["crear"]), "borradas": borradas}
+
+
+def ids_citas(texto: str) -> List[int]:
+    """Ids "1,2,3" de la vista previa (lo que no es número se ignora)."""
+    return [int(x) for x in (texto or "").split(",") if x.strip().isdigit()]
+
+
+def cancelar_citas_afectadas(citas, usuario, motivo: str = "", ids=None) -> int:
+    """
+    Cancela las citas del queryset que además estén en 'ids' (las que se
+    mostraron en la vista previa; None = todas las del queryset). La UPDATE
+    va sobre esos ids, no sobre el filtro: una cita creada después de leer
+    no se cancela sin haberse listado. Encola los avisos en la misma
+    transacción y, al confirmar, refresca los slots.
+    """
+    motivo = (motivo or "")[:255]
+    vistas = None if ids is None else set(ids)
+    with transaction.atomic():
+        lista = [c for c in citas.select_related("docente__usuario", "representante")
+                 if vistas is None or c.pk in vistas]
+        if not lista:
+            return 0
+        pks = [c.pk for c in lista]
+        for i in range(0, len(pks), LOTE_IDS):
+            Cita.objects.filter(pk__in=pks[i:i + LOTE_IDS], estado__in=ESTADOS_ACTIVOS).update(
+                estado=EstadoCita.CANCELADA, cancelada_por=usuario, motivo_cancelacion=motivo
+            )
+        _notificar_cancelaciones(lista, motivo)
+
+        tz = timezone.get_current_timezone()
+        docente_ids = {c.docente_id for c in lista}
+        fechas = {timezone.localtime(c.inicio, tz).date() for c in lista}
+
+        def _despues():
+            recalcular_estadisticas((c.docente_id, timezone.localtime(c.inicio, tz).date()) for c in lista)
+            invalidar_metricas()
+            refrescar_slots(docente_ids, fechas)
+        transaction.on_commit(_despues, robust=True)
+    return len(lista)
+
+
+def _notificar_cancelaciones(citas, motivo: str) -> None:
+    encolar_notificaciones([
+        (
+            f"cita:{c.pk}:cancelada",
+            "Cita cancelada por bloqueo institucional",
+            "emails/cita_cancelada.html",
+            {
+                "docente": c.docente.usuario.get_full_name() or c.docente.usuario.username,
+                "representante": c.representante.get_full_name() or c.representante.username,
+                "inicio": c.inicio,
+                "motivo_cancelacion": motivo,
+                "nombre_receptor": "Usuario",
+            },
+            [c.representante.email, c.docente.usuario.email],
+        )
+        for c in citas
+    ], copia_admins=True)
@@ -0,0 +1,121 @@
+# turnos/cache_slots.py
+"""
+Caché de slots por (docente, fecha, versión) sobre el framework de caché de Django.
+
+Cada docente tiene un token de versión en la caché; cualquier escritura que
+afecte sus slots (Cita, DisponibilidadSemanal, ExcepcionDisponibilidad,
+PerfilDocente) lo reemplaza (ver turnos/signals.py), y las entradas viejas
+dejan de leerse y expiran solas. Los feriados (FeriadoInstitucional) usan
+un token común que forma parte de la versión de todos los docentes. El token es aleatorio, no un contador: si se
+pierde (expulsión, reinicio) no puede volver a coincidir con entradas viejas.
+
+Requiere un backend compartido entre procesos (archivo o base de datos) para
+que la invalidación alcance a todos los workers; ver CACHES en settings.
+"""
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .services import obtener_slots_rango
+
+PREFIJO = "turnos:slots"
+CLAVE_ACIERTOS = f"{PREFIJO}:aciertos"
+CLAVE_FALLOS = f"{PREFIJO}:fallos"
+CLAVE_VERSION_FERIADOS = f"{PREFIJO}:version:feriados"
+
+
+def _timeout() -> int:
+    return getattr(settings, "TURNOS_CACHE_SLOTS_SEGUNDOS", 600)
+
+
+def _clave_version(docente_id) -> str:
+    return f"{PREFIJO}:version:{docente_id}"
+
+
+def _version(clave) -> str:
+    cache.add(clave, uuid.uuid4().hex, None)
+    return cache.get(clave)
+
+
+def version_docente(docente_id) -> str:
+    """Versión efectiva de las entradas del docente: la suya + la de feriados."""
+    claves = [_clave_version(docente_id), CLAVE_VERSION_FERIADOS]
+    valores = cache.get_many(claves)
+    return ".".join(valores.get(c) or _version(c) for c in claves)
+
+
+def invalidar_docente(docente_id) -> None:
+    """Nueva versión para el docente: sus entradas anteriores quedan huérfanas."""
+    cache.set(_clave_version(docente_id), uuid.uuid4().hex, None)
+
+
+def invalidar_docentes(docente_ids) -> None:
+    """invalidar_docente() para muchos docentes en una sola escritura."""
+    cache.set_many({_clave_version(pk): uuid.uuid4().hex for pk in docente_ids}, None)
+
+
+def invalidar_feriados() -> None:
+    """Un feriado afecta a muchos docentes: se renueva la versión común."""
+    cache.set(CLAVE_VERSION_FERIADOS, uuid.uuid4().hex, None)
+
+
+def _contar(clave, n):
+    if n <= 0:
+        return
+    if not cache.add(clave, n, None):
+        try:
+            cache.incr(clave, n)
+        except ValueError:  # expulsada entre add() e incr()
+            cache.set(clave, n, None)
+
+
+def estadisticas() -> Dict[str, int]:
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    return {"aciertos": valores.get(CLAVE_ACIERTOS, 0), "fallos": valores.get(CLAVE_FALLOS, 0)}
+
+
+def reiniciar_estadisticas() -> None:
+    cache.delete_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+
+
+def slots_rango_cacheados(docente, desde: date, hasta: date) -> Dict[date, List[datetime]]:
+    """
+    obtener_slots_rango() con caché por día. Lee todas las fechas con un solo
+    get_many y calcula las que falten en una sola llamada.
+    """
+    if hasta < desde:
+        return {}
+    version = version_docente(docente.pk)
+    claves = {}
+    f = desde
+    while f <= hasta:
+        claves[f] = f"{PREFIJO}:{docente.pk}:{f.isoformat()}:{version}"
+        f += timedelta(days=1)
+
+    encontrados = cache.get_many(list(claves.values()))
+    resultado = {f: encontrados[k] for f, k in claves.items() if k in encontrados}
+    faltantes = [f for f in claves if f not in resultado]
+    _contar(CLAVE_ACIERTOS, len(resultado))
+    _contar(CLAVE_FALLOS, len(faltantes))
+
+    if faltantes:
+        calculados = obtener_slots_rango(docente, faltantes[0], faltantes[-1])
+        nuevos = {f: calculados[f] for f in faltantes}
+        cache.set_many({claves[f]: v for f, v in nuevos.items()}, _timeout())
+        resultado.update(nuevos)
+
+    # La regla de 24h avanza con el reloj: se vuelve a aplicar al leer
+    min_inicio = timezone.now() + timedelta(hours=24)
+    return {f: [s for s in resultado[f] if s >= min_inicio] for f in claves}
+
+
+def slots_cacheados(docente, fecha) -> List[datetime]:
+    if not fecha:
+        return []
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+    return slots_rango_cacheados(docente, fecha, fecha)[fecha]
@@ -1,39 +1,195 @@
 # turnos/emailing.py
-from django.core.mail import send_mail
+"""
+Correo de notificaciones.
+
+Los servicios no envían: encolan en NotificacionPendiente dentro de su
+transacción (encolar_notificacion / encolar_notificaciones), así un
+servidor SMTP lento no retiene el bloqueo de escritura ni la respuesta
+HTTP, y si la transacción se revierte no sale ningún correo.
+`manage.py enviar_notificaciones` despacha la cola por lotes con una sola
+conexión SMTP (enviar_pendientes); los fallos se reintentan con espera
+exponencial hasta MAX_INTENTOS.
+
+Con copia_admins=True cada administrador recibe el aviso según su
+User.frecuencia_avisos: en el momento, o como EventoResumen que
+enviar_resumenes() agrupa en un solo correo por hora o por día. La lista
+de administradores se guarda en caché y las señales de User/Rol la borran.
+"""
+import uuid
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 from django.conf import settings
 from django.apps import apps
-from typing import List
-
-def enviar_notificacion(asunto: str, template: str, contexto: dict, destinatarios: List[str]):
-    """Envía email HTML + texto plano. Ignora destinatarios vacíos."""
-    # Filtrar emails vacíos o None
-    destinatarios = [e for e in (destinatarios or []) if e]
-    if not destinatarios:
-        return  # nada que enviar
-
-    html = render_to_string(template, contexto)
-    texto = strip_tags(html)
-
-    send_mail(
-        subject=asunto,
-        message=texto,
-        from_email=None,  # usa DEFAULT_FROM_EMAIL de settings
-        recipient_list=destinatarios,
-        html_message=html,
-        fail_silently=False,
-    )
-from user.models import User
-
-def obtener_emails_admins() -> List[str]:
+
+from user.models import FrecuenciaAvisos
+from .models import EstadoNotificacion, EventoResumen, NotificacionPendiente
+
+TAM_LOTE_CORREOS = 100
+MAX_INTENTOS = 6
+ESPERA_BASE = timedelta(minutes=1)  # 1, 2, 4, 8, 16 min entre intentos
+# Un lote reservado por un worker que murió vuelve a la cola pasado este tiempo
+RESERVA = timedelta(minutes=10)
+CLAVE_ADMINS = "turnos:avisos:admins"
+
+
+def _destinatarios(destinatarios) -> List[str]:
+    """Quita vacíos y duplicados, preservando el orden."""
+    return list(dict.fromkeys(e for e in (destinatarios or []) if e))
+
+
+# ---------------------------------
+# Bandeja de salida
+# ---------------------------------
+def encolar_notificaciones(mensajes: Iterable[Tuple[str, str, str, dict, List[str]]],
+                           copia_admins: bool = False) -> None:
+    """
+    Encola (clave, asunto, template, contexto, destinatarios) en un solo
+    INSERT. Llamar dentro de la transacción del cambio. Las claves ya
+    encoladas (o repetidas) se ignoran. copia_admins agrega a los
+    administradores: los inmediatos como destinatarios, el resto como
+    EventoResumen.
+    """
+    admins = _admins() if copia_admins else []
+    inmediatos = [a["email"] for a in admins if a["frecuencia"] == FrecuenciaAvisos.INMEDIATA]
+    con_resumen = [a for a in admins if a["frecuencia"] != FrecuenciaAvisos.INMEDIATA]
+    filas, eventos = {}, []
+    for clave, asunto, template, contexto, destinatarios in mensajes:
+        destinatarios = _destinatarios([*(destinatarios or []), *inmediatos])
+        if clave in filas:
+            continue
+        eventos += [
+            EventoResumen(usuario_id=a["pk"], clave=clave, asunto=asunto, docente=contexto.get("docente", ""),
+                          representante=contexto.get("representante", ""), inicio=contexto.get("inicio"))
+            for a in con_resumen if a["email"] not in destinatarios
+        ]
+        if not destinatarios:
+            continue
+        html = render_to_string(template, contexto)
+        filas[clave] = NotificacionPendiente(
+            clave=clave, asunto=asunto, destinatarios=destinatarios, texto=strip_tags(html), html=html,
+        )
+    NotificacionPendiente.objects.bulk_create(filas.values(), batch_size=500, ignore_conflicts=True)
+    EventoResumen.objects.bulk_create(eventos, batch_size=500, ignore_conflicts=True)
+
+
+def encolar_notificacion(clave: str, asunto: str, template: str, contexto: dict, destinatarios: List[str],
+                         copia_admins: bool = False) -> None:
+    encolar_notificaciones([(clave, asunto, template, contexto, destinatarios)], copia_admins=copia_admins)
+
+
+def enviar_resumenes(frecuencia: str) -> int:
     """
-    Devuelve emails de usuarios con rol 'Administrador' activos.
-    Compatible con AUTH_USER_MODEL personalizado.
+    Un correo por destinatario con sus EventoResumen pendientes, a la
+    bandeja de salida; los eventos incluidos se borran en la misma
+    transacción. Entran los usuarios con esa frecuencia y los que volvieron
+    a INMEDIATA con eventos viejos. Devuelve cuántos resúmenes se encolaron.
     """
-    User = apps.get_model(settings.AUTH_USER_MODEL)  # evita import circular
-    return list(
-        User.objects.filter(rol__nombre="Administrador", is_active=True)
-        .exclude(email="")
-        .values_list("email", flat=True)
-    )
+    eventos = (EventoResumen.objects
+               .filter(usuario__frecuencia_avisos__in=[frecuencia, FrecuenciaAvisos.INMEDIATA])
+               .select_related("usuario").order_by("usuario_id", "creado_en", "pk"))
+    por_usuario = {}
+    for e in eventos:
+        por_usuario.setdefault(e.usuario, []).append(e)
+    titulo = dict(FrecuenciaAvisos.choices)[frecuencia]
+    with transaction.atomic():
+        encolar_notificaciones(
+            (
+                f"resumen:{usuario.pk}:{lista[-1].pk}",
+                f"{titulo}: {len(lista)} aviso(s) de citas",
+                "emails/resumen_avisos.html",
+                {"nombre_receptor": usuario.get_full_name() or usuario.username, "eventos": lista,
+                 "titulo": titulo},
+                [usuario.email] if usuario.is_active else [],
+            )
+            for usuario, lista in por_usuario.items()
+        )
+        EventoResumen.objects.filter(pk__in=[e.pk for lista in por_usuario.values() for e in lista]).delete()
+    return sum(1 for u in por_usuario if u.is_active and u.email)
+
+
+def _reservar_lote(tam: int):
+    """Marca hasta 'tam' pendientes vencidas con un token propio (dos workers no toman la misma)."""
+    ahora = timezone.now()
+    ids = list(NotificacionPendiente.objects.filter(estado=EstadoNotificacion.PENDIENTE, proximo_intento__lte=ahora)
+               .order_by("proximo_intento", "pk").values_list("pk", flat=True)[:tam])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    NotificacionPendiente.objects.filter(
+        pk__in=ids, estado=EstadoNotificacion.PENDIENTE, proximo_intento__lte=ahora,
+    ).update(reservada_por=token, proximo_intento=ahora + RESERVA)
+    return list(NotificacionPendiente.objects.filter(reservada_por=token).order_by("pk"))
+
+
+def _registrar_fallo(n, error: Exception) -> None:
+    intentos = n.intentos + 1
+    campos = {"intentos": intentos, "reservada_por": "", "ultimo_error": f"{type(error).__name__}: {error}"[:2000]}
+    if intentos >= MAX_INTENTOS:
+        campos["estado"] = EstadoNotificacion.FALLIDA
+    else:
+        campos["proximo_intento"] = timezone.now() + ESPERA_BASE * (2 ** (intentos - 1))
+    NotificacionPendiente.objects.filter(pk=n.pk).update(**campos)
+
+
+def enviar_pendientes(tam_lote: int = TAM_LOTE_CORREOS) -> Dict[str, int]:
+    """
+    Envía un lote de la cola por una sola conexión (get_connection() +
+    send_messages, un mensaje por llamada para saber cuál falló). Si la
+    conexión se cae, se reabre para el resto del lote.
+    """
+    lote = _reservar_lote(tam_lote)
+    if not lote:
+        return {"enviadas": 0, "fallidas": 0}
+    enviadas, fallidas = [], 0
+    conexion = get_connection(fail_silently=False)
+    try:
+        for n in lote:
+            correo = EmailMultiAlternatives(subject=n.asunto, body=n.texto, to=n.destinatarios, connection=conexion)
+            if n.html:
+                correo.attach_alternative(n.html, "text/html")
+            try:
+                conexion.open()  # no hace nada si ya está abierta
+                conexion.send_messages([correo])
+            except Exception as e:
+                fallidas += 1
+                _registrar_fallo(n, e)
+                conexion.close()
+            else:
+                enviadas.append(n.pk)
+    finally:
+        conexion.close()
+        NotificacionPendiente.objects.filter(pk__in=enviadas).update(
+            estado=EstadoNotificacion.ENVIADA, enviada_en=timezone.now(), reservada_por="", ultimo_error="",
+        )
+    return {"enviadas": len(enviadas), "fallidas": fallidas}
+
+
+def purgar_enviadas(dias: int) -> int:
+    """Borra las enviadas hace más de 'dias' (su clave deja de evitar duplicados)."""
+    limite = timezone.now() - timedelta(days=dias)
+    return NotificacionPendiente.objects.filter(estado=EstadoNotificacion.ENVIADA, enviada_en__lt=limite).delete()[0]
+
+
+def _admins() -> List[Dict]:
+    """Administradores activos con email: [{pk, email, frecuencia}], desde la caché."""
+    admins = cache.get(CLAVE_ADMINS)
+    if admins is None:
+        User = apps.get_model(settings.AUTH_USER_MODEL)  # evita import circular
+        admins = [
+            {"pk": pk, "email": email, "frecuencia": frecuencia}
+            for pk, email, frecuencia in User.objects.filter(rol__nombre="Administrador", is_active=True)
+            .exclude(email="").exclude(email=None).order_by("pk").values_list("pk", "email", "frecuencia_avisos")
+        ]
+        cache.set(CLAVE_ADMINS, admins, getattr(settings, "TURNOS_CACHE_ADMINS_SEGUNDOS", 3600))
+    return admins
+
+
+def invalidar_admins() -> None:
+    cache.delete(CLAVE_ADMINS)
@@ -0,0 +1,141 @@
+# turnos/estadisticas.py
+"""
+Mantenimiento y lectura de EstadisticaDiaria.
+
+Al cambiar una Cita se recalculan solo sus (docente, fecha) —el de antes y
+el de ahora— desde las citas de ese día: una lectura acotada por el índice
+(docente, inicio), un borrado y un bulk_create. Recalcular en vez de sumar
+o restar deltas deja la tabla correcta aunque se pierda una señal (UPDATE
+masivos, bulk_create); para esos casos está reconstruir_estadisticas().
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import Cita, EstadisticaDiaria, EstadoCita, inicio_del_dia
+from .services import bloquear_docentes, con_reintentos
+
+TAM_LOTE = 1000
+# Cada par agrega un OR a la consulta; SQLite limita la profundidad de la expresión
+PARES_POR_CONSULTA = 100
+
+
+def _acumular(filas) -> Dict[Tuple, List[int]]:
+    """Suma citas y minutos por (fecha local, docente_id, departamento, estado)."""
+    tz = timezone.get_current_timezone()
+    acumulado = defaultdict(lambda: [0, 0])
+    for docente_id, departamento, inicio, fin, estado in filas:
+        fila = acumulado[(timezone.localtime(inicio, tz).date(), docente_id, departamento or "", estado)]
+        fila[0] += 1
+        fila[1] += int((fin - inicio).total_seconds() // 60)
+    return acumulado
+
+
+def _guardar(acumulado) -> None:
+    EstadisticaDiaria.objects.bulk_create(
+        [
+            EstadisticaDiaria(fecha=f, docente_id=d, departamento=depto, estado=e, citas=n, minutos=m)
+            for (f, d, depto, e), (n, m) in acumulado.items()
+        ],
+        batch_size=TAM_LOTE,
+    )
+
+
+def _columnas(qs):
+    return qs.order_by().values_list("docente_id", "docente__departamento", "inicio", "fin", "estado")
+
+
+def recalcular_estadisticas(pares: Iterable[Tuple[int, date]]) -> None:
+    """
+    Rehace las filas de los (docente_id, fecha) indicados, de a
+    PARES_POR_CONSULTA. Primero toma el bloqueo de los docentes (el de
+    reservar_cita): en SQLite la primera sentencia debe escribir, porque
+    pasar de lectura a escritura dentro de la transacción falla al instante
+    con "database is locked" en lugar de esperar; en ese caso se reintenta.
+    """
+    pares = sorted({(d, f) for d, f in pares if d and f})
+    if not pares:
+        return
+
+    def _rehacer():
+        bloquear_docentes(d for d, _ in pares)
+        for i in range(0, len(pares), PARES_POR_CONSULTA):
+            citas, filas = Q(), Q()
+            for d, f in pares[i:i + PARES_POR_CONSULTA]:
+                citas |= Q(docente_id=d, inicio__gte=inicio_del_dia(f),
+                           inicio__lt=inicio_del_dia(f + timedelta(days=1)))
+                filas |= Q(docente_id=d, fecha=f)
+            acumulado = _acumular(_columnas(Cita.objects.filter(citas)))
+            EstadisticaDiaria.objects.filter(filas).delete()
+            _guardar(acumulado)
+
+    con_reintentos(_rehacer)
+
+
+def reconstruir_estadisticas(desde: Optional[date] = None, hasta: Optional[date] = None) -> int:
+    """Reconstrucción completa (o del rango de fechas locales). Devuelve las filas creadas."""
+    fechas = Q()
+    if desde:
+        fechas &= Q(fecha__gte=desde)
+    if hasta:
+        fechas &= Q(fecha__lte=hasta)
+    with transaction.atomic():
+        EstadisticaDiaria.objects.filter(fechas).delete()
+        acumulado = _acumular(_columnas(Cita.objects.entre(desde, hasta)).iterator(chunk_size=TAM_LOTE))
+        _guardar(acumulado)
+    return len(acumulado)
+
+
+def actualizar_departamento(docente_id: int, departamento: str) -> None:
+    """El departamento está copiado en cada fila: se sigue al del docente."""
+    EstadisticaDiaria.objects.filter(docente_id=docente_id).update(departamento=departamento or "")
+
+
+# ---------------------------------
+# Lecturas
+# ---------------------------------
+def estadisticas(desde: Optional[date] = None, hasta: Optional[date] = None, estado: str = "",
+                 departamento: str = "", docente=None):
+    qs = EstadisticaDiaria.objects.order_by()
+    if desde:
+        qs = qs.filter(fecha__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__lte=hasta)
+    if estado:
+        qs = qs.filter(estado=estado)
+    if departamento:
+        qs = qs.filter(departamento__iexact=departamento)
+    if docente is not None:
+        qs = qs.filter(docente=docente)
+    return qs
+
+
+def totales_por_estado(**filtros) -> Dict[str, int]:
+    """{estado: citas} del rango, como values("estado").annotate(Count) sobre Cita."""
+    return dict(estadisticas(**filtros).values("estado").annotate(n=Sum("citas")).values_list("estado", "n"))
+
+
+def tendencia_semanal(desde: date, hasta: date, **filtros) -> List[Dict]:
+    """
+    Una fila por semana (lunes) del rango, con citas por estado y minutos
+    reservados (pendientes + confirmadas). Lee filas diarias agregadas por
+    fecha y estado: tantas como días × estados, sin importar las citas.
+    """
+    lunes = desde - timedelta(days=desde.weekday())
+    semanas = {}
+    s = lunes
+    while s <= hasta:
+        semanas[s] = {"semana": s, "minutos": 0, **{e: 0 for e in EstadoCita.values}}
+        s += timedelta(days=7)
+    filas = (estadisticas(desde, hasta, **filtros).values("fecha", "estado")
+             .annotate(n=Sum("citas"), m=Sum("minutos")).values_list("fecha", "estado", "n", "m"))
+    for fecha, estado, n, m in filas:
+        semana = semanas[fecha - timedelta(days=fecha.weekday())]
+        semana[estado] += n
+        if estado != EstadoCita.CANCELADA:
+            semana["minutos"] += m
+    return list(semanas.values())
@@ -19,9 +19,26 @@ class FiltroCitasForm(forms.Form):
         widget=forms.Select(attrs={"class": "form-select"}),
         label="Estado"
     )
+    # Solo para exportar: rango sin el tope de 7 días
+    desde = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+        label="Desde"
+    )
+    hasta = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"type": "date", "class": "form-control form-control-sm"}),
+        label="Hasta"
+    )
+
+    def clean(self):
+        data = super().clean()
+        if data.get("desde") and data.get("hasta") and data["hasta"] < data["desde"]:
+            raise forms.ValidationError("La fecha 'hasta' no puede ser anterior a 'desde'.")
+        return data
 
 class CargaCSVForm(forms.Form):
-    archivo = forms.FileField(label="Archivo CSV", widget=forms.FileInput(attrs={"class": "form-control"}))
+    archivo = forms.FileField(label="Archivo CSV (.csv o .csv.gz)", widget=forms.FileInput(attrs={"class": "form-control", "accept": ".csv,.gz"}))
 
 
 class PerfilDocenteForm(forms.ModelForm):
@@ -59,7 +76,11 @@ class ExcepcionDisponibilidadForm(forms.ModelForm):
         }
 
 class CargaCSVDocentesForm(forms.Form):
-    archivo = forms.FileField(label="Archivo CSV de Docentes", widget=forms.FileInput(attrs={"class":"form-control"}))
+    archivo = forms.FileField(label="Archivo CSV de Docentes (.csv o .csv.gz)", widget=forms.FileInput(attrs={"class":"form-control", "accept":".csv,.gz"}))
+    simular = forms.BooleanField(
+        label="Solo simular (muestra los cambios de franjas sin guardar)", required=False,
+        widget=forms.CheckboxInput(attrs={"class":"form-check-input"}),
+    )
 
 class BloqueoMasivoForm(forms.Form):
     nombre = forms.CharField(label="Nombre del feriado/evento", max_length=120, widget=forms.TextInput(attrs={"class":"form-control", "placeholder":"Ej. Feriado de Fundación"}))
@@ -70,6 +91,11 @@ class BloqueoMasivoForm(forms.Form):
     aplicar_a = forms.ChoiceField(choices=[("todos","Todos los docentes"), ("departamento","Por departamento")], widget=forms.Select(attrs={"class":"form-select"}))
     departamento = forms.CharField(required=False, widget=forms.TextInput(attrs={"class":"form-control","placeholder":"Ej. Matemática"}))
     reemplazar = forms.BooleanField(required=False, initial=False, widget=forms.CheckboxInput(attrs={"class":"form-check-input"}))
+    modo = forms.ChoiceField(
+        choices=[("feriado","Feriado/evento (un solo registro)"), ("excepciones","Excepciones por docente y día")],
+        initial="feriado", widget=forms.Select(attrs={"class":"form-select"}),
+    )
+    cancelar_citas = forms.BooleanField(required=False, initial=False, widget=forms.CheckboxInput(attrs={"class":"form-check-input"}))
 
     def clean(self):
         data = super().clean()
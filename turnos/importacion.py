@@ -0,0 +1,575 @@
+# turnos/importacion.py
+"""
+Importación masiva desde CSV: estudiantes/representantes y docentes.
+
+El archivo se recorre por lotes (TAM_LOTE filas). Por lote:
+  - una consulta trae los Estudiante existentes por cédula y otra los User
+    por cédula/email (y username, que por regla es la cédula o el email),
+  - los cambios se resuelven en memoria fila por fila, en el mismo orden y
+    con las mismas reglas que el import anterior (la última fila gana),
+  - se escribe con bulk_create/bulk_update y una consulta más para las
+    relaciones existentes.
+Cada lote va en su propia transacción. Una fila inválida no detiene el
+archivo: se omite y se reporta en "errores" como (número de fila, mensaje).
+
+bulk_create no pasa por User.save(), así que la normalización se replica
+aquí: email en minúsculas y username = cédula (o el email si no hay cédula).
+La contraseña inicial se hashea una sola vez por importación (clave_inicial).
+
+Los archivos se leen con lineas_csv(): decodificación incremental por
+bloques (gzip, BOM y respaldo a latin-1 incluidos), con memoria constante
+sin importar el tamaño.
+"""
+import codecs
+import gzip
+import re
+from datetime import time
+from functools import lru_cache
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from user.models import Rol
+from .bloqueos import refrescar_slots
+from .models import DisponibilidadSemanal, Estudiante, FuenteRelacion, PerfilDocente, RelacionRepresentacion
+from .services import fechas_dia_semana
+from .signals import sin_recalculo
+
+User = get_user_model()
+
+TAM_LOTE = 500
+CLAVE_INICIAL = "12345678"
+RE_CEDULA = re.compile(r"^\d{8,20}$")
+VERDADEROS = ("1", "true", "True")
+ABREV_DIA = {"LUN": 0, "MAR": 1, "MIE": 2, "JUE": 3, "VIE": 4, "SAB": 5, "DOM": 6}
+RANGO_RE = re.compile(r"^\s*(\d{2}:\d{2})\s*-\s*(\d{2}:\d{2})\s*$")
+TAM_BLOQUE_LECTURA = 64 * 1024
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+# ---------------------------------
+# Lectura de archivos
+# ---------------------------------
+def abrir_binario(f: BinaryIO) -> BinaryIO:
+    """Si el archivo es gzip (por sus bytes mágicos, no por la extensión) se descomprime al vuelo."""
+    cabecera = f.read(2)
+    f.seek(0)
+    if cabecera == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    return f
+
+
+class _Utf8ConRespaldo:
+    """
+    Decodificador incremental UTF-8 que, en el primer byte inválido, sigue
+    en latin-1 desde ese byte. Lo ya decodificado era UTF-8 válido (en un
+    archivo latin-1, ASCII puro), así que no hace falta releer nada.
+    """
+
+    def __init__(self):
+        self.codificacion = "utf-8"
+        self.pendiente = b""
+
+    def __call__(self, datos: bytes, final: bool = False) -> str:
+        datos, self.pendiente = self.pendiente + datos, b""
+        if self.codificacion != "utf-8":
+            return datos.decode(self.codificacion)
+        try:
+            # Sin 'final' deja sin consumir una secuencia cortada al final del bloque
+            texto, usados = codecs.utf_8_decode(datos, "strict", final)
+        except UnicodeDecodeError as e:
+            self.codificacion = "latin-1"
+            return datos[:e.start].decode("utf-8") + datos[e.start:].decode("latin-1")
+        self.pendiente = datos[usados:]
+        return texto
+
+
+def lineas_csv(f: BinaryIO, tam_bloque: int = TAM_BLOQUE_LECTURA) -> Iterator[str]:
+    """
+    Líneas de texto (con su salto) de un archivo binario, leído por bloques
+    para csv.reader/DictReader. Acepta .csv.gz, detecta el BOM (UTF-8/UTF-16)
+    y, sin BOM, usa UTF-8 con respaldo a latin-1.
+    """
+    f = abrir_binario(f)
+    bloque = f.read(max(tam_bloque, 4))  # el BOM más largo cabe en el primer bloque
+    decodificar = _Utf8ConRespaldo()
+    for bom, codificacion in BOMS:
+        if bloque.startswith(bom):
+            bloque = bloque[len(bom):]
+            if codificacion != "utf-8":
+                decodificar = codecs.getincrementaldecoder(codificacion)().decode
+            break
+    resto = ""
+    while bloque:
+        *lineas, resto = (resto + decodificar(bloque)).split("\n")
+        for linea in lineas:
+            yield linea + "\n"
+        bloque = f.read(tam_bloque)
+    resto += decodificar(b"", final=True)
+    if resto:
+        yield resto
+
+
+def contar_lineas(f: BinaryIO, tam_bloque: int = 1024 * 1024) -> int:
+    """Saltos de línea del archivo (descomprimido si es gzip), sin decodificarlo."""
+    f = abrir_binario(f)
+    return sum(b.count(b"\n") for b in iter(lambda: f.read(tam_bloque), b""))
+
+
+def rol_representante() -> Rol:
+    rol, _ = Rol.objects.get_or_create(nombre="Representante", defaults={"descripcion": "Padre/Madre/Apoderado"})
+    return rol
+
+
+def rol_docente() -> Rol:
+    rol, _ = Rol.objects.get_or_create(nombre="Docente", defaults={"descripcion": "Docente"})
+    return rol
+
+
+def clave_inicial() -> str:
+    """
+    Hash de CLAVE_INICIAL para las cuentas importadas. PBKDF2 cuesta cientos
+    de ms, así que cada importación lo calcula una vez (ver hash_por_importacion)
+    y lo reutiliza en todas sus cuentas nuevas; el hash lleva su propia sal,
+    check_password y el cambio de contraseña funcionan igual.
+    """
+    return make_password(CLAVE_INICIAL)
+
+
+def hash_por_importacion():
+    """Función que calcula clave_inicial() la primera vez que se pide y luego la repite."""
+    return lru_cache(maxsize=None)(clave_inicial)
+
+
+def _limpiar_fila(row: Dict) -> Dict:
+    """Normaliza una fila del CSV. Lanza ValueError con el motivo si es inválida."""
+    def campo(nombre):
+        return (row.get(nombre) or "").strip()
+
+    fila = {
+        "cedula": campo("cedula"),
+        "nombre": campo("nombre"),
+        "curso": campo("curso"),
+        "rep_cedula": campo("representante_cedula"),
+        "rep_email": campo("representante_email").lower(),
+        "parentesco": campo("parentesco"),
+        "verificado": (row.get("verificado") or "0").strip() in VERDADEROS,
+    }
+    if not fila["cedula"] or not fila["nombre"]:
+        raise ValueError("Fila incompleta (cedula/nombre).")
+    if not RE_CEDULA.match(fila["cedula"]):
+        raise ValueError(f"Cédula de estudiante inválida: {fila['cedula']}.")
+    if len(fila["nombre"]) > 120 or len(fila["curso"]) > 80:
+        raise ValueError("Nombre (máx. 120) o curso (máx. 80) demasiado largo.")
+    if fila["rep_cedula"] and not RE_CEDULA.match(fila["rep_cedula"]):
+        raise ValueError(f"Cédula de representante inválida: {fila['rep_cedula']}.")
+    if fila["rep_email"]:
+        try:
+            validate_email(fila["rep_email"])
+        except ValidationError:
+            raise ValueError(f"Email de representante inválido: {fila['rep_email']}.")
+    if len(fila["parentesco"]) > 40:
+        raise ValueError("Parentesco demasiado largo (máx. 40).")
+    return fila
+
+
+def _guardar_nuevos(modelo, objetos, clave: str) -> None:
+    """bulk_create; si el motor no devuelve las pk, se releen por 'clave'."""
+    if not objetos:
+        return
+    modelo.objects.bulk_create(objetos, batch_size=TAM_LOTE)
+    if any(o.pk is None for o in objetos):
+        pks = dict(modelo.objects.filter(**{f"{clave}__in": [getattr(o, clave) for o in objetos]})
+                   .order_by().values_list(clave, "pk"))
+        for o in objetos:
+            o.pk = pks[getattr(o, clave)]
+
+
+class _Lote:
+    """Estado en memoria de un lote: lo que existe, lo que se crea y lo que cambia."""
+
+    def __init__(self, filas: List[Dict], rol_rep: Rol, clave_hash):
+        self.rol_rep = rol_rep
+        self.clave_hash = clave_hash
+        self.errores = []
+
+        cedulas = {f["cedula"] for f in filas}
+        self.estudiantes = {e.cedula: e for e in Estudiante.objects.filter(cedula__in=cedulas)}
+        self.est_nuevos, self.est_cambiados = {}, {}
+
+        rep_cedulas = {f["rep_cedula"] for f in filas if f["rep_cedula"]}
+        rep_emails = {f["rep_email"] for f in filas if f["rep_email"]}
+        self.por_cedula, self.por_email, self.por_username = {}, {}, {}
+        if rep_cedulas or rep_emails:
+            for u in User.objects.filter(
+                Q(cedula__in=rep_cedulas) | Q(email__in=rep_emails) | Q(username__in=rep_cedulas | rep_emails)
+            ):
+                self._indexar(u)
+        self.usr_nuevos, self.usr_cambiados = [], {}
+        # (cedula estudiante, id(User)) -> (estudiante, representante, parentesco, verificado)
+        self.relaciones = {}
+
+    def _indexar(self, u) -> None:
+        if u.cedula:
+            self.por_cedula[u.cedula] = u
+        if u.email:
+            self.por_email[u.email] = u
+        self.por_username[u.username] = u
+
+    def _estudiante(self, f) -> Estudiante:
+        est = self.estudiantes.get(f["cedula"])
+        if est is None:
+            est = Estudiante(cedula=f["cedula"], nombre=f["nombre"], curso=f["curso"])
+            self.estudiantes[est.cedula] = self.est_nuevos[est.cedula] = est
+            return est
+        cambio = False
+        if est.nombre != f["nombre"]:
+            est.nombre, cambio = f["nombre"], True
+        if f["curso"] and est.curso != f["curso"]:
+            est.curso, cambio = f["curso"], True
+        if cambio and est.cedula not in self.est_nuevos:
+            self.est_cambiados[est.cedula] = est
+        return est
+
+    def _representante(self, f, num_fila: int):
+        ced, email = f["rep_cedula"], f["rep_email"]
+        rep = (ced and self.por_cedula.get(ced)) or (email and self.por_email.get(email)) \
+            or self.por_username.get(ced or email)
+        if rep is None:
+            # Mismas reglas que User.save(): username = cédula, o el email si no hay cédula
+            rep = User(username=ced or email, cedula=ced or None, email=email or None,
+                       password=self.clave_hash(), rol=self.rol_rep)
+            self.usr_nuevos.append(rep)
+            self._indexar(rep)
+            return rep
+
+        cambio = False
+        if ced and not rep.cedula:
+            rep.cedula, cambio = ced, True
+            self.por_cedula[ced] = rep
+        if email and not rep.email:
+            if self.por_email.get(email, rep) is not rep:
+                self.errores.append((num_fila, f"El email {email} ya pertenece a otro usuario; no se asignó."))
+            else:
+                rep.email, cambio = email, True
+                self.por_email[email] = rep
+        if not rep.rol_id:
+            rep.rol, cambio = self.rol_rep, True
+        if cambio and rep.pk:
+            self.usr_cambiados[rep.pk] = rep
+        return rep
+
+    def agregar(self, f, num_fila: int) -> None:
+        est = self._estudiante(f)
+        if not f["rep_cedula"] and not f["rep_email"]:
+            return  # Solo estudiante
+        rep = self._representante(f, num_fila)
+        self.relaciones[(est.cedula, id(rep))] = (est, rep, f["parentesco"], f["verificado"])
+
+    def guardar(self) -> Dict:
+        _guardar_nuevos(Estudiante, list(self.est_nuevos.values()), "cedula")
+        if self.est_cambiados:
+            Estudiante.objects.bulk_update(self.est_cambiados.values(), ["nombre", "curso"], batch_size=TAM_LOTE)
+        _guardar_nuevos(User, self.usr_nuevos, "username")
+        if self.usr_cambiados:
+            User.objects.bulk_update(self.usr_cambiados.values(), ["cedula", "email", "rol"], batch_size=TAM_LOTE)
+
+        existentes = {}
+        if self.relaciones:
+            existentes = {
+                (r.estudiante_id, r.representante_id): r
+                for r in RelacionRepresentacion.objects.filter(
+                    estudiante_id__in={e.pk for e, *_ in self.relaciones.values()},
+                    representante_id__in={u.pk for _, u, *_ in self.relaciones.values()},
+                ).order_by()
+            }
+        rel_nuevas, rel_cambiadas = [], []
+        for est, rep, parentesco, verificado in self.relaciones.values():
+            r = existentes.get((est.pk, rep.pk))
+            if r is None:
+                rel_nuevas.append(RelacionRepresentacion(
+                    estudiante=est, representante=rep, parentesco=parentesco,
+                    verificado=verificado, fuente=FuenteRelacion.IMPORT, activo=True,
+                ))
+            elif (r.parentesco, r.verificado, r.fuente, r.activo) != (parentesco, verificado, FuenteRelacion.IMPORT, True):
+                r.parentesco, r.verificado, r.fuente, r.activo = parentesco, verificado, FuenteRelacion.IMPORT, True
+                rel_cambiadas.append(r)
+        RelacionRepresentacion.objects.bulk_create(rel_nuevas, batch_size=TAM_LOTE)
+        if rel_cambiadas:
+            RelacionRepresentacion.objects.bulk_update(
+                rel_cambiadas, ["parentesco", "verificado", "fuente", "activo"], batch_size=TAM_LOTE
+            )
+        return {
+            "estudiantes_nuevos": len(self.est_nuevos),
+            "representantes_nuevos": len(self.usr_nuevos),
+            "relaciones_nuevas": len(rel_nuevas),
+        }
+
+
+def importar_estudiantes(filas: Iterable[Dict], tam_lote: int = TAM_LOTE, progreso=None) -> Dict:
+    """
+    Importa filas de csv.DictReader (columnas cedula, nombre, curso,
+    representante_cedula, representante_email, parentesco, verificado).
+
+    Devuelve {"filas", "estudiantes", "relaciones", "estudiantes_nuevos",
+    "representantes_nuevos", "relaciones_nuevas", "errores": [(fila, mensaje)]}.
+    "estudiantes" y "relaciones" cuentan filas aplicadas, como el import
+    anterior. 'progreso(resultado)' se llama después de cada lote.
+    """
+    resultado = {
+        "filas": 0, "estudiantes": 0, "relaciones": 0, "estudiantes_nuevos": 0,
+        "representantes_nuevos": 0, "relaciones_nuevas": 0, "errores": [],
+    }
+    rol_rep = rol_representante()
+    clave_hash = hash_por_importacion()
+    # La fila 1 es el encabezado
+    numeradas = enumerate(filas, start=2)
+    while True:
+        bloque = list(islice(numeradas, tam_lote))
+        if not bloque:
+            break
+        resultado["filas"] += len(bloque)
+        validas, errores = [], []
+        for num, row in bloque:
+            try:
+                validas.append((num, _limpiar_fila(row)))
+            except ValueError as e:
+                errores.append((num, str(e)))
+        if validas:
+            try:
+                with transaction.atomic():
+                    lote = _Lote([f for _, f in validas], rol_rep, clave_hash)
+                    for num, f in validas:
+                        lote.agregar(f, num)
+                    totales = lote.guardar()
+            except DatabaseError as e:
+                errores.append((validas[0][0], f"Lote de filas {validas[0][0]}–{validas[-1][0]} no importado: {e}"))
+            else:
+                errores.extend(lote.errores)
+                resultado["estudiantes"] += len(validas)
+                resultado["relaciones"] += sum(1 for _, f in validas if f["rep_cedula"] or f["rep_email"])
+                for clave, n in totales.items():
+                    resultado[clave] += n
+        resultado["errores"].extend(sorted(errores))
+        if progreso:
+            progreso(resultado)
+    return resultado
+
+
+# ---------------------------------
+# Docentes
+# ---------------------------------
+def parsear_disponibilidad(cadena: str):
+    """
+    'LUN 08:00-10:00|MIE 09:00-11:00' -> ([(0, '08:00', '10:00'), (2, '09:00', '11:00')], errores)
+    """
+    if not cadena:
+        return [], []
+    items = [p.strip() for p in cadena.split("|") if p.strip()]
+    resultado, errores = [], []
+    for seg in items:
+        try:
+            abrev, rango = seg.split(None, 1)
+        except ValueError:
+            errores.append(f"Formato inválido: '{seg}'")
+            continue
+        abrev = abrev.upper()
+        if abrev not in ABREV_DIA:
+            errores.append(f"Día inválido: '{abrev}'")
+            continue
+        m = RANGO_RE.match(rango)
+        if not m:
+            errores.append(f"Rango inválido: '{rango}' (usa HH:MM-HH:MM)")
+            continue
+        ini, fin = m.group(1), m.group(2)
+        if ini >= fin:
+            errores.append(f"Inicio >= fin en '{seg}'")
+            continue
+        resultado.append((ABREV_DIA[abrev], ini, fin))
+    return resultado, errores
+
+
+def _importar_docente(row, rol_doc, clave_hash, resultado, errores, num_fila):
+    """
+    Usuario + PerfilDocente de una fila. Devuelve (perfil, cedula, franjas, reemplazar)
+    si la fila trae disponibilidad válida (se aplica por diff al cerrar el lote), o None.
+    """
+    cedula = (row.get("cedula") or "").strip()
+    if not cedula:
+        errores.append((num_fila, "Fila sin cédula."))
+        return None
+    email = (row.get("email") or "").strip().lower() or None
+    nombres = (row.get("nombres") or "").strip()
+    apellidos = (row.get("apellidos") or "").strip()
+    telefono = (row.get("telefono") or "").strip()
+    departamento = (row.get("departamento") or "").strip()
+    try:
+        minutos_por_bloque = int(row.get("minutos_por_bloque") or 20)
+    except ValueError:
+        minutos_por_bloque = 20
+    try:
+        mcd = row.get("maximo_citas_diarias")
+        maximo_citas_diarias = int(mcd) if mcd not in (None, "", " ") else None
+    except ValueError:
+        maximo_citas_diarias = None
+    activo = str(row.get("activo") or "1").strip() in VERDADEROS + ("TRUE",)
+    disponibilidad_raw = (row.get("disponibilidad") or "").strip()
+    reemplazar = str(row.get("reemplazar_disponibilidad") or "0").strip() in VERDADEROS + ("TRUE",)
+
+    # Usuario (username = cedula)
+    user = User.objects.filter(cedula=cedula).first()
+    if not user:
+        # Sin create_user(): el hash de la contraseña inicial se calcula una vez por importación
+        user = User(username=cedula, cedula=cedula, email=email, first_name=nombres,
+                    last_name=apellidos, rol=rol_doc, password=clave_hash())
+        user.save()
+        resultado["creados"] += 1
+    else:
+        cambios = []
+        if email and not user.email:
+            user.email = email; cambios.append("email")
+        if nombres and user.first_name != nombres:
+            user.first_name = nombres; cambios.append("first_name")
+        if apellidos and user.last_name != apellidos:
+            user.last_name = apellidos; cambios.append("last_name")
+        if not user.rol_id:
+            user.rol = rol_doc; cambios.append("rol")
+        if cambios:
+            user.save(update_fields=cambios)
+        resultado["actualizados"] += 1
+
+    perfil, _ = PerfilDocente.objects.get_or_create(usuario=user)
+    cambios = []
+    for campo, valor in (
+        ("minutos_por_bloque", minutos_por_bloque), ("maximo_citas_diarias", maximo_citas_diarias),
+        ("departamento", departamento), ("telefono", telefono), ("activo", activo),
+    ):
+        if getattr(perfil, campo) != valor:
+            setattr(perfil, campo, valor); cambios.append(campo)
+    if cambios:
+        perfil.save(update_fields=cambios)
+
+    if not disponibilidad_raw:
+        return None
+    franjas, errs = parsear_disponibilidad(disponibilidad_raw)
+    if errs:
+        errores.append((num_fila, f"Cédula {cedula}: {', '.join(errs[:3])}" + (" ..." if len(errs) > 3 else "")))
+        return None
+    return perfil, cedula, {(d, time.fromisoformat(i), time.fromisoformat(f)) for d, i, f in franjas}, reemplazar
+
+
+def plan_disponibilidad(franjas_deseadas: Dict) -> Dict:
+    """
+    Diff entre las franjas del CSV y las guardadas, para todos los docentes
+    del lote con una consulta. franjas_deseadas: {perfil_id: ({(dia, ini, fin)}, reemplazar)}.
+    Devuelve {"crear": [(perfil_id, dia, ini, fin)], "borrar": [(pk, perfil_id, dia, ini, fin)]};
+    sin 'reemplazar' solo se agregan las que faltan.
+    """
+    guardadas = {}
+    for pk, docente_id, dia, ini, fin in DisponibilidadSemanal.objects.filter(
+        docente_id__in=franjas_deseadas
+    ).order_by().values_list("pk", "docente_id", "dia_semana", "hora_inicio", "hora_fin"):
+        guardadas.setdefault(docente_id, {})[(dia, ini, fin)] = pk
+    crear, borrar = [], []
+    for docente_id, (franjas, reemplazar) in franjas_deseadas.items():
+        actuales = guardadas.get(docente_id, {})
+        crear.extend((docente_id, *f) for f in sorted(franjas - actuales.keys()))
+        if reemplazar:
+            borrar.extend((pk, docente_id, *f) for f, pk in sorted(actuales.items()) if f not in franjas)
+    return {"crear": crear, "borrar": borrar}
+
+
+def aplicar_disponibilidad(plan: Dict) -> None:
+    """Un bulk_create y un borrado masivo; SlotLibre y la caché se refrescan una vez al confirmar."""
+    if not plan["crear"] and not plan["borrar"]:
+        return
+    with sin_recalculo():
+        DisponibilidadSemanal.objects.bulk_create(
+            [DisponibilidadSemanal(docente_id=d, dia_semana=dia, hora_inicio=i, hora_fin=f)
+             for d, dia, i, f in plan["crear"]],
+            batch_size=TAM_LOTE,
+        )
+        if plan["borrar"]:
+            DisponibilidadSemanal.objects.filter(pk__in=[b[0] for b in plan["borrar"]]).delete()
+    docentes = {c[0] for c in plan["crear"]} | {b[1] for b in plan["borrar"]}
+    dias = {c[1] for c in plan["crear"]} | {b[2] for b in plan["borrar"]}
+    fechas = [f for dia in dias for f in fechas_dia_semana(dia)]
+    transaction.on_commit(lambda: refrescar_slots(docentes, fechas), robust=True)
+
+
+def _describir(plan: Dict, cedulas: Dict) -> List[str]:
+    dias = {v: k for k, v in ABREV_DIA.items()}
+    lineas = [(cedulas.get(d, d), "+", dia, i, f) for d, dia, i, f in plan["crear"]]
+    lineas += [(cedulas.get(d, d), "-", dia, i, f) for _, d, dia, i, f in plan["borrar"]]
+    return [f"{c}: {signo} {dias[dia]} {i:%H:%M}-{f:%H:%M}" for c, signo, dia, i, f in sorted(lineas, key=str)]
+
+
+def importar_docentes(filas: Iterable[Dict], tam_lote: int = TAM_LOTE, progreso=None, simular: bool = False) -> Dict:
+    """
+    Importa filas de csv.DictReader con el formato de formato_docentes
+    (usuario + PerfilDocente + disponibilidad opcional), una transacción por
+    lote. La disponibilidad se aplica por diff contra DisponibilidadSemanal
+    (plan_disponibilidad): un archivo sin cambios no escribe nada.
+
+    Devuelve {"filas", "creados", "actualizados", "franjas_creadas",
+    "franjas_borradas", "diff": ["cedula: + LUN 08:00-10:00", ...],
+    "errores": [(fila, mensaje)]}; 'progreso(resultado)' tras cada lote.
+    Con simular=True cada lote se revierte al cerrarlo (el bloqueo de
+    escritura no dura todo el archivo) y "diff" lista los cambios de franjas
+    que se harían. Como cada lote se simula sobre los datos guardados, una
+    cédula repetida en lotes distintos se cuenta en cada uno.
+    """
+    resultado = {"filas": 0, "creados": 0, "actualizados": 0, "franjas_creadas": 0,
+                 "franjas_borradas": 0, "diff": [], "errores": []}
+    # Al simular, el rol (si falta) se crea dentro de cada lote y se revierte con él
+    rol_doc = None if simular else rol_docente()
+    clave_hash = hash_por_importacion()
+    numeradas = enumerate(filas, start=2)
+    while True:
+        bloque = list(islice(numeradas, tam_lote))
+        if not bloque:
+            break
+        resultado["filas"] += len(bloque)
+        franjas_deseadas, cedulas = {}, {}
+        with transaction.atomic():
+            rol = rol_doc or rol_docente()
+            for num, row in bloque:
+                # Un savepoint por fila: un conflicto (p. ej. email duplicado) solo descarta esa fila
+                parcial = {"creados": 0, "actualizados": 0}
+                try:
+                    with transaction.atomic():
+                        disp = _importar_docente(row, rol, clave_hash, parcial, resultado["errores"], num)
+                except DatabaseError as e:
+                    resultado["errores"].append((num, f"Fila no importada: {e}"))
+                    continue
+                for clave, n in parcial.items():
+                    resultado[clave] += n
+                if disp:
+                    perfil, cedula, franjas, reemplazar = disp
+                    cedulas[perfil.pk] = cedula
+                    # Como el import fila a fila: 'reemplazar' descarta lo anterior; si no, se suma
+                    previas, reemplazar_previo = franjas_deseadas.get(perfil.pk, (set(), False))
+                    franjas_deseadas[perfil.pk] = (franjas, True) if reemplazar else (previas | franjas, reemplazar_previo)
+
+            plan = plan_disponibilidad(franjas_deseadas)
+            aplicar_disponibilidad(plan)
+            if simular:
+                # Se revierte este lote (con sus on_commit) al salir del bloque
+                transaction.set_rollback(True)
+        resultado["franjas_creadas"] += len(plan["crear"])
+        resultado["franjas_borradas"] += len(plan["borrar"])
+        if simular:
+            resultado["diff"].extend(_describir(plan, cedulas))
+        if progreso:
+            progreso(resultado)
+    return resultado
@@ -0,0 +1,142 @@
+import random
+import time
+import warnings
+from datetime import datetime, time as dtime, timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from turnos.bloqueos import (
+    HORA_FIN_DIA, HORA_INICIO_DIA, refrescar_slots,
+    aplicar_excepciones, cancelar_citas_afectadas, citas_afectadas, plan_excepciones,
+)
+from turnos.models import (
+    Cita, DisponibilidadSemanal, EstadoCita, ExcepcionDisponibilidad, HorizonteSlots, PerfilDocente, TipoExcepcion,
+)
+from turnos.services import CLAVE_CACHE_HORIZONTE, fechas_entre
+from turnos.signals import sin_recalculo
+from user.models import User
+
+PREFIJO = "bench_bloqueo_"
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el bloqueo masivo por excepciones fila a fila (anterior) con la ruta por conjuntos "
+        "(turnos/bloqueos.py) sobre docentes sintéticos. Todo corre en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docentes", type=int, default=300)
+        parser.add_argument("--dias", type=int, default=30)
+        parser.add_argument("--citas-por-docente", type=int, default=3)
+        parser.add_argument("--sin-anterior", action="store_true", help="No medir la versión fila a fila (lenta)")
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        if opts["docentes"] <= 0 or opts["dias"] <= 0:
+            raise CommandError("--docentes y --dias deben ser mayores que 0.")
+        try:
+            with transaction.atomic():
+                self._ejecutar(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            cache.delete(CLAVE_CACHE_HORIZONTE)
+        self.stdout.write("Datos sintéticos revertidos.")
+
+    def _medir(self, nombre, fn):
+        connection.queries_log.clear()  # el registro guarda 9000 consultas como máximo
+        with CaptureQueriesContext(connection) as q:
+            t0 = time.monotonic()
+            resultado = fn()
+            seg = time.monotonic() - t0
+        tope = "+" if len(q) >= connection.queries_log.maxlen else " "
+        self.stdout.write(f"{nombre:<34} {seg * 1000:10.1f} ms  {len(q):7d}{tope} consultas")
+        return resultado
+
+    def _crear_datos(self, opts, fi, ff):
+        rnd = random.Random(opts["semilla"])
+        tz = timezone.get_current_timezone()
+        n = opts["docentes"]
+        with sin_recalculo():
+            User.objects.bulk_create([User(username=f"{PREFIJO}d{i}") for i in range(n)]
+                                     + [User(username=f"{PREFIJO}r{i}") for i in range(n)])
+            usuarios = {u.username: u for u in User.objects.filter(username__startswith=PREFIJO)}
+            PerfilDocente.objects.bulk_create([
+                PerfilDocente(usuario=usuarios[f"{PREFIJO}d{i}"], minutos_por_bloque=20) for i in range(n)
+            ])
+            docentes = list(PerfilDocente.objects.filter(usuario__username__startswith=PREFIJO))
+            DisponibilidadSemanal.objects.bulk_create([
+                DisponibilidadSemanal(docente=d, dia_semana=dia, hora_inicio=dtime(8, 0), hora_fin=dtime(12, 0))
+                for d in docentes for dia in range(5)
+            ])
+            dias = list(fechas_entre(fi, ff))
+            # Algunos bloqueos previos (para el diff) y citas dentro del rango
+            ExcepcionDisponibilidad.objects.bulk_create([
+                ExcepcionDisponibilidad(docente=d, fecha=rnd.choice(dias), hora_inicio=HORA_INICIO_DIA,
+                                        hora_fin=HORA_FIN_DIA, tipo=TipoExcepcion.BLOQUEO)
+                for d in docentes[::3]
+            ])
+            citas = []
+            for i, d in enumerate(docentes):
+                for f in rnd.sample(dias, min(opts["citas_por_docente"], len(dias))):
+                    ini = timezone.make_aware(datetime.combine(f, dtime(rnd.randint(8, 11), rnd.choice([0, 20, 40]))), tz)
+                    citas.append(Cita(docente=d, representante=usuarios[f"{PREFIJO}r{i}"], curso_estudiante="X",
+                                      nombre_estudiante="Bench", motivo="bench", inicio=ini,
+                                      fin=ini + timedelta(minutes=20), estado=EstadoCita.PENDIENTE))
+            Cita.objects.bulk_create(citas, batch_size=1000)
+        return [d.pk for d in docentes]
+
+    def _anterior(self, docente_ids, fi, ff):
+        """Bucle original de bloqueo_masivo: exists() + create() por docente y día."""
+        creadas = 0
+        for fecha in fechas_entre(fi, ff):
+            for d in docente_ids:
+                if not ExcepcionDisponibilidad.objects.filter(docente_id=d, fecha=fecha, tipo=TipoExcepcion.BLOQUEO,
+                                                              hora_inicio=HORA_INICIO_DIA, hora_fin=HORA_FIN_DIA).exists():
+                    ExcepcionDisponibilidad.objects.create(docente_id=d, fecha=fecha, hora_inicio=HORA_INICIO_DIA,
+                                                           hora_fin=HORA_FIN_DIA, tipo=TipoExcepcion.BLOQUEO,
+                                                           motivo="bench")
+                    creadas += 1
+        return creadas
+
+    def _ejecutar(self, opts):
+        hoy = timezone.localdate()
+        fi, ff = hoy + timedelta(days=2), hoy + timedelta(days=1 + opts["dias"])
+        # Horizonte materializado que cubra el rango (se revierte con todo lo demás)
+        HorizonteSlots.objects.update_or_create(pk=1, defaults={"cubierto_hasta": ff})
+        cache.delete(CLAVE_CACHE_HORIZONTE)
+
+        docente_ids = self._crear_datos(opts, fi, ff)
+        self.stdout.write(f"{len(docente_ids)} docentes × {opts['dias']} días ({fi} → {ff})")
+
+        if not opts["sin_anterior"]:
+            sid = transaction.savepoint()
+            with sin_recalculo(), warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # aviso de límite del registro de consultas
+                creadas = self._medir("anterior (fila a fila)", lambda: self._anterior(docente_ids, fi, ff))
+            transaction.savepoint_rollback(sid)
+            self.stdout.write(f"  excepciones creadas: {creadas}")
+
+        afectadas = citas_afectadas(docente_ids, fi, ff)
+        n_citas = self._medir("vista previa: citas afectadas", afectadas.count)
+        plan = self._medir("vista previa: plan (diff)", lambda: plan_excepciones(docente_ids, fi, ff, reemplazar=True))
+        self.stdout.write(f"  citas afectadas: {n_citas} | a crear: {len(plan['crear'])} | a reemplazar: {plan['borrar']}")
+
+        r = self._medir("aplicar (bulk, reemplazar)", lambda: aplicar_excepciones(
+            docente_ids, fi, ff, nombre="bench", reemplazar=True))
+        self.stdout.write(f"  creadas: {r['creadas']} | borradas: {r['borradas']}")
+        canceladas = self._medir("cancelar citas (una UPDATE)", lambda: cancelar_citas_afectadas(
+            citas_afectadas(docente_ids, fi, ff), None, "bench"))
+        self.stdout.write(f"  canceladas: {canceladas}")
+        # on_commit no corre dentro de la transacción revertida: se mide aparte
+        self._medir("refrescar SlotLibre + caché", lambda: refrescar_slots(docente_ids, list(fechas_entre(fi, ff))))
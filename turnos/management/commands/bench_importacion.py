@@ -0,0 +1,91 @@
+import csv
+import os
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from turnos.importacion import TAM_LOTE, importar_docentes, importar_estudiantes, lineas_csv
+from turnos.services import CLAVE_CACHE_HORIZONTE
+from turnos.sinteticos import (
+    CAMPOS_DOCENTES, CAMPOS_ESTUDIANTES, DOMINIO, escribir_csv, existen, filas_docentes, filas_estudiantes,
+)
+
+IMPORTADORES = {
+    "estudiantes": (importar_estudiantes, CAMPOS_ESTUDIANTES, filas_estudiantes),
+    "docentes": (importar_docentes, CAMPOS_DOCENTES, filas_docentes),
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las importaciones CSV de estudiantes y docentes sobre archivos sintéticos de varios "
+        "tamaños: filas/s y consultas, en la primera carga y al reimportar el mismo archivo. "
+        "Cada medición corre en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", default="1000,10000,50000",
+                            help="Tamaños separados por coma (filas de datos por archivo)")
+        parser.add_argument("--tipo", choices=["todos", *IMPORTADORES], default="todos")
+        parser.add_argument("--lote", type=int, default=TAM_LOTE)
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        try:
+            tamanos = [int(x) for x in opts["filas"].split(",") if x.strip()]
+        except ValueError:
+            raise CommandError("--filas debe ser una lista de enteros separados por coma.")
+        if not tamanos or min(tamanos) <= 0 or opts["lote"] <= 0:
+            raise CommandError("--filas y --lote deben ser mayores que 0.")
+        if existen():
+            raise CommandError(f"Hay datos sintéticos (@{DOMINIO}) que falsearían la medición; "
+                               "bórralos con generar_datos_sinteticos --solo-limpiar.")
+        tipos = list(IMPORTADORES) if opts["tipo"] == "todos" else [opts["tipo"]]
+
+        self.stdout.write(f"{'tipo':<12} {'filas':>7} {'pasada':<11} {'seg':>8} {'filas/s':>9} "
+                          f"{'consultas':>10} {'consultas/1k':>13}")
+        with tempfile.TemporaryDirectory() as carpeta:
+            for tipo in tipos:
+                for n in tamanos:
+                    self._medir_tamano(tipo, n, carpeta, opts)
+        self.stdout.write("SlotLibre de los docentes se refresca al confirmar: no entra en la medición.")
+
+    def _medir_tamano(self, tipo, n, carpeta, opts):
+        funcion, campos, generador = IMPORTADORES[tipo]
+        # filas_estudiantes produce una fila por relación: se corta en n filas exactas
+        filas = (f for f, _ in zip(generador(n, opts["semilla"]), range(n)))
+        ruta = os.path.join(carpeta, f"{tipo}_{n}.csv")
+        escribir_csv(ruta, campos, filas)
+        try:
+            with transaction.atomic():
+                for pasada in ("nueva", "reimportar"):
+                    self._medir(tipo, n, pasada, funcion, ruta, opts["lote"])
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            cache.delete(CLAVE_CACHE_HORIZONTE)
+
+    def _medir(self, tipo, n, pasada, funcion, ruta, lote):
+        consultas = 0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal consultas
+            consultas += 1
+            return execute(sql, params, many, context)
+
+        with open(ruta, "rb") as f, connection.execute_wrapper(contar):
+            t0 = time.monotonic()
+            r = funcion(csv.DictReader(lineas_csv(f)), tam_lote=lote)
+            seg = time.monotonic() - t0
+        if r["errores"]:
+            self.stderr.write(f"  {len(r['errores'])} filas con error, p. ej. {r['errores'][0]}")
+        self.stdout.write(f"{tipo:<12} {r['filas']:>7} {pasada:<11} {seg:>8.2f} {r['filas'] / seg:>9.0f} "
+                          f"{consultas:>10} {consultas * 1000 / r['filas']:>13.1f}")
@@ -0,0 +1,123 @@
+import random
+import time as reloj
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from turnos import intervalos
+from turnos.services import _merge, _subtract, _split_en_bloques
+
+
+def _aware(fecha, t, tz):
+    return timezone.make_aware(datetime.combine(fecha, t), tz)
+
+
+def _referencia(fecha, bases, extras, bloqueos, citas, minutos, min_inicio, tz):
+    """Cálculo de un día con las utilidades de datetimes aware (implementación original)."""
+    union = _merge([(s, e) for s, e in ((_aware(fecha, a, tz), _aware(fecha, b, tz)) for a, b in bases + extras) if e > s])
+    bl = [(s, e) for s, e in ((_aware(fecha, a, tz), _aware(fecha, b, tz)) for a, b in bloqueos) if e > s]
+    disponible = _subtract(union, _merge(bl))
+    disponible = _subtract(disponible, _merge(citas))
+    alineados = []
+    for s, e in disponible:
+        resto = (s.hour * 60 + s.minute) % minutos
+        if resto != 0 or s.second or s.microsecond:
+            delta = minutos - resto if resto != 0 else 0
+            s = s.replace(second=0, microsecond=0) + timedelta(minutes=delta)
+        if s < e:
+            alineados.append((s, e))
+    return [dt for dt in _split_en_bloques(alineados, minutos) if dt >= min_inicio]
+
+
+class Command(BaseCommand):
+    help = "Compara el cálculo de slots con datetimes aware vs. el kernel en minutos (Python y NumPy). No toca la base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=8400, help="Días-docente a calcular (300 docentes x 28 días = 8400)")
+        parser.add_argument("--repeticiones", type=int, default=3)
+        parser.add_argument("--semilla", type=int, default=42)
+
+    def _generar(self, n, rnd, tz):
+        hoy = timezone.localdate()
+        casos = []
+        for i in range(n):
+            fecha = hoy + timedelta(days=i % 28)
+            def franja(h0, h1):
+                a = time(rnd.randint(h0, h1), rnd.choice([0, 5, 10, 15, 30, 45]))
+                b = time(min(23, a.hour + rnd.randint(1, 3)), rnd.choice([0, 10, 20, 30]))
+                return a, b
+            bases = [franja(7, 9), franja(10, 14)]
+            extras = [franja(15, 17)] if rnd.random() < 0.2 else []
+            bloqueos = [franja(8, 12)] if rnd.random() < 0.2 else []
+            minutos = rnd.choice([15, 20, 30])
+            citas = []
+            for _ in range(rnd.randint(0, 6)):
+                ini = _aware(fecha, time(rnd.randint(7, 15), rnd.choice([0, 15, 20, 30, 40, 45])), tz)
+                if rnd.random() < 0.05:
+                    ini += timedelta(seconds=rnd.randint(1, 59))
+                citas.append((ini, ini + timedelta(minutes=minutos)))
+            casos.append((fecha, bases, extras, bloqueos, citas, minutos))
+        return casos
+
+    def handle(self, *args, **opts):
+        if opts["filas"] <= 0:
+            raise CommandError("--filas debe ser > 0")
+        tz = timezone.get_current_timezone()
+        rnd = random.Random(opts["semilla"])
+        casos = self._generar(opts["filas"], rnd, tz)
+        min_inicio = timezone.localtime(timezone.now(), tz) + timedelta(hours=24)
+
+        def ref():
+            return [_referencia(f, b, x, bl, c, m, min_inicio, tz) for f, b, x, bl, c, m in casos]
+
+        def filas_min():
+            return [
+                (
+                    [(intervalos.minutos_de(a), intervalos.minutos_de(b)) for a, b in bases],
+                    [(intervalos.minutos_de(a), intervalos.minutos_de(b)) for a, b in extras],
+                    [(intervalos.minutos_de(a), intervalos.minutos_de(b)) for a, b in bloqueos],
+                    [intervalos.intervalo_local(s, e, f, tz) for s, e in citas],
+                )
+                for f, bases, extras, bloqueos, citas, _ in casos
+            ]
+
+        def borde(inicios):
+            return [intervalos.a_datetimes(c[0], mins, tz) for c, mins in zip(casos, inicios)]
+
+        def py():
+            desde = [intervalos.desde_minuto(c[0], min_inicio, tz) for c in casos]
+            return borde([intervalos.slots_dia(*fila, c[5], d) for fila, c, d in zip(filas_min(), casos, desde)])
+
+        def vec():
+            desde = [intervalos.desde_minuto(c[0], min_inicio, tz) for c in casos]
+            return borde(intervalos.slots_lote(filas_min(), [c[5] for c in casos], desde, vectorizado=True))
+
+        variantes = [("datetimes (original)", ref), ("minutos (Python)", py)]
+        if intervalos.np is not None:
+            variantes.append(("minutos (NumPy)", vec))
+        else:
+            self.stdout.write(self.style.WARNING("NumPy no está instalado: se omite la variante vectorizada."))
+
+        esperado = None
+        base_t = None
+        for nombre, fn in variantes:
+            tiempos = []
+            for _ in range(opts["repeticiones"]):
+                t0 = reloj.perf_counter()
+                salida = fn()
+                tiempos.append(reloj.perf_counter() - t0)
+            # Comparación en la forma en que se publican (hora local ISO)
+            salida = [[timezone.localtime(dt, tz).isoformat() for dt in dia] for dia in salida]
+            if esperado is None:
+                esperado = salida
+            elif salida != esperado:
+                raise CommandError(f"'{nombre}' no coincide con la implementación original.")
+            mejor = min(tiempos)
+            base_t = base_t or mejor
+            self.stdout.write(
+                f"{nombre:<22} {mejor * 1000:9.1f} ms  ({len(casos) / mejor:,.0f} filas/s, x{base_t / mejor:.1f})"
+            )
+
+        total = sum(len(s) for s in esperado)
+        self.stdout.write(self.style.SUCCESS(f"Resultados idénticos: {len(casos)} filas, {total} slots."))
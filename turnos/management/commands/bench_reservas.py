@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import time as dtime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from turnos.models import PerfilDocente, DisponibilidadSemanal, Cita, EstadoCita
+from turnos.services import reservar_cita, obtener_slots, SlotOcupado
+from user.models import User
+
+PREFIJO = "bench_reservas_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de reservar_cita: varios hilos compiten por los mismos slots de un "
+        "docente temporal. Verifica que no haya dobles reservas y reporta el rendimiento. "
+        "Los datos temporales se eliminan al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--slots", type=int, default=20, help="Slots en disputa (todos los hilos intentan todos)")
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **options):
+        hilos, n_slots = options["hilos"], options["slots"]
+        if hilos <= 0 or n_slots <= 0:
+            raise CommandError("--hilos y --slots deben ser mayores que 0.")
+        nombre = str(connection.settings_dict["NAME"])
+        if connection.vendor == "sqlite" and (nombre in ("", ":memory:") or "mode=memory" in nombre):
+            raise CommandError("La prueba necesita una base compartida entre hilos (no SQLite en memoria).")
+        if User.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError(f"Quedan datos de una ejecución anterior (usuarios '{PREFIJO}*'); elimínalos primero.")
+
+        # Correo en memoria: se mide la reserva, no el envío
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            docente, reps = self._crear_datos(hilos * n_slots)
+            try:
+                self._ejecutar(docente, reps, hilos, n_slots, options["semilla"])
+            finally:
+                Cita.objects.filter(docente=docente).delete()
+                docente.delete()
+                User.objects.filter(username__startswith=PREFIJO).delete()
+
+    def _crear_datos(self, n_reps):
+        usuario = User.objects.create(username=f"{PREFIJO}docente", first_name="Bench", last_name="Reservas")
+        docente = PerfilDocente.objects.create(usuario=usuario, minutos_por_bloque=20)
+        for dia in range(7):
+            DisponibilidadSemanal.objects.create(docente=docente, dia_semana=dia,
+                                                 hora_inicio=dtime(7, 0), hora_fin=dtime(18, 0))
+        User.objects.bulk_create([User(username=f"{PREFIJO}rep{i}") for i in range(n_reps)])
+        reps = list(User.objects.filter(username__startswith=f"{PREFIJO}rep").order_by("pk"))
+        return docente, reps
+
+    def _ejecutar(self, docente, reps, hilos, n_slots, semilla):
+        fecha = timezone.localdate() + timedelta(days=3)
+        slots = obtener_slots(docente, fecha)[:n_slots]
+        if len(slots) < n_slots:
+            raise CommandError(f"Solo hay {len(slots)} slots libres el {fecha}.")
+
+        resultados = Counter()
+        lock = threading.Lock()
+        barrera = threading.Barrier(hilos)
+
+        def trabajador(idx):
+            rnd = random.Random(semilla + idx)
+            orden = slots[:]
+            rnd.shuffle(orden)
+            locales = Counter()
+            try:
+                barrera.wait()
+                for k, inicio in enumerate(orden):
+                    # un representante distinto por intento: no interfieren los límites por día/semana
+                    rep = reps[idx * n_slots + k]
+                    try:
+                        reservar_cita(docente=docente, representante=rep, curso_estudiante="Bench",
+                                      nombre_estudiante="Bench", motivo="bench", inicio=inicio)
+                        locales["reservadas"] += 1
+                    except SlotOcupado:
+                        locales["ocupado"] += 1
+                    except ValidationError as e:
+                        # p. ej. el prefiltro de slot_disponible ya vio el slot tomado
+                        locales[f"rechazada: {'; '.join(e.messages)}"] += 1
+                    except Exception as e:
+                        locales[f"error {type(e).__name__}: {e}"[:120]] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    resultados.update(locales)
+
+        t0 = time.monotonic()
+        ts = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        segundos = time.monotonic() - t0
+
+        intentos = hilos * n_slots
+        citas = list(Cita.objects.filter(docente=docente, estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA])
+                     .order_by("inicio").values_list("inicio", "fin"))
+        solapes = sum(1 for a, b in zip(citas, citas[1:]) if b[0] < a[1])
+
+        self.stdout.write(f"Hilos: {hilos} | slots en disputa: {n_slots} | intentos: {intentos} | {fecha}")
+        self.stdout.write(f"Tiempo: {segundos:.2f}s | {intentos / segundos:.1f} intentos/s | "
+                          f"{resultados['reservadas'] / segundos:.1f} reservas/s")
+        for clave, n in sorted(resultados.items()):
+            self.stdout.write(f"  {clave}: {n}")
+
+        if solapes or len(citas) != resultados["reservadas"] or len(citas) > n_slots:
+            raise CommandError(f"Doble reserva detectada: {len(citas)} citas activas, {solapes} solapes.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Sin dobles reservas: {len(citas)} citas para {n_slots} slots."
+        ))
@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from turnos.models import PerfilDocente
+from turnos.cache_slots import slots_rango_cacheados, estadisticas, reiniciar_estadisticas
+
+
+class Command(BaseCommand):
+    help = (
+        "Precarga la caché de slots de todos los docentes activos para los próximos días "
+        "y muestra los contadores de aciertos/fallos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=14, help="Días a precargar desde hoy (por defecto 14)")
+        parser.add_argument("--reiniciar-estadisticas", action="store_true",
+                            help="Pone a cero los contadores de aciertos/fallos antes de precargar")
+
+    def handle(self, *args, **options):
+        dias = options["dias"]
+        if dias <= 0:
+            raise CommandError("--dias debe ser mayor que 0.")
+        if options["reiniciar_estadisticas"]:
+            reiniciar_estadisticas()
+
+        desde = timezone.localdate()
+        hasta = desde + timedelta(days=dias - 1)
+        t0 = time.monotonic()
+        docentes = PerfilDocente.objects.filter(activo=True)
+        n = 0
+        for docente in docentes.iterator():
+            slots_rango_cacheados(docente, desde, hasta)
+            n += 1
+
+        stats = estadisticas()
+        total = stats["aciertos"] + stats["fallos"]
+        tasa = (100.0 * stats["aciertos"] / total) if total else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Caché de slots precargada: {n} docentes, {dias} días ({time.monotonic() - t0:.1f}s). "
+            f"Aciertos: {stats['aciertos']}, fallos: {stats['fallos']} ({tasa:.1f}% aciertos)."
+        ))
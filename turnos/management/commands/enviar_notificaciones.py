@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from turnos.emailing import TAM_LOTE_CORREOS, enviar_pendientes, purgar_enviadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Despacha la bandeja de salida de correos (NotificacionPendiente) por lotes, con una "
+        "conexión SMTP por lote y reintentos con espera creciente. Dejarlo corriendo junto al "
+        "servidor (systemd/supervisor), o usar --una-vez desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=TAM_LOTE_CORREOS, help="Correos por conexión")
+        parser.add_argument("--intervalo", type=float, default=5.0, help="Segundos entre consultas con la cola vacía")
+        parser.add_argument("--una-vez", action="store_true", help="Vaciar lo que esté listo para enviar y terminar")
+        parser.add_argument("--purgar-dias", type=int, default=30,
+                            help="Al iniciar, borrar las enviadas hace más de N días (0 = no borrar)")
+
+    def handle(self, *args, **options):
+        if options["lote"] <= 0 or options["intervalo"] <= 0:
+            raise CommandError("--lote e --intervalo deben ser mayores que 0.")
+        if options["purgar_dias"] > 0:
+            n = purgar_enviadas(options["purgar_dias"])
+            if n:
+                self.stdout.write(f"{n} notificación(es) enviadas purgadas.")
+
+        total = {"enviadas": 0, "fallidas": 0}
+        try:
+            while True:
+                close_old_connections()
+                r = enviar_pendientes(options["lote"])
+                if not r["enviadas"] and not r["fallidas"]:
+                    if options["una_vez"]:
+                        break
+                    time.sleep(options["intervalo"])
+                    continue
+                total = {k: total[k] + r[k] for k in total}
+                estilo = self.style.WARNING if r["fallidas"] else self.style.SUCCESS
+                self.stdout.write(estilo(f"Lote: {r['enviadas']} enviadas, {r['fallidas']} con error (se reintentan)."))
+        except KeyboardInterrupt:
+            self.stdout.write("Envío detenido.")
+        if options["una_vez"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Notificaciones: {total['enviadas']} enviadas, {total['fallidas']} con error."
+            ))
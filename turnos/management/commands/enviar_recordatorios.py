@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from turnos.recordatorios import TAM_LOTE, enviar_recordatorios, horas_recordatorio
+
+
+class Command(BaseCommand):
+    help = (
+        "Encola un recordatorio por correo para cada cita pendiente o confirmada que empieza dentro "
+        "de la ventana y aún no lo recibió (lo despacha enviar_notificaciones). Cada cita se marca "
+        "al encolarse: se puede programar cada pocos minutos con cron sin duplicar correos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--horas", type=int, default=None,
+                            help=f"Ventana en horas (por defecto TURNOS_RECORDATORIO_HORAS = {horas_recordatorio()})")
+        parser.add_argument("--lote", type=int, default=TAM_LOTE, help="Citas por consulta y transacción")
+
+    def handle(self, *args, **opts):
+        if (opts["horas"] is not None and opts["horas"] <= 0) or opts["lote"] <= 0:
+            raise CommandError("--horas y --lote deben ser mayores que 0.")
+        t0 = time.monotonic()
+        n = enviar_recordatorios(horas=opts["horas"], tam_lote=opts["lote"])
+        self.stdout.write(self.style.SUCCESS(f"Recordatorios encolados: {n} ({time.monotonic() - t0:.1f}s)."))
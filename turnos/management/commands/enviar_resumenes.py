@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from turnos.emailing import enviar_resumenes
+from user.models import FrecuenciaAvisos
+
+
+class Command(BaseCommand):
+    help = (
+        "Agrupa los avisos pendientes de los administradores con resumen (User.frecuencia_avisos) "
+        "en un correo por persona y los deja en la bandeja de salida (enviar_notificaciones). "
+        "Programar con cron: cada hora con --frecuencia HORA y una vez al día con --frecuencia DIA."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--frecuencia", choices=[FrecuenciaAvisos.HORA, FrecuenciaAvisos.DIA], required=True)
+
+    def handle(self, *args, **opts):
+        n = enviar_resumenes(opts["frecuencia"])
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes encolados: {n}."))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from turnos.sinteticos import DOMINIO, existen, generar_colegio, limpiar
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea un colegio sintético (docentes con franjas, excepciones, feriados, estudiantes, "
+        f"representantes con relaciones y un periodo de citas) identificado por el dominio @{DOMINIO}. "
+        "La misma semilla genera siempre los mismos datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docentes", type=int, default=40)
+        parser.add_argument("--estudiantes", type=int, default=1000)
+        parser.add_argument("--semanas", type=int, default=16, help="Duración del periodo (la mitad ya pasada)")
+        parser.add_argument("--citas-por-semana", type=int, default=3, help="Citas por docente y semana")
+        parser.add_argument("--excepciones-por-docente", type=int, default=4)
+        parser.add_argument("--feriados", type=int, default=3)
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--limpiar", action="store_true",
+                            help="Borra los datos sintéticos existentes antes de generar")
+        parser.add_argument("--solo-limpiar", action="store_true", help="Solo borra los datos sintéticos")
+
+    def handle(self, *args, **opts):
+        if opts["solo_limpiar"] or opts["limpiar"]:
+            r = limpiar()
+            self.stdout.write(f"Borrados: {r['usuarios']} usuarios, {r['estudiantes']} estudiantes, "
+                              f"{r['citas']} citas, {r['feriados']} feriados.")
+            if opts["solo_limpiar"]:
+                return
+        if min(opts["docentes"], opts["estudiantes"], opts["semanas"]) <= 0:
+            raise CommandError("--docentes, --estudiantes y --semanas deben ser mayores que 0.")
+        if min(opts["citas_por_semana"], opts["excepciones_por_docente"], opts["feriados"]) < 0:
+            raise CommandError("--citas-por-semana, --excepciones-por-docente y --feriados no pueden ser negativos.")
+        if existen():
+            raise CommandError(f"Ya hay datos sintéticos (@{DOMINIO}); usa --limpiar para regenerarlos.")
+
+        t0 = time.monotonic()
+        r = generar_colegio(
+            docentes=opts["docentes"], estudiantes=opts["estudiantes"], semanas=opts["semanas"],
+            citas_por_semana=opts["citas_por_semana"], excepciones_por_docente=opts["excepciones_por_docente"],
+            feriados=opts["feriados"], semilla=opts["semilla"], progreso=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Colegio sintético creado en {time.monotonic() - t0:.1f}s: {r['docentes']} docentes "
+            f"({r['franjas']} franjas, {r['excepciones']} excepciones), {r['estudiantes']} estudiantes, "
+            f"{r['representantes']} representantes, {r['relaciones']} relaciones, {r['feriados']} feriados, "
+            f"{r['citas']} citas, {r['slots_libres']} slots libres, {r['estadisticas']} filas de estadísticas."
+        ))
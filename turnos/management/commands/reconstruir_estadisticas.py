@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from turnos.estadisticas import reconstruir_estadisticas
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {valor} (usa AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye EstadisticaDiaria desde las citas (todas, o las del rango de fechas). "
+        "Las señales la mantienen al día; usar tras cargas masivas o si se sospecha de desfase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Primera fecha (AAAA-MM-DD)")
+        parser.add_argument("--hasta", help="Última fecha (AAAA-MM-DD)")
+
+    def handle(self, *args, **opts):
+        desde, hasta = _fecha(opts["desde"]), _fecha(opts["hasta"])
+        if desde and hasta and desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta.")
+        t0 = time.monotonic()
+        filas = reconstruir_estadisticas(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas: {filas} filas ({time.monotonic() - t0:.1f}s)."
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from turnos.models import PerfilDocente
+from turnos.services import reconstruir_slots_libres, dias_horizonte_slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye la tabla de slots libres (SlotLibre) para el horizonte móvil "
+        "y lo adelanta a hoy + días. Programar una vez al día (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None,
+                            help=f"Días del horizonte (por defecto TURNOS_HORIZONTE_SLOTS_DIAS = {dias_horizonte_slots()})")
+
+    def handle(self, *args, **options):
+        dias = options["dias"] or dias_horizonte_slots()
+        if dias <= 0:
+            raise CommandError("--dias debe ser mayor que 0.")
+        t0 = time.monotonic()
+        total = reconstruir_slots_libres(dias=dias)
+        self.stdout.write(self.style.SUCCESS(
+            f"Slots libres reconstruidos: {total} bloques, {PerfilDocente.objects.count()} docentes, "
+            f"{dias} días ({time.monotonic() - t0:.1f}s)."
+        ))
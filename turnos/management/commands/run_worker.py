@@ -0,0 +1,54 @@
+import time
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from turnos.trabajos import ejecutar, marcar_interrumpidos, reclamar
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de trabajos (importaciones CSV y bloqueo masivo): reclama los "
+        "trabajos pendientes y los ejecuta uno a uno. Dejarlo corriendo junto al servidor "
+        "(systemd/supervisor), o usar --una-vez desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre consultas con la cola vacía")
+        parser.add_argument("--una-vez", action="store_true", help="Vaciar la cola y terminar")
+        parser.add_argument("--max-trabajos", type=int, default=0, help="Terminar tras N trabajos (0 = sin límite)")
+        parser.add_argument("--interrumpido-minutos", type=int, default=30,
+                            help="Al iniciar, marcar FALLIDO lo que lleva ese tiempo EN_CURSO sin avance")
+
+    def handle(self, *args, **options):
+        if options["intervalo"] <= 0:
+            raise CommandError("--intervalo debe ser mayor que 0.")
+        n = marcar_interrumpidos(options["interrumpido_minutos"])
+        if n:
+            self.stdout.write(self.style.WARNING(f"{n} trabajo(s) interrumpido(s) marcados como fallidos."))
+
+        hechos = 0
+        try:
+            while not options["max_trabajos"] or hechos < options["max_trabajos"]:
+                close_old_connections()
+                trabajo = reclamar()
+                if trabajo is None:
+                    if options["una_vez"]:
+                        break
+                    time.sleep(options["intervalo"])
+                    continue
+                hechos += 1
+                self.stdout.write(f"Trabajo #{trabajo.pk} ({trabajo.get_tipo_display()})...")
+                t0 = time.monotonic()
+                try:
+                    trabajo = ejecutar(trabajo)
+                except Exception:
+                    self.stderr.write(traceback.format_exc())
+                    self.stdout.write(self.style.ERROR(f"  #{trabajo.pk} falló ({time.monotonic() - t0:.1f}s)."))
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"  #{trabajo.pk} completado ({time.monotonic() - t0:.1f}s): {trabajo.resultado}"
+                    ))
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
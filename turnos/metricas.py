@@ -0,0 +1,62 @@
+# turnos/metricas.py
+"""
+Métricas del dashboard de administración.
+
+Las cuatro cifras de "citas hoy" salen de una sola consulta con sumas
+condicionales sobre las filas de hoy de EstadisticaDiaria (a lo sumo una
+por docente y estado, sin importar cuántas citas haya). Todo el bloque
+se guarda como una instantánea en la caché por TURNOS_CACHE_METRICAS_SEGUNDOS,
+así la mayoría de las cargas del dashboard no consulta la base para esto.
+Cualquier cambio de una Cita (señal en turnos/signals.py, cancelación masiva
+en turnos/bloqueos.py) borra la instantánea al confirmar; el resto de
+cifras (docentes, representantes, bloqueos) se refrescan al vencer.
+"""
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    EstadisticaDiaria, EstadoCita, ExcepcionDisponibilidad, FeriadoInstitucional, PerfilDocente, PerfilRepresentante,
+    TipoExcepcion,
+)
+
+CLAVE_METRICAS = "turnos:metricas:dashboard"
+
+
+def _timeout() -> int:
+    return getattr(settings, "TURNOS_CACHE_METRICAS_SEGUNDOS", 60)
+
+
+def calcular_metricas(hoy) -> Dict:
+    metricas = EstadisticaDiaria.objects.filter(fecha=hoy).order_by().aggregate(
+        total_hoy=Coalesce(Sum("citas"), 0),
+        pend_hoy=Coalesce(Sum("citas", filter=Q(estado=EstadoCita.PENDIENTE)), 0),
+        conf_hoy=Coalesce(Sum("citas", filter=Q(estado=EstadoCita.CONFIRMADA)), 0),
+        canc_hoy=Coalesce(Sum("citas", filter=Q(estado=EstadoCita.CANCELADA)), 0),
+    )
+    metricas["docentes_activos"] = PerfilDocente.objects.filter(activo=True).count()
+    metricas["reps"] = PerfilRepresentante.objects.count()
+    # Excepciones BLOQUEO de hoy más los feriados vigentes que quitan horarios (no los de referencia)
+    metricas["bloqueos_hoy"] = (
+        ExcepcionDisponibilidad.objects.filter(fecha=hoy, tipo=TipoExcepcion.BLOQUEO).count()
+        + FeriadoInstitucional.objects.filter(fecha_inicio__lte=hoy, fecha_fin__gte=hoy, bloquea_agenda=True).count()
+    )
+    return metricas
+
+
+def metricas_dashboard() -> Dict:
+    """Instantánea en caché; se recalcula si venció, se invalidó o cambió el día."""
+    hoy = timezone.localdate()
+    instantanea = cache.get(CLAVE_METRICAS)
+    if instantanea is None or instantanea["hoy"] != hoy:
+        instantanea = {"hoy": hoy, **calcular_metricas(hoy)}
+        cache.set(CLAVE_METRICAS, instantanea, _timeout())
+    return instantanea
+
+
+def invalidar_metricas() -> None:
+    cache.delete(CLAVE_METRICAS)
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0004_feriadoinstitucional'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorizonteSlots',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cubierto_hasta', models.DateField(blank=True, null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Horizonte de slots',
+                'verbose_name_plural': 'Horizonte de slots',
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotLibre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('docente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots_libres', to='turnos.perfildocente')),
+            ],
+            options={
+                'verbose_name': 'Slot libre',
+                'verbose_name_plural': 'Slots libres',
+                'ordering': ['inicio'],
+                'indexes': [models.Index(fields=['docente', 'fecha'], name='turnos_slot_docente_c81311_idx'), models.Index(fields=['inicio', 'docente'], name='turnos_slot_inicio_dad2c1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotlibre',
+            constraint=models.UniqueConstraint(fields=('docente', 'inicio'), name='unico_slot_docente_inicio'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+def marcar_referencia(apps, schema_editor):
+    """
+    Hasta esta migración los feriados eran solo un registro: bloqueo_masivo
+    creaba además una ExcepcionDisponibilidad por docente y día (también en
+    los bloqueos por departamento, que guardaban el feriado sin departamento).
+    Esas filas no deben pasar a cerrar la agenda de todo el colegio: todas las
+    existentes quedan como solo referencia.
+    """
+    FeriadoInstitucional = apps.get_model("turnos", "FeriadoInstitucional")
+    FeriadoInstitucional.objects.using(schema_editor.connection.alias).update(bloquea_agenda=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0005_slotlibre_horizonteslots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feriadoinstitucional',
+            name='departamento',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='feriadoinstitucional',
+            name='bloquea_agenda',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(marcar_referencia, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feriadoinstitucional',
+            index=models.Index(fields=['fecha_inicio', 'fecha_fin'], name='turnos_feri_fecha_i_84c654_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0007_trabajo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cita',
+            index=models.Index(fields=['representante', 'inicio'], name='turnos_cita_represe_680b56_idx'),
+        ),
+    ]
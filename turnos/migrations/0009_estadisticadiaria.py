@@ -0,0 +1,36 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0008_cita_representante_inicio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('departamento', models.CharField(blank=True, max_length=120)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('CONFIRMADA', 'Confirmada'), ('CANCELADA', 'Cancelada')], max_length=12)),
+                ('citas', models.PositiveIntegerField(default=0)),
+                ('minutos', models.PositiveIntegerField(default=0)),
+                ('docente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='turnos.perfildocente')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria',
+                'verbose_name_plural': 'Estadísticas diarias',
+                'ordering': ['fecha', 'docente'],
+                'indexes': [models.Index(fields=['fecha', 'departamento'], name='turnos_esta_fecha_bdd67a_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticadiaria',
+            constraint=models.UniqueConstraint(fields=('fecha', 'docente', 'estado'), name='unica_estadistica_dia_docente_estado'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0009_estadisticadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=120, unique=True)),
+                ('asunto', models.CharField(max_length=200)),
+                ('destinatarios', models.JSONField(default=list)),
+                ('texto', models.TextField()),
+                ('html', models.TextField(blank=True)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIADA', 'Enviada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reservada_por', models.CharField(blank=True, max_length=32)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('creada_en', models.DateTimeField(auto_now_add=True)),
+                ('enviada_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación pendiente',
+                'verbose_name_plural': 'Notificaciones pendientes',
+                'ordering': ['creada_en'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='turnos_noti_estado_7168b9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('turnos', '0010_notificacionpendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=120)),
+                ('asunto', models.CharField(max_length=200)),
+                ('docente', models.CharField(blank=True, max_length=150)),
+                ('representante', models.CharField(blank=True, max_length=150)),
+                ('inicio', models.DateTimeField(blank=True, null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_resumen', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento para resumen',
+                'verbose_name_plural': 'Eventos para resumen',
+                'ordering': ['usuario', 'creado_en', 'pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eventoresumen',
+            constraint=models.UniqueConstraint(fields=('usuario', 'clave'), name='unico_evento_resumen_usuario_clave'),
+        ),
+    ]
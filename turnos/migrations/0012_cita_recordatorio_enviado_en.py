@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0011_eventoresumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cita',
+            name='recordatorio_enviado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,10 +1,11 @@
 # Create your models here.
 
+from datetime import datetime, time, timedelta
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
-from datetime import timedelta
 
 # ---------------------------------
 # Utilidades
@@ -19,6 +20,12 @@ DIAS_SEMANA = (
     (6, "Domingo"),
 )
 
+
+def inicio_del_dia(fecha, tz=None) -> datetime:
+    """Medianoche local (America/Guayaquil por defecto) de 'fecha', con zona horaria."""
+    return timezone.make_aware(datetime.combine(fecha, time.min), tz or timezone.get_current_timezone())
+
+
 # ---------------------------------
 # Perfiles
 # ---------------------------------
@@ -67,6 +74,32 @@ class EstadoCita(models.TextChoices):
     CANCELADA = "CANCELADA", "Cancelada"
 
 
+class CitaQuerySet(models.QuerySet):
+    """
+    Filtros por fecha local convertidos a límites de 'inicio' con zona
+    horaria (inicio >= medianoche, inicio < medianoche siguiente), así los
+    índices que empiezan o terminan en 'inicio' sirven. inicio__date envuelve
+    la columna en una conversión y obliga a recorrer todas las filas.
+    """
+
+    def entre(self, desde=None, hasta=None):
+        """Citas que empiezan en [desde, hasta] (fechas locales, ambas incluidas; None = sin límite)."""
+        qs = self
+        if desde:
+            qs = qs.filter(inicio__gte=inicio_del_dia(desde))
+        if hasta:
+            qs = qs.filter(inicio__lt=inicio_del_dia(hasta + timedelta(days=1)))
+        return qs
+
+    def en_fecha(self, fecha):
+        return self.entre(fecha, fecha)
+
+    def en_semana(self, fecha):
+        """Semana de lunes a domingo que contiene 'fecha'."""
+        lunes = fecha - timedelta(days=fecha.weekday())
+        return self.entre(lunes, lunes + timedelta(days=6))
+
+
 class Cita(models.Model):
     """
     Cita entre un representante y un docente.
@@ -100,6 +133,8 @@ class Cita(models.Model):
         related_name="citas_canceladas",
     )
     motivo_cancelacion = models.CharField(max_length=255, blank=True)
+    # Lo marca enviar_recordatorios (turnos/recordatorios.py); None = aún sin recordatorio
+    recordatorio_enviado_en = models.DateTimeField(null=True, blank=True)
     estudiante = models.ForeignKey(
         'turnos.Estudiante',
         null=True, blank=True,
@@ -107,6 +142,8 @@ class Cita(models.Model):
         related_name="citas"
     )
 
+    objects = CitaQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cita"
         verbose_name_plural = "Citas"
@@ -123,62 +160,29 @@ class Cita(models.Model):
             models.Index(fields=["docente", "inicio"]),
             models.Index(fields=["estado"]),
             models.Index(fields=["inicio"]),
+            # Del representante: "Mis citas" paginado por (inicio, id) y sus
+            # cupos por día/semana (rango de inicio; el estado se filtra en las
+            # pocas filas de ese rango)
+            models.Index(fields=["representante", "inicio"]),
         ]
 
     def __str__(self):
         return f"{self.inicio:%Y-%m-%d %H:%M} - {self.docente} con {self.nombre_estudiante}"
 
     def clean(self):
-        # No permitir pasado (a menos que tengas un flujo de carga histórica)
+        # Reglas en una sola pasada (ver turnos/validacion.py); los cupos del
+        # representante solo se aplican al reservar (reservar_cita).
+        if self.docente_id and self.inicio and self.fin:
+            from .validacion import validar_reserva, error_de
+            motivos = validar_reserva(self.docente, self.inicio, self.fin, excluir_pk=self.pk)
+            if motivos:
+                raise error_de(motivos)
+            return
         if self.inicio and self.inicio < timezone.now():
             raise ValidationError("No se permiten citas en el pasado.")
-
         if self.fin and self.inicio and self.fin <= self.inicio:
             raise ValidationError("La hora fin debe ser mayor que la hora inicio.")
 
-        # Respetar máximo diario del docente (si está definido)
-        if self.docente and self.inicio:
-            if self.docente.maximo_citas_diarias:
-                tz = timezone.get_current_timezone()
-                fecha_local = timezone.localtime(self.inicio, tz).date()
-                conteo = (
-                    Cita.objects.filter(
-                        docente=self.docente,
-                        inicio__date=fecha_local,
-                        estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA],
-                    )
-                    .exclude(pk=self.pk)
-                    .count()
-                )
-                if conteo >= self.docente.maximo_citas_diarias:
-                    raise ValidationError("El docente alcanzó el máximo de citas para ese día.")
-
-        # 2.a) Antelación mínima 24h
-        if self.inicio and self.inicio < timezone.now() + timedelta(hours=24):
-            raise ValidationError("Debes reservar con al menos 24 horas de antelación.")
-
-        # 2.b) Alineación a bloques del docente
-        if self.docente and self.inicio and self.fin:
-            tam = self.docente.minutos_por_bloque
-            dur = int((self.fin - self.inicio).total_seconds() // 60)
-            if dur != tam:
-                raise ValidationError(f"La duración de la cita debe ser exactamente {tam} minutos.")
-            # inicio alineado: minutos y segundos relativos a 00:00 deben ser múltiplo de tam
-            minutos_desde_medianoche = self.inicio.hour * 60 + self.inicio.minute
-            if minutos_desde_medianoche % tam != 0 or self.inicio.second != 0:
-                raise ValidationError("La hora de inicio debe coincidir con el tamaño del bloque del docente.")
-
-        # 2.c) Solape con otras citas del mismo docente
-        if self.docente and self.inicio and self.fin:
-            solapa = Cita.objects.filter(
-                docente=self.docente,
-                estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA],
-                inicio__lt=self.fin,
-                fin__gt=self.inicio,
-            ).exclude(pk=self.pk).exists()
-            if solapa:
-                raise ValidationError("El docente ya tiene una cita en ese rango de tiempo.")
-            
     @property
     def duracion_minutos(self) -> int:
         return int((self.fin - self.inicio).total_seconds() // 60)
@@ -301,14 +305,236 @@ class FeriadoInstitucional(models.Model):
     fecha_fin = models.DateField()
     hora_inicio = models.TimeField(null=True, blank=True)  # si null => día completo
     hora_fin = models.TimeField(null=True, blank=True)
+    # vacío => todos los docentes; si no, solo los de ese departamento (sin distinguir mayúsculas)
+    departamento = models.CharField(max_length=120, blank=True)
+    # False => solo referencia: los bloqueos registrados antes de que el motor
+    # de slots leyera los feriados ya crearon sus ExcepcionDisponibilidad por
+    # docente; no quitan horarios por sí mismos (migración 0006)
+    bloquea_agenda = models.BooleanField(default=True)
     creado_en = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Feriado/Evento institucional"
         verbose_name_plural = "Feriados/Eventos institucionales"
         ordering = ["-fecha_inicio"]
+        indexes = [models.Index(fields=["fecha_inicio", "fecha_fin"])]
 
     def __str__(self):
+        alcance = f" / {self.departamento}" if self.departamento else ""
         if self.hora_inicio and self.hora_fin:
-            return f"{self.nombre} ({self.fecha_inicio}–{self.fecha_fin} {self.hora_inicio}-{self.hora_fin})"
-        return f"{self.nombre} ({self.fecha_inicio}–{self.fecha_fin} - día completo)"
+            return f"{self.nombre} ({self.fecha_inicio}–{self.fecha_fin} {self.hora_inicio}-{self.hora_fin}){alcance}"
+        return f"{self.nombre} ({self.fecha_inicio}–{self.fecha_fin} - día completo){alcance}"
+
+    def aplica_a(self, departamento: str) -> bool:
+        return not self.departamento or self.departamento.strip().lower() == (departamento or "").strip().lower()
+
+
+# --- Slots libres materializados ---
+
+class SlotLibre(models.Model):
+    """
+    Bloque reservable precalculado de un docente (una fila por bloque libre).
+    Se mantiene con señales (turnos/signals.py) dentro del horizonte
+    materializado y se reconstruye con `manage.py reconstruir_slots`.
+    No aplica la regla de 24h: se filtra al consultar.
+    """
+    docente = models.ForeignKey(PerfilDocente, on_delete=models.CASCADE, related_name="slots_libres")
+    fecha = models.DateField()  # fecha local del inicio
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Slot libre"
+        verbose_name_plural = "Slots libres"
+        ordering = ["inicio"]
+        constraints = [
+            models.UniqueConstraint(fields=["docente", "inicio"], name="unico_slot_docente_inicio"),
+        ]
+        indexes = [
+            models.Index(fields=["docente", "fecha"]),
+            models.Index(fields=["inicio", "docente"]),
+        ]
+
+    def __str__(self):
+        return f"{self.inicio:%Y-%m-%d %H:%M} / {self.docente}"
+
+
+class HorizonteSlots(models.Model):
+    """
+    Hasta qué fecha está materializada la tabla SlotLibre (una sola fila, pk=1).
+    Fuera de [hoy, cubierto_hasta] los slots se calculan al vuelo.
+    """
+    cubierto_hasta = models.DateField(null=True, blank=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Horizonte de slots"
+        verbose_name_plural = "Horizonte de slots"
+
+    def __str__(self):
+        return f"Slots materializados hasta {self.cubierto_hasta or '—'}"
+
+
+# --- Estadísticas agregadas ---
+
+class EstadisticaDiaria(models.Model):
+    """
+    Citas y minutos reservados por (fecha local, docente, estado). Los
+    reportes suman estas filas en lugar de recorrer Cita: su costo depende de
+    los días y docentes del rango, no de la cantidad de citas. Se mantiene
+    por (docente, fecha) al cambiar una Cita (turnos/estadisticas.py) y se
+    reconstruye con `manage.py reconstruir_estadisticas`.
+    """
+    fecha = models.DateField()
+    docente = models.ForeignKey(PerfilDocente, on_delete=models.CASCADE, related_name="estadisticas")
+    departamento = models.CharField(max_length=120, blank=True)  # copia del docente, sin JOIN al filtrar
+    estado = models.CharField(max_length=12, choices=EstadoCita.choices)
+    citas = models.PositiveIntegerField(default=0)
+    minutos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Estadística diaria"
+        verbose_name_plural = "Estadísticas diarias"
+        ordering = ["fecha", "docente"]
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "docente", "estado"], name="unica_estadistica_dia_docente_estado"),
+        ]
+        indexes = [models.Index(fields=["fecha", "departamento"])]
+
+    def __str__(self):
+        return f"{self.fecha} {self.docente_id} {self.estado}: {self.citas}"
+
+
+# --- Trabajos en segundo plano ---
+
+class TipoTrabajo(models.TextChoices):
+    IMPORTAR_ESTUDIANTES = "IMP_EST", "Importar estudiantes"
+    IMPORTAR_DOCENTES = "IMP_DOC", "Importar docentes"
+    BLOQUEO_MASIVO = "BLOQUEO", "Bloqueo masivo"
+
+
+class EstadoTrabajo(models.TextChoices):
+    PENDIENTE = "PENDIENTE", "Pendiente"
+    EN_CURSO = "EN_CURSO", "En curso"
+    COMPLETADO = "COMPLETADO", "Completado"
+    FALLIDO = "FALLIDO", "Fallido"
+
+
+class Trabajo(models.Model):
+    """
+    Importación u operación masiva encolada desde el panel. La ejecuta
+    `manage.py run_worker` (turnos/trabajos.py) por lotes, actualizando el
+    avance que consulta la página de estado.
+    """
+    tipo = models.CharField(max_length=10, choices=TipoTrabajo.choices)
+    estado = models.CharField(max_length=10, choices=EstadoTrabajo.choices, default=EstadoTrabajo.PENDIENTE)
+    parametros = models.JSONField(default=dict, blank=True)
+    archivo = models.FileField(upload_to="trabajos/", blank=True)
+    creado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="trabajos"
+    )
+
+    total = models.PositiveIntegerField(null=True, blank=True)  # estimado; None = desconocido
+    procesados = models.PositiveIntegerField(default=0)
+    total_errores = models.PositiveIntegerField(default=0)
+    errores = models.JSONField(default=list, blank=True)  # primeros [fila, mensaje]
+    resultado = models.TextField(blank=True)
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    actualizado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo en segundo plano"
+        verbose_name_plural = "Trabajos en segundo plano"
+        ordering = ["-creado_en"]
+        indexes = [models.Index(fields=["estado", "creado_en"])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (EstadoTrabajo.COMPLETADO, EstadoTrabajo.FALLIDO)
+
+    def porcentaje(self):
+        if self.estado == EstadoTrabajo.COMPLETADO:
+            return 100
+        if not self.total:
+            return None
+        return min(99, int(self.procesados * 100 / self.total))
+
+    def eta_segundos(self):
+        """Tiempo restante estimado con el ritmo medio desde que empezó."""
+        if self.estado != EstadoTrabajo.EN_CURSO or not self.total or not self.procesados or not self.iniciado_en:
+            return None
+        transcurrido = (timezone.now() - self.iniciado_en).total_seconds()
+        restantes = max(0, self.total - self.procesados)
+        return int(transcurrido / self.procesados * restantes)
+
+
+# --- Correo saliente ---
+
+class EstadoNotificacion(models.TextChoices):
+    PENDIENTE = "PENDIENTE", "Pendiente"
+    ENVIADA = "ENVIADA", "Enviada"
+    FALLIDA = "FALLIDA", "Fallida"
+
+
+class NotificacionPendiente(models.Model):
+    """
+    Correo en la bandeja de salida. Se escribe en la misma transacción que
+    el cambio que lo origina (si se revierte, no se envía) y lo despacha
+    `manage.py enviar_notificaciones` (turnos/emailing.py). 'clave' evita
+    duplicados: la misma notificación encolada dos veces se guarda una vez.
+    """
+    clave = models.CharField(max_length=120, unique=True)
+    asunto = models.CharField(max_length=200)
+    destinatarios = models.JSONField(default=list)
+    texto = models.TextField()
+    html = models.TextField(blank=True)
+
+    estado = models.CharField(max_length=10, choices=EstadoNotificacion.choices, default=EstadoNotificacion.PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    reservada_por = models.CharField(max_length=32, blank=True)  # lote del worker que la está enviando
+    ultimo_error = models.TextField(blank=True)
+
+    creada_en = models.DateTimeField(auto_now_add=True)
+    enviada_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Notificación pendiente"
+        verbose_name_plural = "Notificaciones pendientes"
+        ordering = ["creada_en"]
+        indexes = [models.Index(fields=["estado", "proximo_intento"])]
+
+    def __str__(self):
+        return f"{self.asunto} → {', '.join(self.destinatarios)} ({self.get_estado_display()})"
+
+
+class EventoResumen(models.Model):
+    """
+    Reserva o cancelación pendiente de incluir en el resumen (por hora o
+    diario) de un administrador que no quiere un correo por evento. Las
+    agrupa enviar_resumenes() en un solo correo por destinatario.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="eventos_resumen")
+    clave = models.CharField(max_length=120)  # la de la notificación de origen
+    asunto = models.CharField(max_length=200)
+    docente = models.CharField(max_length=150, blank=True)
+    representante = models.CharField(max_length=150, blank=True)
+    inicio = models.DateTimeField(null=True, blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Evento para resumen"
+        verbose_name_plural = "Eventos para resumen"
+        ordering = ["usuario", "creado_en", "pk"]
+        constraints = [
+            models.UniqueConstraint(fields=["usuario", "clave"], name="unico_evento_resumen_usuario_clave"),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} ({self.usuario})"
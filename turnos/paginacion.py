@@ -0,0 +1,123 @@
+# turnos/paginacion.py
+"""
+Paginación por cursor (keyset) de listas de citas, ordenadas por (inicio, id).
+
+En lugar de Paginator (COUNT(*) sobre la consulta completa y OFFSET que
+recorre y descarta todas las filas anteriores), cada página pide las
+por_pagina + 1 citas posteriores (o anteriores) a la última vista:
+
+    WHERE inicio >= :inicio AND (inicio > :inicio OR id > :id)
+    ORDER BY inicio, id LIMIT :n
+
+que resuelve el índice de inicio (o (docente, inicio), (representante,
+inicio)), así la página N cuesta lo mismo que la primera. El cursor es
+opaco para el cliente (base64 de dirección, inicio e id); uno inválido
+vuelve a la primera página. No hay número de página ni total exacto: quien
+llama puede pasar un total aproximado barato (p. ej. desde EstadisticaDiaria).
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, List, Optional, Tuple, Union
+
+from django.db.models import Q
+
+POR_PAGINA = 25
+PARAMETRO = "cursor"
+SIGUIENTE, ANTERIOR = "s", "a"
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def codificar_cursor(direccion: str, inicio: datetime, pk: int) -> str:
+    micros = (inicio - _EPOCA) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f"{direccion}:{micros}:{pk}".encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Optional[str], Optional[Tuple[datetime, int]]]:
+    """(dirección, (inicio, pk)), o (None, None) si falta o no es válido."""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        direccion, micros, pk = texto.split(":")
+        if direccion not in (SIGUIENTE, ANTERIOR):
+            return None, None
+        return direccion, (_EPOCA + timedelta(microseconds=int(micros)), int(pk))
+    except (ValueError, UnicodeDecodeError, OverflowError):
+        return None, None
+
+
+class PaginaCursor:
+    """Página de resultados; se recorre como la lista de objetos (igual que Page)."""
+
+    def __init__(self, object_list: List, siguiente: Optional[str], anterior: Optional[str],
+                 total_aproximado: Optional[int] = None):
+        self.object_list = object_list
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.total_aproximado = total_aproximado
+        self.url_siguiente = self.url_anterior = ""
+
+    @property
+    def has_next(self) -> bool:
+        return self.siguiente is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.anterior is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+
+def paginar_por_cursor(qs, cursor: str = "", por_pagina: int = POR_PAGINA, descendente: bool = False,
+                       total: Union[None, int, Callable[[], Optional[int]]] = None) -> PaginaCursor:
+    """
+    Página de 'qs' (citas) a partir de 'cursor'. descendente=True ordena de
+    la más reciente a la más antigua. 'total' puede ser un valor o una
+    función (solo se llama una vez, para esta página).
+    """
+    direccion, clave = decodificar_cursor(cursor) if cursor else (None, None)
+    atras = direccion == ANTERIOR
+    # Páginas anteriores: se recorre al revés desde el cursor y se invierte el resultado
+    ascendente = descendente == atras
+    base = qs
+    if clave:
+        inicio, pk = clave
+        # El rango sobre inicio va aparte del OR para que el índice busque desde el cursor en vez de recorrerse
+        if ascendente:
+            qs = qs.filter(Q(inicio__gte=inicio), Q(inicio__gt=inicio) | Q(pk__gt=pk))
+        else:
+            qs = qs.filter(Q(inicio__lte=inicio), Q(inicio__lt=inicio) | Q(pk__lt=pk))
+    filas = list(qs.order_by(*(("inicio", "pk") if ascendente else ("-inicio", "-pk")))[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+
+    if atras:
+        if not hay_mas:
+            # Se llegó al principio: la primera página completa, no solo lo que quedaba antes del cursor
+            return paginar_por_cursor(base, "", por_pagina, descendente, total)
+        filas.reverse()
+        siguiente = codificar_cursor(SIGUIENTE, filas[-1].inicio, filas[-1].pk)
+        anterior = codificar_cursor(ANTERIOR, filas[0].inicio, filas[0].pk)
+    else:
+        siguiente = codificar_cursor(SIGUIENTE, filas[-1].inicio, filas[-1].pk) if hay_mas else None
+        anterior = codificar_cursor(ANTERIOR, filas[0].inicio, filas[0].pk) if clave and filas else None
+    return PaginaCursor(filas, siguiente, anterior, total() if callable(total) else total)
+
+
+def _url(request, cursor: Optional[str]) -> str:
+    if cursor is None:
+        return ""
+    q = request.GET.copy()
+    q[PARAMETRO] = cursor
+    q.pop("page", None)
+    return f"?{q.urlencode()}"
+
+
+def paginar(request, qs, por_pagina: int = POR_PAGINA, descendente: bool = False, total=None) -> PaginaCursor:
+    """paginar_por_cursor() con el cursor del GET; url_siguiente/url_anterior conservan los demás filtros."""
+    pagina = paginar_por_cursor(qs, request.GET.get(PARAMETRO, ""), por_pagina, descendente, total)
+    pagina.url_siguiente = _url(request, pagina.siguiente)
+    pagina.url_anterior = _url(request, pagina.anterior)
+    return pagina
@@ -0,0 +1,81 @@
+# turnos/recordatorios.py
+"""
+Recordatorios por correo antes de cada cita.
+
+enviar_recordatorios() toma las citas PENDIENTE/CONFIRMADA que empiezan
+dentro de las próximas TURNOS_RECORDATORIO_HORAS y aún no tienen
+recordatorio_enviado_en: un rango sobre el índice de inicio, de a
+TAM_LOTE filas y solo con las columnas que usa el correo (values_list),
+así la memoria no crece con las citas del día. Cada lote encola sus
+correos en la bandeja de salida (turnos/emailing.py) y marca sus citas en
+la misma transacción: una cita nunca recibe dos recordatorios, y la clave
+"cita:<pk>:recordatorio" lo impide también si dos ejecuciones se cruzan.
+Las citas marcadas salen del filtro, así que el siguiente lote es la
+misma consulta otra vez.
+"""
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .emailing import encolar_notificaciones
+from .exportacion import nombre_completo
+from .models import Cita, EstadoCita
+
+TAM_LOTE = 500
+
+
+def horas_recordatorio() -> int:
+    return getattr(settings, "TURNOS_RECORDATORIO_HORAS", 24)
+
+
+def citas_por_recordar(ahora, hasta):
+    # exclude(CANCELADA) equivale a estado__in=ESTADOS_ACTIVOS, pero SQLite no
+    # elige por él el índice de estado (que recorre todas las citas activas):
+    # usa el de inicio para el rango
+    return Cita.objects.filter(
+        inicio__gt=ahora, inicio__lte=hasta, recordatorio_enviado_en__isnull=True,
+    ).exclude(estado=EstadoCita.CANCELADA)
+
+
+def enviar_recordatorios(horas: Optional[int] = None, tam_lote: int = TAM_LOTE,
+                         progreso: Optional[Callable[[int], None]] = None) -> int:
+    """Encola los recordatorios pendientes de la ventana. Devuelve cuántas citas se marcaron."""
+    ahora = timezone.now()
+    hasta = ahora + timedelta(hours=horas or horas_recordatorio())
+    total = 0
+    while True:
+        with transaction.atomic():
+            filas = list(citas_por_recordar(ahora, hasta).order_by("inicio", "pk").values_list(
+                "pk", "inicio", "nombre_estudiante", "curso_estudiante",
+                "docente__usuario__first_name", "docente__usuario__last_name", "docente__usuario__username",
+                "docente__usuario__email", "representante__first_name", "representante__last_name",
+                "representante__username", "representante__email",
+            )[:tam_lote])
+            if not filas:
+                return total
+            encolar_notificaciones([
+                (
+                    f"cita:{pk}:recordatorio",
+                    "Recordatorio de cita",
+                    "emails/recordatorio_cita.html",
+                    {
+                        "docente": nombre_completo(d_nom, d_ape, d_usuario),
+                        "representante": nombre_completo(r_nom, r_ape, r_usuario),
+                        "inicio": inicio,
+                        "estudiante": estudiante,
+                        "curso": curso,
+                        "nombre_receptor": "Usuario",
+                    },
+                    [r_email, d_email],
+                )
+                for pk, inicio, estudiante, curso, d_nom, d_ape, d_usuario, d_email, r_nom, r_ape, r_usuario, r_email
+                in filas
+            ])
+            # Sin señales (UPDATE masivo): el recordatorio no cambia slots ni estadísticas
+            Cita.objects.filter(pk__in=[f[0] for f in filas]).update(recordatorio_enviado_en=ahora)
+        total += len(filas)
+        if progreso:
+            progreso(total)
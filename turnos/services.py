@@ -1,68 +1,23 @@
 # turnos/services.py
-from django.db import transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
 from django.utils import timezone
-from datetime import timedelta, datetime, time
-from typing import List, Tuple
-from .models import DisponibilidadSemanal, ExcepcionDisponibilidad, Cita, EstadoCita, PerfilDocente, TipoExcepcion, ValidationError
-from .emailing import enviar_notificacion, obtener_emails_admins
-
-
-
-def _esta_en_disponibilidad(docente, inicio_dt, fin_dt):
-    # 1) verificar excepciones (bloqueos anulan, extras habilitan fuera de la regla semanal)
-    fecha = inicio_dt.date()
-    t_ini, t_fin = inicio_dt.time(), fin_dt.time()
-    exc_bloqueo = docente.excepciones.filter(fecha=fecha, hora_inicio__lt=t_fin, hora_fin__gt=t_ini, tipo="BLOQUEO").exists()
-    if exc_bloqueo:
-        return False
-    exc_extra = docente.excepciones.filter(fecha=fecha, hora_inicio__lte=t_ini, hora_fin__gte=t_fin, tipo="EXTRA").exists()
-    if exc_extra:
-        return True
-    # 2) verificar disponibilidad semanal
-    dia = inicio_dt.weekday()  # 0=Lunes
-    return docente.disponibilidades.filter(dia_semana=dia, hora_inicio__lte=t_ini, hora_fin__gte=t_fin).exists()
-
-@transaction.atomic
-def reservar_cita(docente, representante, curso_estudiante, nombre_estudiante, motivo, inicio, minutos_bloque=20):
-    fin = inicio + timedelta(minutes=minutos_bloque)
-
-    # Ventana 24h
-    if inicio < timezone.now() + timedelta(hours=24):
-        raise ValidationError("Debes reservar con al menos 24 horas de antelación.")
-
-    # Disponibilidad
-    if not _esta_en_disponibilidad(docente, inicio, fin):
-        raise ValidationError("El docente no está disponible en ese horario.")
-
-    # Límites por día/semana del representante (valores fijos MVP)
-    fecha = timezone.localtime(inicio).date()
-    from .models import Cita, EstadoCita
-    diarias = Cita.objects.filter(representante=representante, inicio__date=fecha, estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA]).count()
-    if diarias >= 1:
-        raise ValidationError("Máximo 1 cita por día.")
-    semana_ini = fecha - timedelta(days=fecha.weekday())
-    semana_fin = semana_ini + timedelta(days=6)
-    semanales = Cita.objects.filter(representante=representante, inicio__date__range=(semana_ini, semana_fin), estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA]).count()
-    if semanales >= 2:
-        raise ValidationError("Máximo 2 citas por semana.")
-
-    # Crear cita (deja a clean() validar solapes y bloque)
-    cita = Cita(
-        docente=docente,
-        representante=representante,
-        curso_estudiante=curso_estudiante,
-        nombre_estudiante=nombre_estudiante,
-        motivo=motivo,
-        inicio=inicio,
-        fin=fin,
-        estado=EstadoCita.PENDIENTE,
-    )
-    cita.full_clean()
-    cita.save()
-    return cita
+import heapq
+import random
+from time import sleep
+from collections import defaultdict
+from datetime import timedelta, datetime, time, date
+from typing import Dict, List, Optional, Tuple
+from .models import DisponibilidadSemanal, ExcepcionDisponibilidad, Cita, EstadoCita, PerfilDocente, TipoExcepcion, ValidationError, SlotLibre, HorizonteSlots, FeriadoInstitucional
+from .emailing import encolar_notificacion
+from .validacion import validar_reserva, error_de
+from .intervalos import MINUTOS_DIA, minutos_de, intervalo_local, slots_lote, a_datetimes, desde_minuto
 
 
 # -------- utilidades de intervalos (aware) --------
+# Referencia con datetimes; el motor usa turnos.intervalos (minutos enteros).
 Intervalo = Tuple[datetime, datetime]
 
 def _merge(intervalos: List[Intervalo]) -> List[Intervalo]:
@@ -104,6 +59,197 @@ def _split_en_bloques(intervalos: List[Intervalo], minutos: int) -> List[datetim
     return starts
 
 # -------- core slots --------
+def _cargar_filas_agenda(ids, desde: date, hasta: date):
+    """
+    Carga DisponibilidadSemanal, ExcepcionDisponibilidad y Cita de los
+    docentes 'ids' para [desde, hasta] en 3 consultas y las agrupa como
+    intervalos en minutos desde la medianoche local (ver turnos.intervalos):
+      franjas[(docente_id, dia_semana)], extras/bloqueos/citas[(docente_id, fecha)]
+    más los feriados de la ventana (1 consulta) indexados por fecha (ver
+    _cargar_feriados).
+    """
+    tz = timezone.get_current_timezone()
+
+    franjas = defaultdict(list)
+    for d in DisponibilidadSemanal.objects.filter(docente_id__in=ids).only("docente_id","dia_semana","hora_inicio","hora_fin"):
+        franjas[(d.docente_id, d.dia_semana)].append((minutos_de(d.hora_inicio), minutos_de(d.hora_fin)))
+
+    extras = defaultdict(list)
+    bloqueos = defaultdict(list)
+    for ex in ExcepcionDisponibilidad.objects.filter(docente_id__in=ids, fecha__range=(desde, hasta)).only(
+        "docente_id","fecha","hora_inicio","hora_fin","tipo"
+    ):
+        iv = (minutos_de(ex.hora_inicio), minutos_de(ex.hora_fin))
+        if ex.tipo == TipoExcepcion.EXTRA:
+            extras[(ex.docente_id, ex.fecha)].append(iv)
+        elif ex.tipo == TipoExcepcion.BLOQUEO:
+            bloqueos[(ex.docente_id, ex.fecha)].append(iv)
+
+    citas = defaultdict(list)
+    for c in Cita.objects.entre(desde, hasta).filter(
+        docente_id__in=ids,
+        estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA],
+    ).only("docente_id","inicio","fin"):
+        fecha = timezone.localtime(c.inicio, tz).date()
+        citas[(c.docente_id, fecha)].append(intervalo_local(c.inicio, c.fin, fecha, tz))
+
+    return franjas, extras, bloqueos, citas, _cargar_feriados(desde, hasta)
+
+
+def _cargar_feriados(desde: date, hasta: date):
+    """
+    FeriadoInstitucional que tocan [desde, hasta], en una consulta:
+    {fecha: [(departamento en minúsculas o "" = todos, (ini, fin) en minutos)]}.
+    Sin horas => día completo. Los de solo referencia (bloquea_agenda=False) no cuentan.
+    """
+    por_fecha = defaultdict(list)
+    for fer in FeriadoInstitucional.objects.filter(
+        fecha_inicio__lte=hasta, fecha_fin__gte=desde, bloquea_agenda=True,
+    ).only(
+        "fecha_inicio","fecha_fin","hora_inicio","hora_fin","departamento"
+    ):
+        if fer.hora_inicio and fer.hora_fin:
+            iv = (minutos_de(fer.hora_inicio), minutos_de(fer.hora_fin))
+        else:
+            iv = (0, MINUTOS_DIA)
+        depto = fer.departamento.strip().lower()
+        for f in fechas_entre(max(fer.fecha_inicio, desde), min(fer.fecha_fin, hasta)):
+            por_fecha[f].append((depto, iv))
+    return por_fecha
+
+
+def _fila_docente_fecha(docente, fecha, filas):
+    franjas, extras, bloqueos, citas, feriados = filas
+    clave = (docente.pk, fecha)
+    bloqueos_dia = bloqueos.get(clave, [])
+    if fecha in feriados:
+        depto = (docente.departamento or "").strip().lower()
+        bloqueos_dia = bloqueos_dia + [iv for d, iv in feriados[fecha] if not d or d == depto]
+    return (
+        franjas.get((docente.pk, fecha.weekday()), []),
+        extras.get(clave, []),
+        bloqueos_dia,
+        citas.get(clave, []),
+    )
+
+
+def _minutos_lote(pares, filas, min_inicio, tz) -> List[List[int]]:
+    """
+    Inicios libres (minutos desde la medianoche local) de cada (docente, fecha)
+    de 'pares' con el kernel en minutos (ver intervalos.slots_lote).
+    """
+    return slots_lote(
+        [_fila_docente_fecha(d, f, filas) for d, f in pares],
+        [d.minutos_por_bloque or 20 for d, _ in pares],
+        [desde_minuto(f, min_inicio, tz) if min_inicio else 0 for _, f in pares],
+    )
+
+
+def _slots_lote(pares, filas, min_inicio, tz) -> List[List[datetime]]:
+    """_minutos_lote() convertido a datetimes aware al final."""
+    inicios = _minutos_lote(pares, filas, min_inicio, tz)
+    return [a_datetimes(f, mins, tz) for (_, f), mins in zip(pares, inicios)]
+
+
+def _min_inicio(tz) -> datetime:
+    # regla de 24h (MVP)
+    return timezone.localtime(timezone.now(), tz) + timedelta(hours=24)
+
+
+def fechas_entre(desde: date, hasta: date):
+    """Cada fecha de [desde, hasta], inclusive."""
+    fecha = desde
+    while fecha <= hasta:
+        yield fecha
+        fecha += timedelta(days=1)
+
+
+def fechas_dia_semana(dia_semana: int) -> List[date]:
+    """Fechas del horizonte materializado (SlotLibre) que caen en 'dia_semana'."""
+    tope = cubierto_hasta()
+    if not tope:
+        return []
+    f = timezone.localdate()
+    f += timedelta(days=(dia_semana - f.weekday()) % 7)
+    fechas = []
+    while f <= tope:
+        fechas.append(f)
+        f += timedelta(days=7)
+    return fechas
+
+
+def generar_minutos_docentes(docentes, desde: date, hasta: date, antelacion: bool = True) -> Dict[int, Dict[date, List[int]]]:
+    """
+    Slots libres de varios docentes para cada fecha de [desde, hasta] (inclusive),
+    como minutos desde la medianoche local (sin convertir a datetimes).
+    Carga las tablas una sola vez para todo el conjunto y la ventana
+    (4 consultas con los feriados, sin importar cuántos docentes o días).
+    Con antelacion=False no se filtra la regla de 24h (para materializar).
+    Devuelve {docente_id: {fecha: [minutos]}}.
+    """
+    docentes = list(docentes)
+    if hasta < desde or not docentes:
+        return {}
+    tz = timezone.get_current_timezone()
+    filas = _cargar_filas_agenda([d.pk for d in docentes], desde, hasta)
+    pares = [(d, f) for d in docentes for f in fechas_entre(desde, hasta)]
+    resultado: Dict[int, Dict[date, List[int]]] = {d.pk: {} for d in docentes}
+    min_inicio = _min_inicio(tz) if antelacion else None
+    for (d, f), mins in zip(pares, _minutos_lote(pares, filas, min_inicio, tz)):
+        resultado[d.pk][f] = mins
+    return resultado
+
+
+def generar_slots_docentes(docentes, desde: date, hasta: date, antelacion: bool = True) -> Dict[int, Dict[date, List[datetime]]]:
+    """
+    generar_minutos_docentes() en datetimes aware.
+    Devuelve {docente_id: {fecha: [datetimes aware]}}.
+    """
+    tz = timezone.get_current_timezone()
+    return {
+        pk: {f: a_datetimes(f, mins, tz) for f, mins in por_fecha.items()}
+        for pk, por_fecha in generar_minutos_docentes(docentes, desde, hasta, antelacion).items()
+    }
+
+
+def generar_slots_rango(docente: PerfilDocente, desde: date, hasta: date) -> Dict[date, List[datetime]]:
+    """
+    Igual que generar_slots() pero para cada fecha de [desde, hasta] (inclusive),
+    con un número fijo de consultas. Devuelve {fecha: [datetimes aware]}.
+    """
+    return generar_slots_docentes([docente], desde, hasta).get(docente.pk, {})
+
+
+def buscar_primeros_slots(docentes, desde: date, hasta: date, limite: int = 10) -> List[Tuple[datetime, PerfilDocente]]:
+    """
+    Los 'limite' slots libres más tempranos entre todos los 'docentes'
+    dentro de [desde, hasta]. Devuelve [(inicio aware, docente)] ordenado
+    por inicio (empates: por id de docente).
+    Carga todo en 4 consultas (ver generar_slots_docentes) y combina las
+    listas ya ordenadas de cada docente con un heap, día por día, cortando
+    en cuanto se completa el cupo.
+    """
+    docentes = {d.pk: d for d in docentes}
+    if limite <= 0 or hasta < desde or not docentes:
+        return []
+    tz = timezone.get_current_timezone()
+    filas = _cargar_filas_agenda(list(docentes), desde, hasta)
+    min_inicio = _min_inicio(tz)
+
+    resultado: List[Tuple[datetime, PerfilDocente]] = []
+    for fecha in fechas_entre(desde, hasta):
+        pares = [(d, fecha) for d in docentes.values()]
+        listas = [
+            [(s, d.pk) for s in slots]
+            for (d, _), slots in zip(pares, _slots_lote(pares, filas, min_inicio, tz)) if slots
+        ]
+        for s, pk in heapq.merge(*listas):
+            resultado.append((s, docentes[pk]))
+            if len(resultado) >= limite:
+                return resultado
+    return resultado
+
+
 def generar_slots(docente: PerfilDocente, fecha) -> List[datetime]:
     # ✅ Guardia defensiva: si no hay fecha, no cruja
     if not fecha:
@@ -118,71 +264,168 @@ def generar_slots(docente: PerfilDocente, fecha) -> List[datetime]:
       - Respeta tamaño de bloque docente.
       - Filtra pasado y regla de 24h (MVP: se aplica).
     """
+    if isinstance(fecha, str):
+        fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+    return generar_slots_rango(docente, fecha, fecha)[fecha]
+
+# -------- slots materializados (SlotLibre) --------
+CLAVE_CACHE_HORIZONTE = "turnos:horizonte_slots"
+
+
+def dias_horizonte_slots() -> int:
+    return getattr(settings, "TURNOS_HORIZONTE_SLOTS_DIAS", 60)
+
+
+def cubierto_hasta() -> Optional[date]:
+    """Última fecha materializada en SlotLibre (None si nunca se construyó)."""
+    valor = cache.get(CLAVE_CACHE_HORIZONTE)
+    if valor is None:
+        h = HorizonteSlots.objects.filter(pk=1).first()
+        valor = h.cubierto_hasta if h and h.cubierto_hasta else ""
+        cache.set(CLAVE_CACHE_HORIZONTE, valor, 300)
+    return valor or None
+
+
+def _ventana_materializada(desde: date, hasta: date):
+    """Intersección de [desde, hasta] con [hoy, cubierto_hasta], o None."""
+    tope = cubierto_hasta()
+    if not tope:
+        return None
+    d, h = max(desde, timezone.localdate()), min(hasta, tope)
+    return (d, h) if d <= h else None
+
+
+def recalcular_slots_libres(docentes, fechas=None) -> int:
+    """
+    Reemplaza las filas de SlotLibre de 'docentes' para 'fechas' (iterable de
+    date; None = todo el horizonte materializado). Solo toca fechas dentro de
+    [hoy, cubierto_hasta]. Devuelve el número de slots escritos.
+    """
+    docentes = [d for d in docentes if d is not None]
+    tope = cubierto_hasta()
+    if not docentes or not tope:
+        return 0
+    hoy = timezone.localdate()
+    if fechas is None:
+        fechas = list(fechas_entre(hoy, tope))
+    fechas = sorted({f for f in fechas if hoy <= f <= tope})
+    if not fechas:
+        return 0
+
+    activos = [d for d in docentes if d.activo]
+    ids = [d.pk for d in docentes]
+
+    def _reescribir():
+        # Bajo el bloqueo de los docentes (el mismo de reservar_cita): lo que
+        # se lee para calcular es lo que se escribe; dos recálculos del mismo
+        # docente no pueden pisarse con una foto vieja
+        bloquear_docentes(ids)
+        por_docente = generar_slots_docentes(activos, fechas[0], fechas[-1], antelacion=False)
+        nuevos = []
+        for d in activos:
+            minuto = d.minutos_por_bloque or 20
+            for f in fechas:
+                for s in por_docente[d.pk][f]:
+                    nuevos.append(SlotLibre(docente=d, fecha=f, inicio=s, fin=s + timedelta(minutes=minuto)))
+        SlotLibre.objects.filter(docente_id__in=ids, fecha__in=fechas).delete()
+        SlotLibre.objects.bulk_create(nuevos, batch_size=1000)
+        return len(nuevos)
+
+    return con_reintentos(_reescribir)
+
+
+def reconstruir_slots_libres(dias: int = None, docentes=None) -> int:
+    """
+    Reconstrucción completa de SlotLibre para [hoy, hoy + dias) y mueve el
+    horizonte. Borra filas de fechas pasadas.
+    """
+    dias = dias or dias_horizonte_slots()
+    hoy = timezone.localdate()
+    hasta = hoy + timedelta(days=dias - 1)
+    if docentes is None:
+        docentes = PerfilDocente.objects.all()
+    docentes = list(docentes)
+
+    with transaction.atomic():
+        HorizonteSlots.objects.update_or_create(pk=1, defaults={"cubierto_hasta": hasta})
+        cache.delete(CLAVE_CACHE_HORIZONTE)
+        SlotLibre.objects.filter(fecha__lt=hoy).delete()
+        SlotLibre.objects.filter(fecha__gt=hasta).delete()
+        total = 0
+        # por lotes para acotar memoria
+        for i in range(0, len(docentes), 50):
+            total += recalcular_slots_libres(docentes[i:i + 50])
+    return total
+
+
+def obtener_slots_rango(docente: PerfilDocente, desde: date, hasta: date) -> Dict[date, List[datetime]]:
+    """
+    Igual que generar_slots_rango(), pero dentro del horizonte materializado
+    responde con una sola consulta por rango sobre SlotLibre (docente, fecha).
+    Las fechas fuera del horizonte se calculan al vuelo.
+    """
+    if hasta < desde:
+        return {}
+    ventana = _ventana_materializada(desde, hasta)
+    if not ventana:
+        return generar_slots_rango(docente, desde, hasta)
+
+    # Fechas antes de ventana[0] ya pasaron: quedan vacías.
+    resultado: Dict[date, List[datetime]] = {f: [] for f in fechas_entre(desde, hasta)}
     tz = timezone.get_current_timezone()
+    for s in (SlotLibre.objects
+              .filter(docente=docente, fecha__range=ventana, inicio__gte=_min_inicio(tz))
+              .order_by("inicio").values_list("inicio", flat=True)):
+        resultado[timezone.localtime(s, tz).date()].append(s)
+    if hasta > ventana[1]:
+        resultado.update(generar_slots_rango(docente, ventana[1] + timedelta(days=1), hasta))
+    return resultado
+
+
+def obtener_minutos_docentes(docentes, desde: date, hasta: date) -> Dict[int, Dict[date, List[int]]]:
+    """
+    generar_minutos_docentes() servido desde SlotLibre: dentro del horizonte
+    materializado, una consulta para todos los docentes y días. Las fechas
+    fuera del horizonte se calculan al vuelo.
+    """
+    docentes = list(docentes)
+    if hasta < desde or not docentes:
+        return {}
+    ventana = _ventana_materializada(desde, hasta)
+    if not ventana:
+        return generar_minutos_docentes(docentes, desde, hasta)
+
+    # Fechas antes de ventana[0] ya pasaron: quedan vacías.
+    resultado = {d.pk: {f: [] for f in fechas_entre(desde, hasta)} for d in docentes}
+    tz = timezone.get_current_timezone()
+    for docente_id, fecha, inicio in (SlotLibre.objects
+                                      .filter(docente__in=[d.pk for d in docentes], fecha__range=ventana,
+                                              inicio__gte=_min_inicio(tz))
+                                      .order_by("inicio").values_list("docente_id", "fecha", "inicio")):
+        resultado[docente_id][fecha].append(minutos_de(timezone.localtime(inicio, tz).time()))
+    if hasta > ventana[1]:
+        for pk, por_fecha in generar_minutos_docentes(docentes, ventana[1] + timedelta(days=1), hasta).items():
+            resultado[pk].update(por_fecha)
+    return resultado
+
+
+def obtener_slots(docente: PerfilDocente, fecha) -> List[datetime]:
+    """generar_slots() servido desde SlotLibre cuando la fecha está materializada."""
+    if not fecha:
+        return []
     if isinstance(fecha, str):
         fecha = datetime.strptime(fecha, "%Y-%m-%d").date()
+    return obtener_slots_rango(docente, fecha, fecha)[fecha]
 
-    # 1) base de disponibilidad semanal del día
-    dia = fecha.weekday()  # 0=Lunes
-    bases: List[Intervalo] = []
-    for d in DisponibilidadSemanal.objects.filter(docente=docente, dia_semana=dia).order_by("hora_inicio"):
-        s = timezone.make_aware(datetime.combine(fecha, d.hora_inicio), tz)
-        e = timezone.make_aware(datetime.combine(fecha, d.hora_fin), tz)
-        if e > s:
-            bases.append((s,e))
-    bases = _merge(bases)
-
-    # 2) aplicar EXTRAS (sumar)
-    extras: List[Intervalo] = []
-    for ex in ExcepcionDisponibilidad.objects.filter(docente=docente, fecha=fecha, tipo=TipoExcepcion.EXTRA):
-        s = timezone.make_aware(datetime.combine(fecha, ex.hora_inicio), tz)
-        e = timezone.make_aware(datetime.combine(fecha, ex.hora_fin), tz)
-        if e > s:
-            extras.append((s,e))
-    union = _merge(bases + extras)
-
-    # 3) aplicar BLOQUEOS (restar)
-    bloqueos: List[Intervalo] = []
-    for bl in ExcepcionDisponibilidad.objects.filter(docente=docente, fecha=fecha, tipo=TipoExcepcion.BLOQUEO):
-        s = timezone.make_aware(datetime.combine(fecha, bl.hora_inicio), tz)
-        e = timezone.make_aware(datetime.combine(fecha, bl.hora_fin), tz)
-        if e > s:
-            bloqueos.append((s,e))
-    disponible = _subtract(union, _merge(bloqueos))
-
-    # 4) quitar citas existentes
-    citas_intervals: List[Intervalo] = []
-    for c in Cita.objects.filter(
-        docente=docente,
-        estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA],
-        inicio__date=fecha,
-    ).only("inicio","fin"):
-        citas_intervals.append((c.inicio, c.fin))
-    disponible = _subtract(disponible, _merge(citas_intervals))
-
-    # 5) partir en bloques del docente
-    minutos = docente.minutos_por_bloque or 20
-    # Alinear al tamaño de bloque (redondeo hacia arriba del inicio)
-    alineados = []
-    for s,e in disponible:
-        # redondear s al siguiente múltiplo
-        mins_mid = s.hour*60 + s.minute
-        resto = mins_mid % minutos
-        if resto != 0 or s.second or s.microsecond:
-            delta = minutos - resto if resto != 0 else 0
-            s = s.replace(second=0, microsecond=0) + timedelta(minutes=delta)
-        if s < e:
-            alineados.append((s,e))
-    disponible = alineados
-
-    starts = _split_en_bloques(disponible, minutos)
-
-    # 6) filtrar pasado y regla de 24h (MVP)
-    ahora = timezone.localtime(timezone.now(), tz)
-    min_inicio = ahora + timedelta(hours=24)
-    starts = [dt for dt in starts if dt >= min_inicio]
 
-    return starts
+def slot_disponible(docente: PerfilDocente, inicio: datetime) -> bool:
+    """¿'inicio' es un slot libre del docente? Una consulta indexada si está materializado."""
+    fecha = timezone.localtime(inicio).date()
+    if _ventana_materializada(fecha, fecha):
+        tz = timezone.get_current_timezone()
+        return inicio >= _min_inicio(tz) and SlotLibre.objects.filter(docente=docente, inicio=inicio).exists()
+    return inicio in generar_slots(docente, fecha)
+
 
 def _uniq_emails(emails: List[str]) -> List[str]:
     """Quita None/'' y duplicados preservando orden."""
@@ -195,7 +438,108 @@ def _uniq_emails(emails: List[str]) -> List[str]:
     return out
 
 
-@transaction.atomic
+class SlotOcupado(ValidationError):
+    """Otra reserva ganó la carrera por el mismo horario."""
+
+    def __init__(self, mensaje="El horario seleccionado acaba de ser reservado por otra persona. Elige otro."):
+        super().__init__(mensaje, code="slot_ocupado")
+
+
+# Reintentos ante "database is locked" (SQLite bajo carga) y espera base en segundos
+REINTENTOS_BLOQUEO = 5
+ESPERA_BLOQUEO = 0.05
+
+
+def bloquear_docentes(docente_ids) -> None:
+    """
+    Serializa las escrituras de esos docentes hasta el fin de la transacción.
+    Con SELECT ... FOR UPDATE bloquea sus filas de PerfilDocente (en orden de
+    id, para no cruzarse); SQLite no lo soporta y bloquea la base entera al
+    escribir, así que se adelanta ese bloqueo con un UPDATE sin cambios (debe
+    ser la primera sentencia de la transacción para que SQLite espere en
+    lugar de fallar).
+    """
+    ids = sorted({i for i in docente_ids if i})
+    if not ids:
+        return
+    if connection.features.has_select_for_update:
+        list(PerfilDocente.objects.select_for_update().filter(pk__in=ids).order_by("pk").values_list("pk", flat=True))
+    else:
+        PerfilDocente.objects.filter(pk__in=ids).update(activo=F("activo"))
+
+
+def _base_bloqueada(error: OperationalError) -> bool:
+    return "locked" in str(error).lower()
+
+
+def con_reintentos(funcion):
+    """
+    Ejecuta funcion() en su propia transacción y devuelve su resultado.
+    Si SQLite responde "database is locked" la repite con espera creciente
+    (dentro de una transacción externa no se puede: el error sube).
+    """
+    reintentos = 0 if connection.in_atomic_block else REINTENTOS_BLOQUEO
+    for intento in range(reintentos + 1):
+        try:
+            with transaction.atomic():
+                return funcion()
+        except OperationalError as e:
+            if not _base_bloqueada(e) or intento == reintentos:
+                raise
+            sleep(ESPERA_BLOQUEO * (2 ** intento) * (1 + random.random()))
+
+
+def _bloquear_docente(docente_id) -> None:
+    bloquear_docentes([docente_id])
+
+
+def _notificar_cita_creada(cita: Cita) -> None:
+    destinatarios = _uniq_emails([
+        cita.docente.usuario.email,
+        cita.representante.email,
+    ])
+    encolar_notificacion(
+        clave=f"cita:{cita.pk}:creada",
+        asunto="Nueva cita registrada",
+        template="emails/cita_creada.html",
+        contexto={
+            "docente": cita.docente.usuario.get_full_name() or cita.docente.usuario.username,
+            "representante": cita.representante.get_full_name() or cita.representante.username,
+            "inicio": cita.inicio,
+            "motivo": cita.motivo,
+            "estado": cita.get_estado_display(),
+            # opcional: tus templates pueden ignorar 'nombre_receptor' o usar un genérico
+            "nombre_receptor": "Usuario",
+        },
+        destinatarios=destinatarios,
+        copia_admins=True,
+    )
+
+
+def _guardar_cita_bloqueada(cita: Cita, representante) -> None:
+    """Dentro de transaction.atomic(): bloqueo, validación en una pasada y guardado."""
+    _bloquear_docente(cita.docente_id)
+
+    # Todas las reglas con dos consultas (día del docente, semana del representante)
+    motivos = validar_reserva(cita.docente, cita.inicio, cita.fin, representante=representante)
+    if any(m.codigo == "solape" for m in motivos):
+        raise SlotOcupado()
+    if motivos:
+        raise error_de(motivos)
+
+    # clean() repetiría las mismas consultas: solo se validan los campos
+    # (las FK ya vienen como objetos cargados)
+    cita.clean_fields(exclude=["docente", "representante", "estudiante", "cancelada_por"])
+    try:
+        with transaction.atomic():
+            cita.save()
+    except IntegrityError:
+        raise SlotOcupado()
+
+    # A la bandeja de salida en la misma transacción: sale solo si la reserva se confirma
+    _notificar_cita_creada(cita)
+
+
 def reservar_cita(
     *,
     docente: PerfilDocente,
@@ -209,10 +553,12 @@ def reservar_cita(
     """
     Crea una cita respetando:
       - Antelación ≥ 24h
-      - Slot válido según generar_slots()
-      - Límites (1 por día, 2 por semana)
-      - Anti-solape vía constraints/clean()
-    Además, envía notificación a Docente, Representante y Administradores.
+      - Slot válido según slot_disponible() (SlotLibre / generar_slots())
+      - Reglas de validar_reserva() bajo bloqueo por docente: bloque, máximo
+        diario, límites del representante (1 por día, 2 por semana) y
+        anti-solape (SlotOcupado si otra reserva ganó)
+    Reintenta si SQLite responde "database is locked". La notificación a
+    Docente, Representante y Administradores se encola en la misma transacción.
     """
     # normalizar zona/fin
     inicio = timezone.make_aware(inicio.replace(second=0, microsecond=0), timezone.get_current_timezone()) \
@@ -224,56 +570,25 @@ def reservar_cita(
     minuto = minutos_bloque or (docente.minutos_por_bloque or 20)
     fin = inicio + timedelta(minutes=minuto)
 
-    # validar que el slot exista (evita condiciones de carrera)
-    fecha = timezone.localtime(inicio).date()
-    starts = generar_slots(docente, fecha)  # lista de datetimes aware
-    if inicio not in starts:
+    # Horario dentro de la agenda del docente (lectura previa, sin bloqueo)
+    if not slot_disponible(docente, inicio):
         raise ValidationError("El horario seleccionado ya no está disponible.")
 
-    # límites por representante
-    semana_ini = fecha - timedelta(days=fecha.weekday())
-    semana_fin = semana_ini + timedelta(days=6)
-    q = Cita.objects.filter(representante=representante, estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA])
-    if q.filter(inicio__date=fecha).count() >= 1:
-        raise ValidationError("Máximo 1 cita por día.")
-    if q.filter(inicio__date__range=(semana_ini, semana_fin)).count() >= 2:
-        raise ValidationError("Máximo 2 citas por semana.")
-
-    cita = Cita(
-        docente=docente,
-        representante=representante,
-        curso_estudiante=curso_estudiante,
-        nombre_estudiante=nombre_estudiante,
-        motivo=motivo,
-        inicio=inicio,
-        fin=fin,
-        estado=EstadoCita.PENDIENTE,
-    )
-    cita.full_clean()
-    cita.save()
-
-    # Notificar: Docente + Representante + Admins
-    destinatarios = _uniq_emails([
-        cita.docente.usuario.email,
-        cita.representante.email,
-        *obtener_emails_admins(),
-    ])
-    enviar_notificacion(
-        asunto="Nueva cita registrada",
-        template="emails/cita_creada.html",
-        contexto={
-            "docente": cita.docente.usuario.get_full_name() or cita.docente.usuario.username,
-            "representante": cita.representante.get_full_name() or cita.representante.username,
-            "inicio": cita.inicio,
-            "motivo": cita.motivo,
-            "estado": cita.get_estado_display(),
-            # opcional: tus templates pueden ignorar 'nombre_receptor' o usar un genérico
-            "nombre_receptor": "Usuario",
-        },
-        destinatarios=destinatarios,
-    )
-
-    return cita
+    def _intento():
+        cita = Cita(
+            docente=docente,
+            representante=representante,
+            curso_estudiante=curso_estudiante,
+            nombre_estudiante=nombre_estudiante,
+            motivo=motivo,
+            inicio=inicio,
+            fin=fin,
+            estado=EstadoCita.PENDIENTE,
+        )
+        _guardar_cita_bloqueada(cita, representante)
+        return cita
+
+    return con_reintentos(_intento)
 
 @transaction.atomic
 def cancelar_cita_por_representante(*, cita: Cita, usuario, motivo: str = "") -> Cita:
@@ -282,7 +597,7 @@ def cancelar_cita_por_representante(*, cita: Cita, usuario, motivo: str = "") ->
       - Solo si es el dueño
       - Solo si está PENDIENTE o CONFIRMADA
       - Requiere antelación ≥ 24h
-    Envía notificación a Docente + Representante + Admins.
+    Encola la notificación a Docente + Representante + Admins.
     """
     if cita.representante_id != usuario.id:
         raise ValidationError("No puede cancelar citas de otra persona.")
@@ -302,9 +617,9 @@ def cancelar_cita_por_representante(*, cita: Cita, usuario, motivo: str = "") ->
     destinatarios = _uniq_emails([
         cita.docente.usuario.email,
         cita.representante.email,   # confirmación al mismo representante
-        *obtener_emails_admins(),
     ])
-    enviar_notificacion(
+    encolar_notificacion(
+        clave=f"cita:{cita.pk}:cancelada",
         asunto="Cita cancelada por el representante",
         template="emails/cita_cancelada.html",
         contexto={
@@ -315,6 +630,7 @@ def cancelar_cita_por_representante(*, cita: Cita, usuario, motivo: str = "") ->
             "nombre_receptor": "Usuario",
         },
         destinatarios=destinatarios,
+        copia_admins=True,
     )
 
     return cita
@@ -324,7 +640,7 @@ def cancelar_cita_por_docente(*, cita: Cita, usuario_docente, motivo: str = "")
     """
     Cancela una cita por el Docente (sin restricción de 24h para el MVP).
     Valida pertenencia del docente y estado de la cita.
-    Envía notificación a Docente + Representante + Admins.
+    Encola la notificación a Docente + Representante + Admins.
     """
     # confirmar que el docente que cancela es el dueño de la cita
     perfil_doc = getattr(usuario_docente, "perfil_docente", None)
@@ -343,9 +659,9 @@ def cancelar_cita_por_docente(*, cita: Cita, usuario_docente, motivo: str = "")
     destinatarios = _uniq_emails([
         cita.representante.email,
         cita.docente.usuario.email,  # copia al docente
-        *obtener_emails_admins(),
     ])
-    enviar_notificacion(
+    encolar_notificacion(
+        clave=f"cita:{cita.pk}:cancelada",
         asunto="Cita cancelada por el docente",
         template="emails/cita_cancelada.html",
         contexto={
@@ -356,6 +672,7 @@ def cancelar_cita_por_docente(*, cita: Cita, usuario_docente, motivo: str = "")
             "nombre_receptor": "Usuario",
         },
         destinatarios=destinatarios,
+        copia_admins=True,
     )
 
     return cita
\ No newline at end of file
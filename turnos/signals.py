@@ -0,0 +1,185 @@
+# turnos/signals.py
+"""
+Mantiene la tabla SlotLibre y la caché de slots al día cuando cambian las
+fuentes de los slots. Cada cambio recalcula solo los (docente, fecha)
+afectados y renueva la versión de caché del docente, al confirmar la
+transacción (si se revierte, no se hace nada). Los cambios de Cita además
+rehacen sus filas de EstadisticaDiaria e invalidan las métricas del
+dashboard. Los cambios de User y Rol invalidan la lista de administradores
+a notificar (turnos/emailing.py).
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from user.models import Rol, User
+from .models import Cita, DisponibilidadSemanal, ExcepcionDisponibilidad, PerfilDocente, FeriadoInstitucional
+from .services import recalcular_slots_libres, cubierto_hasta, fechas_dia_semana
+from .cache_slots import invalidar_docente, invalidar_feriados
+from .emailing import invalidar_admins
+from .estadisticas import actualizar_departamento, recalcular_estadisticas
+from .metricas import invalidar_metricas
+
+
+_estado = threading.local()
+
+
+@contextmanager
+def sin_recalculo():
+    """
+    Suspende el recálculo por señales en este hilo. Para operaciones masivas
+    que luego recalculan SlotLibre e invalidan la caché una sola vez.
+    """
+    previo = getattr(_estado, "suspendido", False)
+    _estado.suspendido = True
+    try:
+        yield
+    finally:
+        _estado.suspendido = previo
+
+
+def _recalcular(docente_id, fechas=None):
+    if getattr(_estado, "suspendido", False):
+        return
+
+    def _aplicar():
+        try:
+            docente = PerfilDocente.objects.filter(pk=docente_id).first()
+            if docente:
+                recalcular_slots_libres([docente], fechas)
+        finally:
+            # después de actualizar SlotLibre, para no cachear la tabla vieja
+            invalidar_docente(docente_id)
+    # recalcular_slots_libres toma el bloqueo del docente y reintenta si la
+    # base está bloqueada; robust: si aun así falla, no debe hacer fallar la
+    # escritura ya confirmada (se registra y lo corrige reconstruir_slots)
+    transaction.on_commit(_aplicar, robust=True)
+
+
+def _valores(instance, *campos):
+    # Lee de __dict__ para no disparar la carga de campos diferidos (.only())
+    return tuple(instance.__dict__.get(c) for c in campos)
+
+
+# Valores originales (sin consultas) para recalcular también la fecha anterior
+@receiver(post_init, sender=Cita)
+def _cita_original(sender, instance, **kwargs):
+    instance._original = _valores(instance, "docente_id", "inicio")
+
+@receiver(post_init, sender=ExcepcionDisponibilidad)
+def _excepcion_original(sender, instance, **kwargs):
+    instance._original = _valores(instance, "docente_id", "fecha")
+
+@receiver(post_init, sender=DisponibilidadSemanal)
+def _disponibilidad_original(sender, instance, **kwargs):
+    instance._original = _valores(instance, "docente_id", "dia_semana")
+
+@receiver(post_init, sender=PerfilDocente)
+def _perfil_original(sender, instance, **kwargs):
+    instance._original = _valores(instance, "minutos_por_bloque", "activo", "departamento")
+
+@receiver(post_init, sender=FeriadoInstitucional)
+def _feriado_original(sender, instance, **kwargs):
+    instance._original = _valores(instance, "fecha_inicio", "fecha_fin", "departamento")
+
+
+@receiver([post_save, post_delete], sender=Cita)
+def cita_cambiada(sender, instance, **kwargs):
+    afectados = {(instance.docente_id, timezone.localtime(instance.inicio).date())}
+    docente_id, inicio = getattr(instance, "_original", (None, None))
+    if docente_id and inicio:
+        afectados.add((docente_id, timezone.localtime(inicio).date()))
+    for docente_id, fecha in afectados:
+        _recalcular(docente_id, [fecha])
+    instance._original = (instance.docente_id, instance.inicio)
+    if not getattr(_estado, "suspendido", False):
+        # Estado o fecha pudieron cambiar: primero las estadísticas, luego la
+        # instantánea del dashboard (que se recalcula desde ellas). El recálculo
+        # toma el bloqueo del docente y reintenta; robust solo cubre un fallo persistente
+        transaction.on_commit(lambda: recalcular_estadisticas(afectados), robust=True)
+        transaction.on_commit(invalidar_metricas, robust=True)
+
+
+@receiver([post_save, post_delete], sender=ExcepcionDisponibilidad)
+def excepcion_cambiada(sender, instance, **kwargs):
+    afectados = {(instance.docente_id, instance.fecha)}
+    docente_id, fecha = getattr(instance, "_original", (None, None))
+    if docente_id and fecha:
+        afectados.add((docente_id, fecha))
+    for docente_id, fecha in afectados:
+        _recalcular(docente_id, [fecha])
+    instance._original = (instance.docente_id, instance.fecha)
+
+
+@receiver([post_save, post_delete], sender=DisponibilidadSemanal)
+def disponibilidad_cambiada(sender, instance, **kwargs):
+    afectados = {(instance.docente_id, instance.dia_semana)}
+    docente_id, dia = getattr(instance, "_original", (None, None))
+    if docente_id is not None and dia is not None:
+        afectados.add((docente_id, dia))
+    for docente_id, dia in afectados:
+        _recalcular(docente_id, fechas_dia_semana(dia))
+    instance._original = (instance.docente_id, instance.dia_semana)
+
+
+@receiver(post_save, sender=PerfilDocente)
+def perfil_docente_cambiado(sender, instance, created, **kwargs):
+    # Solo el tamaño de bloque, 'activo' y el departamento (feriados) cambian los slots
+    actual = (instance.minutos_por_bloque, instance.activo, instance.departamento)
+    original = getattr(instance, "_original", None)
+    if not created and original != actual:
+        _recalcular(instance.pk)
+        if original and original[2] != instance.departamento:
+            pk, depto = instance.pk, instance.departamento
+            transaction.on_commit(lambda: actualizar_departamento(pk, depto), robust=True)
+    instance._original = actual
+
+
+@receiver([post_save, post_delete], sender=FeriadoInstitucional)
+def feriado_cambiado(sender, instance, **kwargs):
+    """Un solo registro afecta a todos los docentes (o a un departamento)."""
+    alcances = [(instance.fecha_inicio, instance.fecha_fin, instance.departamento)]
+    original = getattr(instance, "_original", (None, None, None))
+    if original[0] and original[1]:
+        alcances.append(original)
+    instance._original = alcances[0]
+
+    hoy, tope = timezone.localdate(), cubierto_hasta()
+    fechas = set()
+    for fi, ff, _ in alcances:
+        f = max(fi, hoy)
+        while tope and f <= min(ff, tope):
+            fechas.add(f)
+            f += timedelta(days=1)
+    deptos = {(depto or "").strip() for _, _, depto in alcances}
+
+    def _aplicar():
+        try:
+            if fechas:
+                docentes = PerfilDocente.objects.all()
+                if "" not in deptos:
+                    filtro = Q()
+                    for depto in deptos:
+                        filtro |= Q(departamento__iexact=depto)
+                    docentes = docentes.filter(filtro)
+                docentes = list(docentes)
+                for i in range(0, len(docentes), 50):
+                    recalcular_slots_libres(docentes[i:i + 50], fechas)
+        finally:
+            invalidar_feriados()
+    transaction.on_commit(_aplicar, robust=True)
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Rol)
+def usuario_o_rol_cambiado(sender, instance, update_fields=None, **kwargs):
+    # El login solo guarda last_login: no cambia quién es administrador ni su email
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(invalidar_admins, robust=True)
@@ -0,0 +1,297 @@
+# turnos/sinteticos.py
+"""
+Datos sintéticos para reproducir la escala de producción en local.
+
+Todo sale de un random.Random(semilla): la misma semilla y los mismos
+tamaños generan exactamente el mismo colegio y los mismos CSV.
+
+Se identifican por el dominio de email (DOMINIO), las cédulas con prefijo
+"99" y el prefijo del nombre de los feriados, así limpiar() los borra sin
+tocar datos reales. Estudiantes, representantes y docentes entran por los
+importadores CSV (turnos/importacion.py), con las mismas reglas que una
+carga real; excepciones, feriados y citas se crean con bulk_create.
+"""
+import csv
+import random
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from user.models import User
+from .cache_slots import invalidar_feriados
+from .estadisticas import recalcular_estadisticas, reconstruir_estadisticas
+from .importacion import importar_docentes, importar_estudiantes
+from .models import (
+    Cita, DisponibilidadSemanal, EstadoCita, Estudiante, ExcepcionDisponibilidad, FeriadoInstitucional,
+    PerfilDocente, RelacionRepresentacion, TipoExcepcion,
+)
+from .services import reconstruir_slots_libres
+from .signals import sin_recalculo
+
+DOMINIO = "sintetico.test"
+PREFIJO_FERIADO = "Sintético: "
+# Prefijos de cédula: 99 + tipo (0 docente, 1 representante, 2 estudiante) + 8 dígitos
+CEDULA_DOCENTE, CEDULA_REPRESENTANTE, CEDULA_ESTUDIANTE = "990", "991", "992"
+# Hermanos: cada representante tiene en promedio 1/REPS_POR_ESTUDIANTE estudiantes
+REPS_POR_ESTUDIANTE = 0.8
+PROB_SEGUNDO_REPRESENTANTE = 0.3
+
+CAMPOS_ESTUDIANTES = ["cedula", "nombre", "curso", "representante_cedula", "representante_email",
+                      "parentesco", "verificado"]
+CAMPOS_DOCENTES = ["cedula", "email", "nombres", "apellidos", "telefono", "departamento", "minutos_por_bloque",
+                   "maximo_citas_diarias", "activo", "disponibilidad", "reemplazar_disponibilidad"]
+
+NOMBRES = ["María", "José", "Ana", "Luis", "Carmen", "Juan", "Rosa", "Carlos", "Gabriela", "Andrés",
+           "Daniela", "Jorge", "Valeria", "Diego", "Sofía", "Miguel", "Paola", "Fernando", "Lucía", "Ricardo",
+           "Camila", "Pedro", "Verónica", "Santiago", "Isabel", "Mateo", "Elena", "Sebastián", "Patricia", "Javier"]
+APELLIDOS = ["García", "Rodríguez", "Zambrano", "Mendoza", "Vera", "Cedeño", "Torres", "Morales", "Sánchez",
+             "Castro", "Jiménez", "Romero", "Vargas", "Chávez", "Guerrero", "Muñoz", "Ortiz", "Delgado",
+             "Macías", "Intriago", "Bravo", "Salazar", "Pazmiño", "Andrade", "León", "Benítez"]
+DEPARTAMENTOS = ["Matemáticas", "Lengua", "Inglés", "Ciencias", "Estudios Sociales", "Educación Física",
+                 "Arte", "DECE"]
+CURSOS = [f"{n} {p}" for n in ["1ro EGB", "2do EGB", "3ro EGB", "4to EGB", "5to EGB", "6to EGB", "7mo EGB",
+                               "8vo EGB", "9no EGB", "10mo EGB", "1ro BGU", "2do BGU", "3ro BGU"]
+          for p in "ABC"]
+PARENTESCOS = ["Madre"] * 5 + ["Padre"] * 4 + ["Abuela", "Abuelo", "Tía", "Tío", "Hermana"]
+MOTIVOS = ["Rendimiento académico", "Conducta en clase", "Tareas pendientes", "Seguimiento de notas",
+           "Inasistencias", "Adaptación al curso", "Recuperación pedagógica", "Entrega de informe"]
+ABREV = ["LUN", "MAR", "MIE", "JUE", "VIE"]
+
+
+def _nombre(rnd: random.Random) -> str:
+    return rnd.choice(NOMBRES)
+
+
+def _apellidos(rnd: random.Random) -> str:
+    return f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+
+
+def _franjas(rnd: random.Random) -> List[str]:
+    """Franjas de atención semanales: una mañana y, a veces, una tarde (en horas en punto,
+    alineadas a cualquier tamaño de bloque)."""
+    franjas = []
+    for dia in rnd.sample(range(5), rnd.randint(2, 4)):
+        h = rnd.choice([7, 8, 9, 10])
+        franjas.append(f"{ABREV[dia]} {h:02d}:00-{h + rnd.choice([2, 3]):02d}:00")
+        if rnd.random() < 0.3:
+            franjas.append(f"{ABREV[dia]} 14:00-16:00")
+    return franjas
+
+
+def filas_docentes(n: int, semilla: int = 1) -> Iterator[Dict]:
+    """Filas del CSV de docentes (formato de cargar_docentes)."""
+    rnd = random.Random(semilla)
+    for i in range(n):
+        yield {
+            "cedula": f"{CEDULA_DOCENTE}{i:08d}",
+            "email": f"docente{i}@{DOMINIO}",
+            "nombres": _nombre(rnd),
+            "apellidos": _apellidos(rnd),
+            "telefono": f"09{rnd.randint(0, 99999999):08d}",
+            "departamento": rnd.choice(DEPARTAMENTOS),
+            "minutos_por_bloque": rnd.choice([15, 20, 20, 30]),
+            "maximo_citas_diarias": rnd.choice(["", 4, 6, 8]),
+            "activo": "1",
+            "disponibilidad": "|".join(_franjas(rnd)),
+            "reemplazar_disponibilidad": "1",
+        }
+
+
+def filas_estudiantes(n: int, semilla: int = 1) -> Iterator[Dict]:
+    """
+    Filas del CSV de estudiantes: una por relación (un estudiante con dos
+    representantes ocupa dos filas), así que salen entre n y ~1,3·n filas.
+    """
+    rnd = random.Random(semilla)
+    n_reps = max(1, int(n * REPS_POR_ESTUDIANTE))
+    for i in range(n):
+        apellidos = _apellidos(rnd)
+        base = {"cedula": f"{CEDULA_ESTUDIANTE}{i:08d}", "nombre": f"{_nombre(rnd)} {apellidos}",
+                "curso": rnd.choice(CURSOS)}
+        reps = [rnd.randrange(n_reps)]
+        if rnd.random() < PROB_SEGUNDO_REPRESENTANTE:
+            reps.append(rnd.randrange(n_reps))
+        for r in dict.fromkeys(reps):
+            yield {**base, "representante_cedula": f"{CEDULA_REPRESENTANTE}{r:08d}",
+                   "representante_email": f"representante{r}@{DOMINIO}",
+                   "parentesco": rnd.choice(PARENTESCOS), "verificado": rnd.choice(["1", "1", "0"])}
+
+
+def escribir_csv(ruta: str, campos: List[str], filas: Iterable[Dict]) -> int:
+    """Escribe las filas en 'ruta' (UTF-8). Devuelve cuántas escribió."""
+    n = 0
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=campos)
+        w.writeheader()
+        for fila in filas:
+            w.writerow(fila)
+            n += 1
+    return n
+
+
+def existen() -> bool:
+    return User.objects.filter(email__endswith=f"@{DOMINIO}").exists()
+
+
+def limpiar() -> Dict[str, int]:
+    """Borra todo lo sintético. Las citas van primero (PROTECT sobre docente y representante)."""
+    usuarios = User.objects.filter(email__endswith=f"@{DOMINIO}")
+    with transaction.atomic(), sin_recalculo():
+        qs_citas = Cita.objects.filter(Q(docente__usuario__in=usuarios) | Q(representante__in=usuarios))
+        # Las filas de EstadisticaDiaria de docentes sintéticos caen en cascada; quedan las de docentes reales
+        pares = {(d, timezone.localtime(i).date()) for d, i in qs_citas.order_by().values_list("docente_id", "inicio")}
+        citas = qs_citas.delete()[0]
+        estudiantes = Estudiante.objects.filter(cedula__startswith=CEDULA_ESTUDIANTE).count()
+        Estudiante.objects.filter(cedula__startswith=CEDULA_ESTUDIANTE).delete()
+        feriados = FeriadoInstitucional.objects.filter(nombre__startswith=PREFIJO_FERIADO).delete()[0]
+        # PerfilDocente, franjas, excepciones, SlotLibre y relaciones caen en cascada
+        n_usuarios = usuarios.count()
+        usuarios.delete()
+        recalcular_estadisticas(pares)
+    if feriados:
+        invalidar_feriados()
+    return {"citas": citas, "estudiantes": estudiantes, "usuarios": n_usuarios, "feriados": feriados}
+
+
+def _periodo(semanas: int):
+    """Periodo lectivo de 'semanas' semanas, la mitad ya transcurrida (empieza en lunes)."""
+    hoy = timezone.localdate()
+    desde = hoy - timedelta(days=hoy.weekday() + 7 * (semanas // 2))
+    return desde, desde + timedelta(days=7 * semanas - 3)  # termina en viernes
+
+
+def _crear_feriados(rnd, desde, hasta, n) -> List:
+    dias = [desde + timedelta(days=d) for d in range((hasta - desde).days + 1)]
+    dias = [d for d in dias if d.weekday() < 5]
+    feriados = []
+    for k, f in enumerate(sorted(rnd.sample(dias, min(n, len(dias))))):
+        parcial = rnd.random() < 0.25
+        feriados.append(FeriadoInstitucional(
+            nombre=f"{PREFIJO_FERIADO}feriado {k + 1}", fecha_inicio=f, fecha_fin=f,
+            hora_inicio=time(12, 0) if parcial else None, hora_fin=time(18, 0) if parcial else None,
+            departamento=rnd.choice(DEPARTAMENTOS) if rnd.random() < 0.2 else "",
+        ))
+    FeriadoInstitucional.objects.bulk_create(feriados)
+    return feriados
+
+
+def _crear_excepciones(rnd, docentes, desde, hasta, por_docente) -> List:
+    excepciones, vistos = [], set()
+    dias = (hasta - desde).days
+    for d in docentes:
+        for _ in range(por_docente):
+            f = desde + timedelta(days=rnd.randint(0, dias))
+            if (d.pk, f) in vistos:
+                continue
+            vistos.add((d.pk, f))
+            if rnd.random() < 0.7:
+                # Bloqueo (capacitación, permiso): mañana completa o el día entero
+                ini, fin = rnd.choice([(time(7, 0), time(13, 0)), (time(0, 0), time(23, 59))])
+                tipo, motivo = TipoExcepcion.BLOQUEO, rnd.choice(["Capacitación", "Permiso", "Junta de curso"])
+            else:
+                ini, fin, tipo, motivo = time(16, 0), time(17, 0), TipoExcepcion.EXTRA, "Atención extra"
+            excepciones.append(ExcepcionDisponibilidad(docente=d, fecha=f, hora_inicio=ini, hora_fin=fin,
+                                                       tipo=tipo, motivo=motivo))
+    ExcepcionDisponibilidad.objects.bulk_create(excepciones, batch_size=1000)
+    return excepciones
+
+
+def _crear_citas(rnd, docentes, franjas, relaciones, desde, hasta, por_semana, feriados, excepciones) -> int:
+    """
+    Citas alineadas a los bloques de las franjas de cada docente, sin
+    duplicados ni días de feriado o de bloqueo del docente. Las pasadas quedan casi todas confirmadas;
+    las futuras, pendientes o confirmadas; un 10-15 % canceladas.
+    """
+    if not relaciones:
+        return 0
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    cerrados = {fer.fecha_inicio for fer in feriados if fer.hora_inicio is None and not fer.departamento}
+    bloqueados = {(e.docente_id, e.fecha) for e in excepciones if e.tipo == TipoExcepcion.BLOQUEO}
+    semanas = ((hasta - desde).days + 3) // 7
+    citas = []
+    for d in docentes:
+        propias = franjas.get(d.pk)
+        if not propias:
+            continue
+        usados = set()
+        for s in range(semanas):
+            for _ in range(por_semana):
+                dia, ini, fin = rnd.choice(propias)
+                fecha = desde + timedelta(days=7 * s + dia)
+                if fecha > hasta or fecha in cerrados or (d.pk, fecha) in bloqueados:
+                    continue
+                bloques = (fin.hour * 60 + fin.minute - ini.hour * 60 - ini.minute) // d.minutos_por_bloque
+                if bloques <= 0:
+                    continue
+                inicio = timezone.make_aware(datetime.combine(fecha, ini), tz) + timedelta(
+                    minutes=d.minutos_por_bloque * rnd.randrange(bloques))
+                if inicio in usados:
+                    continue
+                usados.add(inicio)
+                rep_id, est_id, est_nombre, est_curso = rnd.choice(relaciones)
+                if inicio < ahora:
+                    estado = rnd.choices([EstadoCita.CONFIRMADA, EstadoCita.CANCELADA, EstadoCita.PENDIENTE],
+                                         [80, 15, 5])[0]
+                else:
+                    estado = rnd.choices([EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA, EstadoCita.CANCELADA],
+                                         [55, 35, 10])[0]
+                cancelada = estado == EstadoCita.CANCELADA
+                citas.append(Cita(
+                    docente=d, representante_id=rep_id, estudiante_id=est_id, nombre_estudiante=est_nombre,
+                    curso_estudiante=est_curso, motivo=rnd.choice(MOTIVOS), inicio=inicio,
+                    fin=inicio + timedelta(minutes=d.minutos_por_bloque), estado=estado,
+                    cancelada_por_id=rep_id if cancelada else None,
+                    motivo_cancelacion="Cruce de horario" if cancelada else "",
+                ))
+    Cita.objects.bulk_create(citas, batch_size=1000)
+    return len(citas)
+
+
+def generar_colegio(docentes: int = 40, estudiantes: int = 1000, semanas: int = 16, citas_por_semana: int = 3,
+                    excepciones_por_docente: int = 4, feriados: int = 3, semilla: int = 1,
+                    progreso: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Crea el colegio sintético y reconstruye SlotLibre y EstadisticaDiaria al final. Cada parte
+    usa su propia semilla derivada, así cambiar un tamaño no altera el resto.
+    """
+    avisar = progreso or (lambda texto: None)
+    desde, hasta = _periodo(semanas)
+
+    avisar(f"Docentes ({docentes})...")
+    r_doc = importar_docentes(filas_docentes(docentes, semilla))
+    avisar(f"Estudiantes y representantes ({estudiantes})...")
+    r_est = importar_estudiantes(filas_estudiantes(estudiantes, semilla + 1))
+
+    perfiles = list(PerfilDocente.objects.filter(usuario__email__endswith=f"@{DOMINIO}").order_by("pk"))
+    franjas = {}
+    for docente_id, dia, ini, fin in (DisponibilidadSemanal.objects.filter(docente__in=perfiles)
+                                      .order_by("docente_id", "dia_semana", "hora_inicio")
+                                      .values_list("docente_id", "dia_semana", "hora_inicio", "hora_fin")):
+        franjas.setdefault(docente_id, []).append((dia, ini, fin))
+    relaciones = list(RelacionRepresentacion.objects.filter(estudiante__cedula__startswith=CEDULA_ESTUDIANTE)
+                      .order_by("pk").values_list("representante_id", "estudiante_id",
+                                                  "estudiante__nombre", "estudiante__curso"))
+
+    avisar(f"Periodo {desde} → {hasta}: feriados, excepciones y citas...")
+    with transaction.atomic(), sin_recalculo():
+        lista_feriados = _crear_feriados(random.Random(semilla + 2), desde, hasta, feriados)
+        excepciones = _crear_excepciones(random.Random(semilla + 3), perfiles, desde, hasta,
+                                         excepciones_por_docente)
+        n_citas = _crear_citas(random.Random(semilla + 4), perfiles, franjas, relaciones, desde, hasta,
+                               citas_por_semana, lista_feriados, excepciones)
+    invalidar_feriados()
+
+    avisar("Reconstruyendo SlotLibre...")
+    slots = reconstruir_slots_libres()
+    avisar("Reconstruyendo EstadisticaDiaria...")
+    estadisticas = reconstruir_estadisticas(desde, hasta)
+    return {
+        "docentes": r_doc["creados"], "franjas": r_doc["franjas_creadas"],
+        "estudiantes": r_est["estudiantes_nuevos"], "representantes": r_est["representantes_nuevos"],
+        "relaciones": r_est["relaciones_nuevas"], "feriados": len(lista_feriados), "excepciones": len(excepciones),
+        "citas": n_citas, "slots_libres": slots, "estadisticas": estadisticas,
+    }
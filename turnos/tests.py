@@ -1,3 +1,1485 @@
-from django.test import TestCase
+import base64
+import codecs
+import csv
+import gzip
+import io
+import os
+import smtplib
+import tempfile
+import threading
+from datetime import datetime, time as dtime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from user.models import FrecuenciaAvisos, Rol, User
+from . import cache_slots, intervalos, sinteticos
+from .emailing import (
+    ESPERA_BASE, MAX_INTENTOS, _admins, _reservar_lote, encolar_notificacion, enviar_pendientes, enviar_resumenes,
+    purgar_enviadas,
+)
+from .estadisticas import reconstruir_estadisticas, tendencia_semanal
+from .exportacion import respuesta_csv
+from .importacion import CLAVE_INICIAL, contar_lineas, importar_docentes, importar_estudiantes, lineas_csv
+from .metricas import CLAVE_METRICAS, metricas_dashboard
+from .models import (
+    Cita, DisponibilidadSemanal, EstadisticaDiaria, EstadoCita, EstadoNotificacion, EstadoTrabajo, Estudiante,
+    EventoResumen, ExcepcionDisponibilidad, FeriadoInstitucional, NotificacionPendiente, PerfilDocente,
+    RelacionRepresentacion, SlotLibre, TipoExcepcion, TipoTrabajo, Trabajo,
+)
+from .paginacion import SIGUIENTE, codificar_cursor, decodificar_cursor, paginar, paginar_por_cursor
+from .recordatorios import enviar_recordatorios
+from .services import (
+    REINTENTOS_BLOQUEO, SlotOcupado, buscar_primeros_slots, con_reintentos, cubierto_hasta, generar_minutos_docentes,
+    generar_slots, generar_slots_docentes, generar_slots_rango, reconstruir_slots_libres, reservar_cita,
+)
+from .trabajos import ejecutar, encolar, marcar_interrumpidos, reclamar
+from .validacion import error_de, validar_reserva
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def crear_docente(username="docente", hora_inicio=dtime(7, 0), hora_fin=dtime(18, 0), **campos):
+    """Docente con la misma franja los 7 días de la semana."""
+    usuario = User.objects.create(username=username, email=f"{username}@colegio.test")
+    docente = PerfilDocente.objects.create(usuario=usuario, minutos_por_bloque=20, **campos)
+    DisponibilidadSemanal.objects.bulk_create([
+        DisponibilidadSemanal(docente=docente, dia_semana=d, hora_inicio=hora_inicio, hora_fin=hora_fin)
+        for d in range(7)
+    ])
+    return docente
+
+
+def crear_representantes(n, prefijo="rep"):
+    User.objects.bulk_create([User(username=f"{prefijo}{i}") for i in range(n)])
+    return list(User.objects.filter(username__startswith=prefijo).order_by("pk"))
+
+
+def en_hilos(n, trabajo):
+    """Corre trabajo(i) en n hilos que arrancan a la vez; cada hilo cierra su conexión."""
+    barrera = threading.Barrier(n)
+    errores = []
+
+    def correr(i):
+        try:
+            barrera.wait()
+            trabajo(i)
+        except Exception as e:  # se revisan en la prueba
+            errores.append(e)
+        finally:
+            connections.close_all()
+
+    hilos = [threading.Thread(target=correr, args=(i,)) for i in range(n)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return errores
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class HilosTestCase(TransactionTestCase):
+    """
+    Base de las pruebas con hilos o transacciones reales. Usan una caché local y
+    empiezan con ella vacía: lo que otra prueba dejó (p. ej. el horizonte de
+    SlotLibre) ya no existe en la base, y la caché en archivo no se toca.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+
+def crear_cita(docente, representante, inicio, minutos=20, **campos):
+    campos = {"curso_estudiante": "1A", "nombre_estudiante": "Est", "motivo": "m", **campos}
+    return Cita.objects.create(docente=docente, representante=representante, inicio=inicio,
+                               fin=inicio + timedelta(minutes=minutos), **campos)
+
+
+def a_las(fecha, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(fecha, dtime(hora, minuto)))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class SlotsRangoTests(TestCase):
+    """generar_slots_rango: mismo resultado que día por día, con consultas fijas."""
+
+    def setUp(self):
+        self.docente = crear_docente(hora_inicio=dtime(8, 0), hora_fin=dtime(10, 0))
+        self.desde = timezone.localdate() + timedelta(days=2)
+        self.hasta = self.desde + timedelta(days=13)
+        crear_cita(self.docente, crear_representantes(1)[0], a_las(self.desde + timedelta(days=1), 8, 20))
+
+    def test_igual_a_generar_slots_por_dia(self):
+        rango = generar_slots_rango(self.docente, self.desde, self.hasta)
+        self.assertEqual(sorted(rango), [self.desde + timedelta(days=i) for i in range(14)])
+        for fecha, slots in rango.items():
+            self.assertEqual(slots, generar_slots(self.docente, fecha))
+        self.assertEqual(len(rango[self.desde]), 6)
+        self.assertNotIn(a_las(self.desde + timedelta(days=1), 8, 20), rango[self.desde + timedelta(days=1)])
+
+    def test_consultas_no_dependen_de_los_dias(self):
+        with self.assertNumQueries(4):
+            generar_slots_rango(self.docente, self.desde, self.desde)
+        with self.assertNumQueries(4):
+            generar_slots_rango(self.docente, self.desde, self.hasta)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PrimerosSlotsTests(TestCase):
+    """Búsqueda de los slots más tempranos entre varios docentes."""
+
+    def setUp(self):
+        self.temprano = crear_docente("temprano", hora_inicio=dtime(7, 0), hora_fin=dtime(8, 0), departamento="Ciencias")
+        self.tarde = crear_docente("tarde", hora_inicio=dtime(7, 30), hora_fin=dtime(9, 0), departamento="Ciencias")
+        self.otro = crear_docente("otro", hora_inicio=dtime(6, 0), hora_fin=dtime(7, 0), departamento="Lengua")
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        self.client.force_login(crear_representantes(1)[0])
+
+    def test_mezcla_ordenada_y_con_limite(self):
+        resultado = buscar_primeros_slots([self.tarde, self.temprano], self.fecha, self.fecha, limite=5)
+        self.assertEqual(
+            [(timezone.localtime(s).strftime("%H:%M"), d.pk) for s, d in resultado],
+            # los inicios se alinean al bloque desde medianoche (07:30 -> 07:40); empate por id de docente
+            [("07:00", self.temprano.pk), ("07:20", self.temprano.pk), ("07:40", self.temprano.pk),
+             ("07:40", self.tarde.pk), ("08:00", self.tarde.pk)],
+        )
+
+    def test_respeta_la_antelacion_de_24h(self):
+        hoy = timezone.localdate()
+        resultado = buscar_primeros_slots([self.temprano], hoy, hoy + timedelta(days=1), limite=50)
+        minimo = timezone.now() + timedelta(hours=24)
+        self.assertTrue(all(s >= minimo for s, _ in resultado))
+
+    def test_endpoint_por_departamento(self):
+        r = self.client.get(reverse("api_slots_primeros"), {"departamento": "ciencias", "desde": self.fecha,
+                                                             "hasta": self.fecha, "n": 2})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([(x["docente_id"], x["inicio"][-5:]) for x in r.json()["slots"]],
+                         [(self.temprano.pk, "07:00"), (self.temprano.pk, "07:20")])
+
+    def test_endpoint_valida_parametros(self):
+        self.assertEqual(self.client.get(reverse("api_slots_primeros")).status_code, 400)
+        r = self.client.get(reverse("api_slots_primeros"), {"docente_ids": "1,x"})
+        self.assertEqual(r.status_code, 400)
+
+    def test_endpoint_requiere_sesion(self):
+        self.client.logout()
+        r = self.client.get(reverse("api_slots_primeros"), {"departamento": "ciencias"})
+        self.assertEqual(r.status_code, 302)
+        self.assertTrue(r.url.startswith(reverse("login")))
+
+
+class IntervalosTests(TestCase):
+    """Kernel en minutos (turnos/intervalos.py)."""
+
+    FILAS = [
+        # bases, extras, bloqueos, citas
+        ([(420, 720)], [], [(480, 510)], [(600, 620)]),
+        ([(425, 600)], [(900, 960)], [], []),
+        ([(420, 480), (470, 540)], [], [], [(420, 440), (500, 505)]),
+        ([], [], [], []),
+    ]
+
+    def test_slots_dia(self):
+        self.assertEqual(intervalos.slots_dia(*self.FILAS[0], 20), [420, 440, 460, 520, 540, 560, 580, 620, 640, 660, 680, 700])
+        # inicio alineado al bloque y regla de antelación
+        self.assertEqual(intervalos.slots_dia(*self.FILAS[1], 30, 460), [480, 510, 540, 570, 900, 930])
+        self.assertEqual(intervalos.slots_dia(*self.FILAS[2], 20), [440, 460, 480, 520])
+
+    def test_numpy_solo_si_se_activa(self):
+        self.assertFalse(intervalos.usar_numpy(10_000))
+        with override_settings(TURNOS_INTERVALOS_NUMPY=True):
+            self.assertEqual(intervalos.usar_numpy(10_000), intervalos.np is not None)
+            self.assertFalse(intervalos.usar_numpy(intervalos.LOTE_MINIMO_NUMPY - 1))
+
+    def test_variante_numpy_igual_al_bucle(self):
+        if intervalos.np is None:
+            self.skipTest("NumPy no está instalado")
+        minutos, desde = [20, 30, 20, 15], [0, 460, 0, 0]
+        self.assertEqual(
+            intervalos.slots_lote(self.FILAS, minutos, desde, vectorizado=True),
+            intervalos.slots_lote(self.FILAS, minutos, desde, vectorizado=False),
+        )
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class FeriadosTests(TestCase):
+    """FeriadoInstitucional dentro del motor de slots."""
+
+    def setUp(self):
+        self.fecha = timezone.localdate() + timedelta(days=5)
+        self.mate = crear_docente("mate", departamento="Matemáticas")
+        self.lengua = crear_docente("lengua", departamento="Lengua")
+
+    def _libres(self):
+        slots = generar_minutos_docentes([self.mate, self.lengua], self.fecha, self.fecha, antelacion=False)
+        return {pk: len(por_fecha[self.fecha]) for pk, por_fecha in slots.items()}
+
+    def test_alcance_por_departamento_y_horario(self):
+        FeriadoInstitucional.objects.create(nombre="Jornada", fecha_inicio=self.fecha, fecha_fin=self.fecha,
+                                            departamento="matemáticas")
+        FeriadoInstitucional.objects.create(nombre="Minuto cívico", fecha_inicio=self.fecha, fecha_fin=self.fecha,
+                                            hora_inicio=dtime(7, 0), hora_fin=dtime(8, 0))
+        self.assertEqual(self._libres(), {self.mate.pk: 0, self.lengua.pk: 30})
+
+    def test_solo_referencia_no_quita_horarios(self):
+        FeriadoInstitucional.objects.create(nombre="Registro anterior", fecha_inicio=self.fecha,
+                                            fecha_fin=self.fecha, bloquea_agenda=False)
+        self.assertEqual(self._libres(), {self.mate.pk: 33, self.lengua.pk: 33})
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class BloqueoMasivoTests(TestCase):
+    """Bloqueo masivo: solo se cancelan las citas listadas en la vista previa."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="x",
+                                              rol=Rol.objects.create(nombre="Administrador"))
+        self.docente = crear_docente()
+        self.reps = crear_representantes(3)
+        self.fecha = timezone.localdate() + timedelta(days=4)
+        self.client.force_login(self.admin)
+
+    def _datos(self, accion, **extra):
+        return {"nombre": "Jornada", "fecha_inicio": self.fecha, "fecha_fin": self.fecha, "aplicar_a": "todos",
+                "modo": "excepciones", "accion": accion, **extra}
+
+    def test_cita_creada_despues_de_la_vista_previa_no_se_cancela(self):
+        listadas = [crear_cita(self.docente, self.reps[i], a_las(self.fecha, 8 + i)) for i in range(2)]
+        r = self.client.post(reverse("bloqueo_masivo"), self._datos("previsualizar"))
+        preview = r.context["preview"]
+        self.assertEqual(preview["citas"], 2)
+
+        tardia = crear_cita(self.docente, self.reps[2], a_las(self.fecha, 11))
+        r = self.client.post(reverse("bloqueo_masivo"),
+                             self._datos("aplicar", cancelar_citas="on", citas_vistas=preview["ids"]))
+        trabajo = Trabajo.objects.get()
+        self.assertRedirects(r, reverse("trabajo_estado", args=[trabajo.pk]), fetch_redirect_response=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            ejecutar(trabajo)
+
+        estados = dict(Cita.objects.values_list("pk", "estado"))
+        self.assertEqual([estados[c.pk] for c in listadas], [EstadoCita.CANCELADA] * 2)
+        self.assertEqual(estados[tardia.pk], EstadoCita.PENDIENTE)
+        self.assertIn("Citas canceladas: 2.", Trabajo.objects.get().resultado)
+
+    def test_modo_excepciones_deja_el_feriado_como_referencia(self):
+        self.client.post(reverse("bloqueo_masivo"), self._datos("aplicar"))
+        with self.captureOnCommitCallbacks(execute=True):
+            ejecutar(Trabajo.objects.get())
+
+        self.assertEqual(ExcepcionDisponibilidad.objects.filter(docente=self.docente, fecha=self.fecha,
+                                                                tipo=TipoExcepcion.BLOQUEO).count(), 1)
+        self.assertEqual(list(FeriadoInstitucional.objects.values_list("nombre", "bloquea_agenda")),
+                         [("Jornada", False)])
+        r = self.client.get(reverse("bloqueo_masivo"))
+        self.assertContains(r, "Solo referencia")
+
+
+class SlotLibreConcurrenciaTests(HilosTestCase):
+    """Reservas simultáneas del mismo docente: SlotLibre termina igual al cálculo al vuelo."""
+
+    HILOS = 10
+
+    def test_reservas_concurrentes_dejan_slotlibre_consistente(self):
+        docente = crear_docente()
+        reps = crear_representantes(self.HILOS * 33)
+        reconstruir_slots_libres(dias=10)
+        fecha = timezone.localdate() + timedelta(days=3)
+        slots = list(SlotLibre.objects.filter(docente=docente, fecha=fecha).values_list("inicio", flat=True))
+        self.assertEqual(len(slots), 33)
+
+        def reservar(i):
+            # todos los hilos disputan los mismos slots, cada uno en otro orden
+            orden = slots[i:] + slots[:i]
+            for k, inicio in enumerate(orden if i % 2 else orden[::-1]):
+                try:
+                    reservar_cita(docente=docente, representante=reps[i * 33 + k], curso_estudiante="1A",
+                                  nombre_estudiante="Est", motivo="m", inicio=inicio)
+                except ValidationError:  # SlotOcupado, o el slot ya no figura como libre
+                    pass
+
+        self.assertEqual(en_hilos(self.HILOS, reservar), [])
+
+        tomados = set(Cita.objects.filter(docente=docente, estado=EstadoCita.PENDIENTE).values_list("inicio", flat=True))
+        self.assertEqual(tomados, set(slots))
+        # Cada recálculo vio las reservas ya confirmadas: no queda ningún slot tomado como libre
+        self.assertFalse(SlotLibre.objects.filter(docente=docente, fecha=fecha).exists())
+        docente.refresh_from_db()
+        self.assertEqual(generar_minutos_docentes([docente], fecha, fecha, antelacion=False)[docente.pk][fecha], [])
+
+
+class ReservaConcurrenteTests(HilosTestCase):
+    """Varias reservas simultáneas del mismo horario: gana una, el resto es rechazado."""
+
+    HILOS = 8
+
+    def test_un_solo_ganador(self):
+        docente = crear_docente()
+        reps = crear_representantes(self.HILOS)
+        inicio = a_las(timezone.localdate() + timedelta(days=3), 9)
+        ganadores, perdedores = [], []
+
+        def reservar(i):
+            try:
+                ganadores.append(reservar_cita(docente=docente, representante=reps[i], curso_estudiante="1A",
+                                               nombre_estudiante="Est", motivo="m", inicio=inicio))
+            except SlotOcupado as e:
+                perdedores.append(e)
+            except ValidationError as e:
+                # llegó después de confirmada la ganadora: la lectura previa ya no lo ofrece
+                self.assertIn("ya no está disponible", e.messages[0])
+                perdedores.append(e)
+
+        self.assertEqual(en_hilos(self.HILOS, reservar), [])
+        self.assertEqual(len(ganadores), 1)
+        self.assertEqual(len(perdedores), self.HILOS - 1)
+        self.assertEqual(Cita.objects.filter(docente=docente, inicio=inicio).count(), 1)
+
+
+class ReintentosBloqueoTests(HilosTestCase):
+    """con_reintentos repite solo ante "database is locked" y fuera de otra transacción."""
+
+    def setUp(self):
+        super().setUp()
+        self.llamadas = 0
+
+    def _falla(self, veces, mensaje="database is locked"):
+        def funcion():
+            self.llamadas += 1
+            if self.llamadas <= veces:
+                raise OperationalError(mensaje)
+            return "ok"
+        return funcion
+
+    @mock.patch("turnos.services.ESPERA_BLOQUEO", 0)
+    def test_reintenta_hasta_lograrlo(self):
+        self.assertEqual(con_reintentos(self._falla(2)), "ok")
+        self.assertEqual(self.llamadas, 3)
+
+    @mock.patch("turnos.services.ESPERA_BLOQUEO", 0)
+    def test_se_rinde_tras_el_maximo(self):
+        with self.assertRaises(OperationalError):
+            con_reintentos(self._falla(REINTENTOS_BLOQUEO + 1))
+        self.assertEqual(self.llamadas, REINTENTOS_BLOQUEO + 1)
+
+    def test_otros_errores_no_se_reintentan(self):
+        with self.assertRaises(OperationalError):
+            con_reintentos(self._falla(1, "no such table"))
+        self.assertEqual(self.llamadas, 1)
+
+    def test_dentro_de_una_transaccion_no_reintenta(self):
+        # repetir no liberaría el bloqueo que ya tiene la transacción externa
+        with self.assertRaises(OperationalError), transaction.atomic():
+            con_reintentos(self._falla(1))
+        self.assertEqual(self.llamadas, 1)
+
+
+class EstadisticaDiariaConcurrenciaTests(HilosTestCase):
+    """Con reservas y cancelaciones simultáneas el resumen diario coincide con las citas."""
+
+    HILOS = 8
+
+    def test_resumen_igual_al_conteo_de_citas(self):
+        docentes = [crear_docente(f"docente{i}") for i in range(2)]
+        reps = crear_representantes(self.HILOS * 20)
+        fecha = timezone.localdate() + timedelta(days=3)
+        inicio = timezone.make_aware(datetime.combine(fecha, dtime(7, 0)))
+        slots = [inicio + timedelta(minutes=20 * k) for k in range(20)]
+
+        def reservar_y_cancelar(i):
+            docente = docentes[i % 2]
+            for k, s in enumerate(slots if i % 4 < 2 else slots[::-1]):
+                try:
+                    cita = reservar_cita(docente=docente, representante=reps[i * 20 + k], curso_estudiante="1A",
+                                         nombre_estudiante="Est", motivo="m", inicio=s)
+                except ValidationError:
+                    continue
+                if k % 3 == 0:
+                    cita.estado = EstadoCita.CANCELADA
+                    cita.save()
+
+        self.assertEqual(en_hilos(self.HILOS, reservar_y_cancelar), [])
+
+        reales = {(d, e): n for d, e, n in Cita.objects.values_list("docente_id", "estado").annotate(n=Count("pk"))}
+        resumen = {(d, e): n for d, e, n in EstadisticaDiaria.objects.filter(fecha=fecha)
+                   .values_list("docente_id", "estado", "citas")}
+        self.assertTrue(reales)
+        self.assertEqual(resumen, reales)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CacheSlotsTests(TestCase):
+    """Caché de slots versionada: las escrituras del docente la invalidan."""
+
+    def setUp(self):
+        cache.clear()
+        self.docente = crear_docente(hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0))
+        self.fecha = timezone.localdate() + timedelta(days=3)
+
+    def test_segunda_lectura_sale_de_cache(self):
+        cache_slots.reiniciar_estadisticas()
+        primera = cache_slots.slots_cacheados(self.docente, self.fecha)
+        with self.assertNumQueries(0):
+            segunda = cache_slots.slots_cacheados(self.docente, self.fecha.isoformat())
+        self.assertEqual(primera, segunda)
+        self.assertEqual(cache_slots.estadisticas(), {"aciertos": 1, "fallos": 1})
+
+    def test_cita_invalida_al_confirmar(self):
+        self.assertEqual(len(cache_slots.slots_cacheados(self.docente, self.fecha)), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_cita(self.docente, crear_representantes(1)[0], a_las(self.fecha, 8, 20))
+        self.assertNotIn(a_las(self.fecha, 8, 20), cache_slots.slots_cacheados(self.docente, self.fecha))
+
+    def test_excepcion_y_feriado_invalidan(self):
+        cache_slots.slots_cacheados(self.docente, self.fecha)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExcepcionDisponibilidad.objects.create(docente=self.docente, fecha=self.fecha,
+                                                   hora_inicio=dtime(8, 0), hora_fin=dtime(8, 20))
+        self.assertEqual(len(cache_slots.slots_cacheados(self.docente, self.fecha)), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            FeriadoInstitucional.objects.create(nombre="Feriado", fecha_inicio=self.fecha, fecha_fin=self.fecha)
+        self.assertEqual(cache_slots.slots_cacheados(self.docente, self.fecha), [])
+
+    def test_invalidar_un_docente_no_toca_a_otro(self):
+        otro = crear_docente("otro", hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0))
+        version = cache_slots.version_docente(otro.pk)
+        cache_slots.invalidar_docente(self.docente.pk)
+        self.assertEqual(cache_slots.version_docente(otro.pk), version)
+        cache_slots.invalidar_feriados()
+        self.assertNotEqual(cache_slots.version_docente(otro.pk), version)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ValidacionReservaTests(TestCase):
+    """validar_reserva(): todos los motivos en una pasada, con código estable."""
+
+    def setUp(self):
+        self.docente = crear_docente(maximo_citas_diarias=2)
+        self.rep, self.otro = crear_representantes(2)
+        hoy = timezone.localdate()
+        # un lunes a más de 24h, para que los tres primeros días de la semana sean reservables
+        self.lunes = hoy + timedelta(days=7 - hoy.weekday())
+        if self.lunes - hoy < timedelta(days=2):
+            self.lunes += timedelta(days=7)
+
+    def codigos(self, inicio, minutos=20, **kwargs):
+        return [m.codigo for m in validar_reserva(self.docente, inicio, inicio + timedelta(minutes=minutos), **kwargs)]
+
+    def test_cita_valida(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(self.codigos(a_las(self.lunes, 9), representante=self.rep), [])
+
+    def test_tiempo_y_bloque(self):
+        self.assertEqual(self.codigos(a_las(timezone.localdate() - timedelta(days=1), 9))[0], "pasado")
+        self.assertIn("antelacion", self.codigos(timezone.now() + timedelta(hours=2)))
+        self.assertEqual(self.codigos(a_las(self.lunes, 9), minutos=0), ["rango"])
+        self.assertEqual(self.codigos(a_las(self.lunes, 9, 10), minutos=30), ["duracion", "alineacion"])
+
+    def test_solape_y_maximo_diario(self):
+        crear_cita(self.docente, self.otro, a_las(self.lunes, 9))
+        self.assertEqual(self.codigos(a_las(self.lunes, 9)), ["solape"])
+        crear_cita(self.docente, self.otro, a_las(self.lunes, 10))
+        self.assertEqual(self.codigos(a_las(self.lunes, 11)), ["maximo_diario"])
+        # las canceladas no cuentan
+        Cita.objects.update(estado=EstadoCita.CANCELADA)
+        self.assertEqual(self.codigos(a_las(self.lunes, 9)), [])
+
+    def test_excluir_la_propia_cita(self):
+        cita = crear_cita(self.docente, self.rep, a_las(self.lunes, 9))
+        self.assertEqual(self.codigos(a_las(self.lunes, 9), representante=self.rep, excluir_pk=cita.pk), [])
+
+    def test_cupos_del_representante(self):
+        crear_cita(self.docente, self.rep, a_las(self.lunes, 9))
+        self.assertEqual(self.codigos(a_las(self.lunes, 11), representante=self.rep), ["cupo_dia"])
+        crear_cita(self.docente, self.rep, a_las(self.lunes + timedelta(days=1), 9))
+        self.assertEqual(self.codigos(a_las(self.lunes + timedelta(days=2), 9), representante=self.rep),
+                         ["cupo_semana"])
+        # la semana siguiente empieza de cero
+        self.assertEqual(self.codigos(a_las(self.lunes + timedelta(days=7), 9), representante=self.rep), [])
+
+    def test_error_de_conserva_los_codigos(self):
+        motivos = validar_reserva(self.docente, a_las(self.lunes, 9, 10), a_las(self.lunes, 9, 40))
+        error = error_de(motivos)
+        self.assertEqual([e.code for e in error.error_list], ["duracion", "alineacion"])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+@override_settings(CACHES=CACHE_LOCAL)
+class SlotsLoteTests(TestCase):
+    """api_slots_lote: varios docentes y días en una respuesta compacta."""
+
+    def setUp(self):
+        self.docente = crear_docente(hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), departamento="Ciencias")
+        self.desde = timezone.localdate() + timedelta(days=2)
+        self.hasta = self.desde + timedelta(days=1)
+        crear_cita(self.docente, crear_representantes(1)[0], a_las(self.desde, 8, 20))
+        # el segundo día queda cerrado: no debe aparecer en la respuesta
+        ExcepcionDisponibilidad.objects.create(docente=self.docente, fecha=self.hasta,
+                                               hora_inicio=dtime(0, 0), hora_fin=dtime(23, 59))
+        cache.clear()
+        self.client.force_login(crear_representantes(1, prefijo="sesion")[0])
+
+    def pedir(self, **params):
+        return self.client.get(reverse("api_slots_lote"), {"docente_ids": self.docente.pk, "desde": self.desde,
+                                                           "hasta": self.hasta, **params})
+
+    def test_offsets(self):
+        r = self.pedir()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["docentes"], {
+            str(self.docente.pk): {"minutos_por_bloque": 20, "dias": {self.desde.isoformat(): [480, 520]}},
+        })
+
+    def test_bitmap(self):
+        r = self.pedir(formato="bitmap")
+        bits = base64.b64decode(r.json()["docentes"][str(self.docente.pk)]["dias"][self.desde.isoformat()])
+        self.assertEqual(len(bits), (24 * 60 // 20 + 7) // 8)
+        activos = [k for k in range(len(bits) * 8) if bits[k >> 3] & (0x80 >> (k & 7))]
+        self.assertEqual(activos, [480 // 20, 520 // 20])
+
+    def test_consultas_no_dependen_de_los_docentes(self):
+        self.pedir()  # horizonte de SlotLibre ya en caché
+        with CaptureQueriesContext(connection) as uno:
+            self.client.get(reverse("api_slots_lote"), {"departamento": "Ciencias", "desde": self.desde})
+        for i in range(3):
+            crear_docente(f"extra{i}", departamento="Ciencias")
+        with CaptureQueriesContext(connection) as cuatro:
+            r = self.client.get(reverse("api_slots_lote"), {"departamento": "Ciencias", "desde": self.desde})
+        self.assertEqual(len(r.json()["docentes"]), 4)
+        self.assertEqual(len(cuatro), len(uno))
+
+    def test_desde_slotlibre(self):
+        al_vuelo = self.pedir().json()["docentes"]
+        reconstruir_slots_libres(dias=10)
+        with CaptureQueriesContext(connection) as consultas:
+            r = self.pedir()
+        self.assertEqual(r.json()["docentes"], al_vuelo)
+        tablas = " ".join(q["sql"] for q in consultas)
+        self.assertEqual(tablas.count('FROM "turnos_slotlibre"'), 1)
+        self.assertNotIn("turnos_disponibilidadsemanal", tablas)
+
+    def test_requiere_sesion(self):
+        self.client.logout()
+        r = self.pedir()
+        self.assertEqual(r.status_code, 302)
+        self.assertTrue(r.url.startswith(reverse("login")))
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.pedir(formato="json").status_code, 400)
+        self.assertEqual(self.pedir(hasta=self.desde + timedelta(days=60)).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_slots_lote")).status_code, 400)
+
+
+def fila_estudiante(cedula, nombre="Est", curso="1A", rep_cedula="", rep_email="", parentesco="Madre", verificado="1"):
+    return {"cedula": cedula, "nombre": nombre, "curso": curso, "representante_cedula": rep_cedula,
+            "representante_email": rep_email, "parentesco": parentesco, "verificado": verificado}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ImportacionEstudiantesTests(TestCase):
+    """importar_estudiantes(): por lotes, con errores por fila y reimportación idempotente."""
+
+    def filas(self):
+        return [
+            fila_estudiante("1000000001", "Ana", rep_cedula="0900000001", rep_email="Mama@Colegio.test"),
+            fila_estudiante("1000000002", "Luis", rep_cedula="0900000001"),
+            fila_estudiante("1000000003", "Sol", rep_email="papa@colegio.test", parentesco="Padre"),
+            fila_estudiante("1000000004", "Solo"),
+            fila_estudiante("12", "Corta"),
+            fila_estudiante("1000000005", "Mal", rep_email="no-es-email"),
+        ]
+
+    def test_crea_estudiantes_representantes_y_relaciones(self):
+        r = importar_estudiantes(self.filas(), tam_lote=2)
+        self.assertEqual((r["filas"], r["estudiantes"], r["relaciones"]), (6, 4, 3))
+        self.assertEqual((r["estudiantes_nuevos"], r["representantes_nuevos"], r["relaciones_nuevas"]), (4, 2, 3))
+        self.assertEqual([n for n, _ in r["errores"]], [6, 7])
+
+        mama = User.objects.get(username="0900000001")
+        self.assertEqual((mama.cedula, mama.email, mama.rol.nombre), ("0900000001", "mama@colegio.test", "Representante"))
+        self.assertEqual(User.objects.get(email="papa@colegio.test").username, "papa@colegio.test")
+        self.assertEqual(sorted(RelacionRepresentacion.objects.filter(representante=mama)
+                                .values_list("estudiante__nombre", flat=True)), ["Ana", "Luis"])
+
+    def test_reimportar_no_duplica(self):
+        importar_estudiantes(self.filas())
+        totales = (Estudiante.objects.count(), User.objects.count(), RelacionRepresentacion.objects.count())
+        r = importar_estudiantes(self.filas())
+        self.assertEqual((r["estudiantes_nuevos"], r["representantes_nuevos"], r["relaciones_nuevas"]), (0, 0, 0))
+        self.assertEqual((Estudiante.objects.count(), User.objects.count(), RelacionRepresentacion.objects.count()),
+                         totales)
+
+    def test_la_ultima_fila_gana(self):
+        importar_estudiantes([fila_estudiante("1000000001", "Ana", curso="1A"),
+                              fila_estudiante("1000000001", "Ana María", curso="2B")], tam_lote=1)
+        self.assertEqual(list(Estudiante.objects.values_list("nombre", "curso")), [("Ana María", "2B")])
+
+    def test_consultas_por_lote_no_dependen_de_las_filas(self):
+        def filas(n, desde):
+            return [fila_estudiante(f"2{desde + i:09d}", rep_cedula=f"3{desde + i:09d}") for i in range(n)]
+        importar_estudiantes(filas(1, 0))  # rol y hash fuera de la medición
+        with CaptureQueriesContext(connection) as pocas:
+            importar_estudiantes(filas(2, 100))
+        with CaptureQueriesContext(connection) as muchas:
+            importar_estudiantes(filas(40, 200))
+        self.assertEqual(len(muchas), len(pocas))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ClaveInicialTests(TestCase):
+    """La contraseña inicial se hashea una vez por importación y sigue siendo verificable."""
+
+    def test_un_hash_por_importacion(self):
+        filas = [fila_estudiante(f"100000000{i}", rep_cedula=f"090000000{i}") for i in range(3)]
+        with mock.patch("turnos.importacion.make_password", wraps=make_password) as hashear:
+            importar_estudiantes(filas, tam_lote=1)
+        self.assertEqual(hashear.call_count, 1)
+        reps = User.objects.filter(username__startswith="09")
+        self.assertEqual(len({u.password for u in reps}), 1)
+        self.assertTrue(all(u.check_password(CLAVE_INICIAL) for u in reps))
+
+    def test_cada_importacion_usa_su_propia_sal(self):
+        importar_estudiantes([fila_estudiante("1000000001", rep_cedula="0900000001")])
+        importar_docentes([{"cedula": "0800000001", "nombres": "Doc"}])
+        primero = User.objects.get(username="0900000001")
+        segundo = User.objects.get(username="0800000001")
+        self.assertNotEqual(primero.password, segundo.password)
+        self.assertTrue(segundo.check_password(CLAVE_INICIAL))
+        segundo.set_password("otra-clave-1")
+        segundo.save()
+        self.assertTrue(User.objects.get(pk=segundo.pk).check_password("otra-clave-1"))
+        self.assertTrue(User.objects.get(pk=primero.pk).check_password(CLAVE_INICIAL))
+
+
+CSV_ESTUDIANTES = (
+    "cedula,nombre,curso,representante_cedula,representante_email,parentesco,verificado\n"
+    "1000000001,Ana,1A,0900000001,,Madre,1\n"
+    "12,Corta,1A,,,,0\n"
+)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class TrabajosTests(TestCase):
+    """Cola de trabajos: encolar, reclamar una sola vez y dejar el estado final."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def encolar_csv(self, contenido, nombre="alumnos.csv"):
+        return encolar(TipoTrabajo.IMPORTAR_ESTUDIANTES, archivo=SimpleUploadedFile(nombre, contenido))
+
+    def test_reclamar_en_orden_y_una_sola_vez(self):
+        primero = self.encolar_csv(CSV_ESTUDIANTES.encode())
+        segundo = self.encolar_csv(CSV_ESTUDIANTES.encode())
+        self.assertEqual(reclamar().pk, primero.pk)
+        reclamado = reclamar()
+        self.assertEqual((reclamado.pk, reclamado.estado), (segundo.pk, EstadoTrabajo.EN_CURSO))
+        self.assertIsNotNone(reclamado.iniciado_en)
+        self.assertIsNone(reclamar())
+
+    def test_ejecutar_importacion(self):
+        trabajo = self.encolar_csv(CSV_ESTUDIANTES.encode())
+        ruta = trabajo.archivo.path
+        trabajo = ejecutar(reclamar())
+        self.assertEqual(trabajo.estado, EstadoTrabajo.COMPLETADO)
+        self.assertEqual((trabajo.total, trabajo.procesados, trabajo.total_errores), (2, 2, 1))
+        self.assertEqual(trabajo.errores[0][0], 3)
+        self.assertIn("1 estudiantes", trabajo.resultado)
+        self.assertTrue(Estudiante.objects.filter(cedula="1000000001").exists())
+        # el archivo subido no se conserva
+        self.assertFalse(trabajo.archivo)
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_archivo_ilegible_deja_fallido(self):
+        trabajo = self.encolar_csv(b"\x1f\x8b\x08\x00roto", nombre="alumnos.csv.gz")
+        with self.assertRaises(ValueError):
+            ejecutar(reclamar())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, EstadoTrabajo.FALLIDO)
+        self.assertTrue(trabajo.resultado.startswith("Error: No se pudo leer el archivo"))
+
+    def test_marcar_interrumpidos(self):
+        self.encolar_csv(CSV_ESTUDIANTES.encode())
+        trabajo = reclamar()
+        self.assertEqual(marcar_interrumpidos(30), 0)
+        Trabajo.objects.filter(pk=trabajo.pk).update(actualizado_en=timezone.now() - timedelta(hours=1))
+        self.assertEqual(marcar_interrumpidos(30), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, EstadoTrabajo.FALLIDO)
+
+
+class ReclamarConcurrenteTests(HilosTestCase):
+    """Dos workers nunca reclaman el mismo trabajo."""
+
+    HILOS = 6
+
+    def test_cada_trabajo_una_vez(self):
+        Trabajo.objects.bulk_create([Trabajo(tipo=TipoTrabajo.BLOQUEO_MASIVO) for _ in range(30)])
+        reclamados = []
+
+        def trabajar(i):
+            while True:
+                try:
+                    trabajo = reclamar()
+                except OperationalError:  # SQLite ocupada: otro worker está escribiendo
+                    continue
+                if trabajo is None:
+                    return
+                reclamados.append(trabajo.pk)
+
+        self.assertEqual(en_hilos(self.HILOS, trabajar), [])
+        self.assertEqual(len(reclamados), 30)
+        self.assertEqual(len(set(reclamados)), 30)
+
+
+def fila_docente(cedula="0800000001", disponibilidad="", reemplazar="0", **campos):
+    return {"cedula": cedula, "nombres": "Doc", "apellidos": "Ente", "email": f"{cedula}@colegio.test",
+            "disponibilidad": disponibilidad, "reemplazar_disponibilidad": reemplazar, **campos}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ImportacionDocentesTests(TestCase):
+    """importar_docentes(): disponibilidad por diff y simulación sin escrituras."""
+
+    def franjas(self, cedula="0800000001"):
+        return sorted(DisponibilidadSemanal.objects.filter(docente__usuario__cedula=cedula)
+                      .values_list("dia_semana", "hora_inicio", "hora_fin"))
+
+    def test_crea_docente_y_franjas(self):
+        r = importar_docentes([fila_docente(disponibilidad="LUN 08:00-10:00|MIE 09:00-11:00", departamento="Ciencias")])
+        self.assertEqual((r["creados"], r["franjas_creadas"], r["franjas_borradas"], r["errores"]), (1, 2, 0, []))
+        self.assertEqual(self.franjas(), [(0, dtime(8), dtime(10)), (2, dtime(9), dtime(11))])
+        self.assertEqual(PerfilDocente.objects.get(usuario__cedula="0800000001").departamento, "Ciencias")
+
+    def test_archivo_sin_cambios_no_escribe_franjas(self):
+        fila = fila_docente(disponibilidad="LUN 08:00-10:00|MIE 09:00-11:00", reemplazar="1")
+        importar_docentes([fila])
+        with CaptureQueriesContext(connection) as consultas:
+            r = importar_docentes([fila])
+        self.assertEqual((r["creados"], r["actualizados"], r["franjas_creadas"], r["franjas_borradas"]), (0, 1, 0, 0))
+        escrituras = [q["sql"] for q in consultas if "disponibilidadsemanal" in q["sql"].lower()
+                      and not q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertEqual(escrituras, [])
+
+    def test_reemplazar_borra_solo_lo_que_sobra(self):
+        importar_docentes([fila_docente(disponibilidad="LUN 08:00-10:00|MIE 09:00-11:00")])
+        lunes = DisponibilidadSemanal.objects.get(dia_semana=0).pk
+        r = importar_docentes([fila_docente(disponibilidad="LUN 08:00-10:00|VIE 08:00-09:00", reemplazar="1")])
+        self.assertEqual((r["franjas_creadas"], r["franjas_borradas"]), (1, 1))
+        self.assertEqual(self.franjas(), [(0, dtime(8), dtime(10)), (4, dtime(8), dtime(9))])
+        self.assertTrue(DisponibilidadSemanal.objects.filter(pk=lunes).exists())
+
+    def test_sin_reemplazar_solo_agrega(self):
+        importar_docentes([fila_docente(disponibilidad="LUN 08:00-10:00")])
+        r = importar_docentes([fila_docente(disponibilidad="VIE 08:00-09:00")])
+        self.assertEqual((r["franjas_creadas"], r["franjas_borradas"]), (1, 0))
+        self.assertEqual(len(self.franjas()), 2)
+
+    def test_disponibilidad_invalida_se_reporta(self):
+        r = importar_docentes([fila_docente(disponibilidad="XYZ 08:00-10:00|LUN 10:00-08:00")])
+        self.assertEqual(r["errores"][0][0], 2)
+        self.assertIn("Día inválido", r["errores"][0][1])
+        self.assertEqual(self.franjas(), [])
+
+    def test_simular_lista_el_diff_y_no_guarda(self):
+        importar_docentes([fila_docente(disponibilidad="LUN 08:00-10:00|MIE 09:00-11:00")])
+        usuarios = User.objects.count()
+        r = importar_docentes([
+            fila_docente(disponibilidad="LUN 08:00-10:00|VIE 08:00-09:00", reemplazar="1"),
+            fila_docente("0800000002", disponibilidad="MAR 07:00-08:00"),
+        ], simular=True)
+        self.assertEqual((r["creados"], r["actualizados"], r["franjas_creadas"], r["franjas_borradas"]), (1, 1, 2, 1))
+        self.assertEqual(r["diff"], ["0800000001: + VIE 08:00-09:00", "0800000001: - MIE 09:00-11:00",
+                                     "0800000002: + MAR 07:00-08:00"])
+        self.assertEqual(User.objects.count(), usuarios)
+        self.assertEqual(self.franjas(), [(0, dtime(8), dtime(10)), (2, dtime(9), dtime(11))])
+
+    def test_simular_revierte_cada_lote(self):
+        vistos = []
+        r = importar_docentes([fila_docente(f"080000000{i}", disponibilidad="LUN 08:00-10:00") for i in range(1, 4)],
+                              tam_lote=1, simular=True,
+                              progreso=lambda r: vistos.append((r["filas"], User.objects.count())))
+        # el avance de cada lote ya no ve sus escrituras: no hay una transacción por todo el archivo
+        self.assertEqual(vistos, [(1, 0), (2, 0), (3, 0)])
+        self.assertEqual((r["creados"], r["franjas_creadas"]), (3, 3))
+        self.assertFalse(Rol.objects.filter(nombre="Docente").exists())
+
+
+class LecturaCsvTests(SimpleTestCase):
+    """lineas_csv(): decodificación incremental con gzip, BOM y respaldo a latin-1."""
+
+    TEXTO = 'cedula,nombre\r\n1000000001,José Ñúñez\r\n1000000002,"Ana\nMaría"\r\n'
+
+    def leer(self, datos, tam_bloque=3):
+        return "".join(lineas_csv(io.BytesIO(datos), tam_bloque=tam_bloque))
+
+    def test_utf8_cortado_entre_bloques(self):
+        for tam in (1, 2, 3, 5, 64):
+            self.assertEqual(self.leer(self.TEXTO.encode("utf-8"), tam), self.TEXTO)
+
+    def test_bom(self):
+        self.assertEqual(self.leer(codecs.BOM_UTF8 + self.TEXTO.encode("utf-8")), self.TEXTO)
+        self.assertEqual(self.leer(codecs.BOM_UTF16_LE + self.TEXTO.encode("utf-16-le")), self.TEXTO)
+        self.assertEqual(self.leer(codecs.BOM_UTF16_BE + self.TEXTO.encode("utf-16-be")), self.TEXTO)
+
+    def test_respaldo_latin1(self):
+        self.assertEqual(self.leer(self.TEXTO.encode("latin-1")), self.TEXTO)
+
+    def test_gzip(self):
+        comprimido = gzip.compress(codecs.BOM_UTF8 + self.TEXTO.encode("utf-8"))
+        self.assertEqual(self.leer(comprimido), self.TEXTO)
+        self.assertEqual(contar_lineas(io.BytesIO(comprimido)), 4)
+
+    def test_dictreader_con_campo_multilinea(self):
+        filas = list(csv.DictReader(lineas_csv(io.BytesIO(self.TEXTO.encode("utf-8")), tam_bloque=4)))
+        self.assertEqual([f["nombre"] for f in filas], ["José Ñúñez", "Ana\nMaría"])
+
+    def test_sin_salto_final(self):
+        self.assertEqual(list(lineas_csv(io.BytesIO(b"a,b\n1,2"))), ["a,b\n", "1,2"])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class SinteticosTests(TestCase):
+    """Colegio sintético: reproducible por semilla y removible sin tocar datos reales."""
+
+    def test_misma_semilla_mismas_filas(self):
+        self.assertEqual(list(sinteticos.filas_docentes(5, 7)), list(sinteticos.filas_docentes(5, 7)))
+        self.assertEqual(list(sinteticos.filas_estudiantes(20, 7)), list(sinteticos.filas_estudiantes(20, 7)))
+        self.assertNotEqual(list(sinteticos.filas_docentes(5, 7)), list(sinteticos.filas_docentes(5, 8)))
+
+    def test_generar_y_limpiar(self):
+        real = crear_docente("real")
+        cita_real = crear_cita(real, crear_representantes(1)[0], a_las(timezone.localdate() + timedelta(days=3), 9))
+
+        r = sinteticos.generar_colegio(docentes=3, estudiantes=20, semanas=4, citas_por_semana=2,
+                                       excepciones_por_docente=1, feriados=1)
+        self.assertEqual((r["docentes"], r["estudiantes"], r["feriados"]), (3, 20, 1))
+        self.assertGreater(r["citas"], 0)
+        self.assertTrue(sinteticos.existen())
+        citas = Cita.objects.exclude(pk=cita_real.pk)
+        self.assertEqual(citas.count(), r["citas"])
+        # sin dos citas del mismo docente a la misma hora
+        self.assertFalse(citas.values("docente", "inicio").annotate(n=Count("pk")).filter(n__gt=1).exists())
+        self.assertEqual(sum(EstadisticaDiaria.objects.exclude(docente=real).values_list("citas", flat=True)),
+                         r["citas"])
+
+        borrados = sinteticos.limpiar()
+        self.assertEqual((borrados["citas"], borrados["estudiantes"], borrados["feriados"]), (r["citas"], 20, 1))
+        self.assertFalse(sinteticos.existen())
+        self.assertEqual(list(Cita.objects.values_list("pk", flat=True)), [cita_real.pk])
+        self.assertEqual(list(PerfilDocente.objects.values_list("pk", flat=True)), [real.pk])
+        self.assertFalse(EstadisticaDiaria.objects.exclude(docente=real).exists())
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ExportacionCsvTests(TestCase):
+    """Exportación CSV en streaming: texto entrecomillado y consultas fijas."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="x",
+                                              rol=Rol.objects.create(nombre="Administrador"))
+        self.docente = crear_docente(departamento="Ciencias")
+        self.docente.usuario.first_name, self.docente.usuario.last_name = "Rosa", "Vera"
+        self.docente.usuario.save()
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        self.client.force_login(self.admin)
+
+    def descargar(self):
+        r = self.client.get(reverse("resumen_hoy"), {"export": "1", "desde": self.fecha, "hasta": self.fecha})
+        self.assertTrue(r.streaming)
+        return r, b"".join(r.streaming_content).decode("utf-8")
+
+    def test_respuesta_por_bloques_y_perezosa(self):
+        leidas = []
+
+        def filas():
+            for i in range(5):
+                leidas.append(i)
+                yield [i, f"fila {i}"]
+
+        with mock.patch("turnos.exportacion.FILAS_POR_ENVIO", 2):
+            r = respuesta_csv(["n", "texto"], filas(), "x.csv")
+            self.assertEqual(leidas, [])
+            bloques = list(r.streaming_content)
+        self.assertEqual(len(bloques), 4)  # encabezado + 2 + 2 + 1
+        self.assertEqual(r["Content-Disposition"], 'attachment; filename="x.csv"')
+        self.assertEqual(b"".join(bloques).decode().splitlines()[-1], "4,fila 4")
+
+    def test_csv_entrecomilla_el_texto_libre(self):
+        rep = crear_representantes(1)[0]
+        crear_cita(self.docente, rep, a_las(self.fecha, 9), motivo='Notas, "tareas"\ny conducta')
+        r, texto = self.descargar()
+        self.assertEqual(r["Content-Type"], "text/csv; charset=utf-8")
+        filas = list(csv.reader(io.StringIO(texto)))
+        self.assertEqual(filas[0][:3], ["inicio", "fin", "estado"])
+        self.assertEqual(filas[1], [f"{self.fecha} 09:00", "09:20", EstadoCita.PENDIENTE, "Rosa Vera", "Ciencias",
+                                    rep.username, "Est", "1A", 'Notas, "tareas"\ny conducta'])
+
+    def test_consultas_no_dependen_de_las_citas(self):
+        reps = crear_representantes(20)
+        crear_cita(self.docente, reps[0], a_las(self.fecha, 8))
+        with CaptureQueriesContext(connection) as una:
+            self.descargar()
+        for i in range(1, 20):
+            crear_cita(self.docente, reps[i], a_las(self.fecha, 8) + timedelta(minutes=20 * i))
+        with CaptureQueriesContext(connection) as veinte:
+            _, texto = self.descargar()
+        self.assertEqual(len(texto.splitlines()), 21)
+        self.assertEqual(len(veinte), len(una))
+
+    def test_exportar_admin_rango_invalido_responde_400(self):
+        url = reverse("exportar_citas_csv")
+        r = self.client.get(url, {"desde": self.fecha, "hasta": self.fecha - timedelta(days=1)})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("no puede ser anterior", r.content.decode())
+        self.assertEqual(self.client.get(url, {"desde": "no-es-fecha"}).status_code, 400)
+
+    def test_exportar_admin_sin_filtros_usa_la_ventana_por_defecto(self):
+        r = self.client.get(reverse("exportar_citas_csv"))
+        hoy = timezone.localdate()
+        self.assertIn(f"citas_{hoy}_a_{hoy + timedelta(days=7)}.csv", r["Content-Disposition"])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CitaQuerySetTests(TestCase):
+    """en_fecha/en_semana/entre: límites por fecha local sobre la columna 'inicio'."""
+
+    def setUp(self):
+        self.docente = crear_docente(hora_inicio=dtime(0, 0), hora_fin=dtime(23, 59))
+        self.rep = crear_representantes(1)[0]
+        self.lunes = timezone.localdate() + timedelta(days=7 - timezone.localdate().weekday())
+        # 23:40 local ya es el día siguiente en UTC (UTC-5)
+        self.citas = {
+            nombre: crear_cita(self.docente, self.rep, inicio) for nombre, inicio in {
+                "domingo_previo": a_las(self.lunes - timedelta(days=1), 23, 40),
+                "lunes_00": a_las(self.lunes, 0),
+                "lunes_2340": a_las(self.lunes, 23, 40),
+                "martes_00": a_las(self.lunes + timedelta(days=1), 0),
+                "domingo_2340": a_las(self.lunes + timedelta(days=6), 23, 40),
+                "lunes_siguiente": a_las(self.lunes + timedelta(days=7), 0),
+            }.items()
+        }
+
+    def nombres(self, qs):
+        pks = set(qs.values_list("pk", flat=True))
+        return sorted(n for n, c in self.citas.items() if c.pk in pks)
+
+    def test_en_fecha_usa_el_dia_local(self):
+        self.assertEqual(self.nombres(Cita.objects.en_fecha(self.lunes)), ["lunes_00", "lunes_2340"])
+        self.assertEqual(self.nombres(Cita.objects.en_fecha(self.lunes)),
+                         self.nombres(Cita.objects.filter(inicio__date=self.lunes)))
+
+    def test_en_semana_de_lunes_a_domingo(self):
+        self.assertEqual(self.nombres(Cita.objects.en_semana(self.lunes + timedelta(days=3))),
+                         ["domingo_2340", "lunes_00", "lunes_2340", "martes_00"])
+
+    def test_entre_con_limites_abiertos(self):
+        self.assertEqual(self.nombres(Cita.objects.entre(self.lunes + timedelta(days=1))),
+                         ["domingo_2340", "lunes_siguiente", "martes_00"])
+        self.assertEqual(self.nombres(Cita.objects.entre(hasta=self.lunes - timedelta(days=1))), ["domingo_previo"])
+        self.assertEqual(Cita.objects.entre().count(), len(self.citas))
+
+    def test_sin_funciones_sobre_la_columna(self):
+        sql = str(Cita.objects.filter(representante=self.rep).en_semana(self.lunes).query)
+        self.assertNotIn("cast_date", sql.lower())
+
+    @skipUnless(connection.vendor == "sqlite", "plan de consulta de SQLite")
+    def test_cupo_del_representante_usa_su_indice(self):
+        indice = next(i.name for i in Cita._meta.indexes if i.fields == ["representante", "inicio"])
+        plan = (Cita.objects.filter(representante=self.rep, estado__in=[EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA])
+                .en_semana(self.lunes).order_by().explain())
+        self.assertIn(indice, plan)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class MetricasDashboardTests(TestCase):
+    """Instantánea de métricas: se sirve de la caché y se borra cuando cambia una cita."""
+
+    def setUp(self):
+        cache.clear()
+        self.docente = crear_docente()
+        self.reps = crear_representantes(2)
+        self.hoy = timezone.localdate()
+
+    def citar(self, rep, hora, **campos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return crear_cita(self.docente, rep, a_las(self.hoy, hora), **campos)
+
+    def test_segunda_lectura_sin_consultas(self):
+        primera = metricas_dashboard()
+        with self.assertNumQueries(0):
+            self.assertEqual(metricas_dashboard(), primera)
+
+    def test_cambio_de_cita_invalida(self):
+        self.assertEqual(metricas_dashboard()["total_hoy"], 0)
+        cita = self.citar(self.reps[0], 9)
+        self.citar(self.reps[1], 10, estado=EstadoCita.CONFIRMADA)
+        m = metricas_dashboard()
+        self.assertEqual((m["total_hoy"], m["pend_hoy"], m["conf_hoy"], m["canc_hoy"]), (2, 1, 1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.estado = EstadoCita.CANCELADA
+            cita.save()
+        m = metricas_dashboard()
+        self.assertEqual((m["total_hoy"], m["pend_hoy"], m["canc_hoy"]), (2, 0, 1))
+
+    def test_bloqueos_hoy_cuenta_los_feriados_que_bloquean(self):
+        ExcepcionDisponibilidad.objects.create(docente=self.docente, fecha=self.hoy, hora_inicio=dtime(8),
+                                               hora_fin=dtime(9), tipo=TipoExcepcion.BLOQUEO)
+        FeriadoInstitucional.objects.create(nombre="Jornada", fecha_inicio=self.hoy - timedelta(days=1),
+                                            fecha_fin=self.hoy + timedelta(days=1))
+        FeriadoInstitucional.objects.create(nombre="Referencia", fecha_inicio=self.hoy, fecha_fin=self.hoy,
+                                            bloquea_agenda=False)
+        FeriadoInstitucional.objects.create(nombre="Mañana", fecha_inicio=self.hoy + timedelta(days=1),
+                                            fecha_fin=self.hoy + timedelta(days=1))
+        self.assertEqual(metricas_dashboard()["bloqueos_hoy"], 2)
+
+    def test_instantanea_de_otro_dia_se_recalcula(self):
+        cache.set(CLAVE_METRICAS, {"hoy": self.hoy - timedelta(days=1), "total_hoy": 99})
+        self.assertEqual(metricas_dashboard()["total_hoy"], 0)
+        self.assertEqual(cache.get(CLAVE_METRICAS)["hoy"], self.hoy)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class EstadisticaDiariaTests(TestCase):
+    """Resumen diario: se recalcula al cambiar una cita y coincide con la reconstrucción completa."""
+
+    def setUp(self):
+        self.docente = crear_docente(departamento="Ciencias")
+        self.reps = crear_representantes(3)
+        self.lunes = timezone.localdate() + timedelta(days=7 - timezone.localdate().weekday())
+
+    def resumen(self):
+        return sorted(EstadisticaDiaria.objects.values_list("fecha", "departamento", "estado", "citas", "minutos"))
+
+    def test_mover_una_cita_rehace_ambos_dias(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cita = crear_cita(self.docente, self.reps[0], a_las(self.lunes, 9))
+        self.assertEqual(self.resumen(), [(self.lunes, "Ciencias", EstadoCita.PENDIENTE, 1, 20)])
+        martes = self.lunes + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.inicio, cita.fin = a_las(martes, 9), a_las(martes, 9, 20)
+            cita.estado = EstadoCita.CONFIRMADA
+            cita.save()
+        self.assertEqual(self.resumen(), [(martes, "Ciencias", EstadoCita.CONFIRMADA, 1, 20)])
+
+    def test_reconstruir_igual_a_las_senales(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_cita(self.docente, self.reps[0], a_las(self.lunes, 9))
+            crear_cita(self.docente, self.reps[1], a_las(self.lunes, 10), estado=EstadoCita.CANCELADA)
+            crear_cita(self.docente, self.reps[2], a_las(self.lunes + timedelta(days=2), 23, 40))
+        por_senales = self.resumen()
+        EstadisticaDiaria.objects.all().delete()
+        self.assertEqual(reconstruir_estadisticas(), 3)
+        self.assertEqual(self.resumen(), por_senales)
+
+    def test_departamento_y_tendencia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_cita(self.docente, self.reps[0], a_las(self.lunes, 9))
+            crear_cita(self.docente, self.reps[1], a_las(self.lunes, 10), estado=EstadoCita.CANCELADA)
+            crear_cita(self.docente, self.reps[2], a_las(self.lunes + timedelta(days=7), 9), estado=EstadoCita.CONFIRMADA)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.docente.departamento = "Lengua"
+            self.docente.save()
+        self.assertEqual(set(EstadisticaDiaria.objects.values_list("departamento", flat=True)), {"Lengua"})
+
+        semanas = tendencia_semanal(self.lunes, self.lunes + timedelta(days=13), departamento="lengua")
+        self.assertEqual([(s["semana"], s[EstadoCita.PENDIENTE], s[EstadoCita.CANCELADA], s["minutos"]) for s in semanas],
+                         [(self.lunes, 1, 1, 20), (self.lunes + timedelta(days=7), 0, 0, 20)])
+        self.assertEqual(semanas[1][EstadoCita.CONFIRMADA], 1)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PaginacionCursorTests(TestCase):
+    """Paginación keyset sobre (inicio, id): sin huecos ni repetidos, en ambas direcciones."""
+
+    def setUp(self):
+        docentes = [crear_docente(f"docente{i}") for i in range(3)]
+        reps = crear_representantes(12)
+        base = a_las(timezone.localdate() + timedelta(days=3), 8)
+        # cuatro horarios con tres citas cada uno: los empates se resuelven por id
+        for i in range(12):
+            crear_cita(docentes[i % 3], reps[i], base + timedelta(minutes=20 * (i // 3)))
+        self.orden = list(Cita.objects.order_by("inicio", "pk").values_list("pk", flat=True))
+
+    def recorrer(self, descendente=False):
+        paginas, cursor = [], ""
+        while True:
+            pagina = paginar_por_cursor(Cita.objects.all(), cursor, por_pagina=5, descendente=descendente)
+            paginas.append([c.pk for c in pagina])
+            if not pagina.has_next:
+                return paginas, pagina
+            cursor = pagina.siguiente
+
+    def test_hacia_adelante_sin_huecos(self):
+        paginas, ultima = self.recorrer()
+        self.assertEqual([len(p) for p in paginas], [5, 5, 2])
+        self.assertEqual(sum(paginas, []), self.orden)
+        self.assertTrue(ultima.has_previous)
+
+    def test_hacia_atras_repite_las_mismas_paginas(self):
+        paginas, pagina = self.recorrer()
+        vistas = [[c.pk for c in pagina]]
+        while pagina.has_previous:
+            pagina = paginar_por_cursor(Cita.objects.all(), pagina.anterior, por_pagina=5)
+            vistas.insert(0, [c.pk for c in pagina])
+        self.assertEqual(vistas, paginas)
+        self.assertFalse(pagina.has_previous)
+
+    def test_descendente(self):
+        paginas, _ = self.recorrer(descendente=True)
+        self.assertEqual(sum(paginas, []), self.orden[::-1])
+
+    def test_una_consulta_por_pagina(self):
+        primera = paginar_por_cursor(Cita.objects.all(), "", por_pagina=5)
+        with self.assertNumQueries(1):
+            paginar_por_cursor(Cita.objects.all(), primera.siguiente, por_pagina=5)
+
+    def test_cursor_invalido_vuelve_a_la_primera(self):
+        primera = [c.pk for c in paginar_por_cursor(Cita.objects.all(), "", por_pagina=5)]
+        for cursor in ("%%%", "no-es-base64!", codificar_cursor("x", timezone.now(), 1)[:-2] + "zz"):
+            self.assertEqual([c.pk for c in paginar_por_cursor(Cita.objects.all(), cursor, por_pagina=5)], primera)
+
+    def test_cursor_ida_y_vuelta(self):
+        inicio = timezone.now().replace(microsecond=123456)
+        self.assertEqual(decodificar_cursor(codificar_cursor(SIGUIENTE, inicio, 42)), (SIGUIENTE, (inicio, 42)))
+        self.assertEqual(decodificar_cursor(codificar_cursor("x", inicio, 42)), (None, None))
+
+    def test_urls_conservan_los_filtros(self):
+        request = RequestFactory().get("/", {"estado": "PENDIENTE", "page": "3"})
+        pagina = paginar(request, Cita.objects.all(), por_pagina=5)
+        self.assertEqual(pagina.url_anterior, "")
+        self.assertEqual(QueryDict(pagina.url_siguiente[1:]).dict(),
+                         {"estado": "PENDIENTE", "cursor": pagina.siguiente})
+
+    def test_mis_citas_del_representante(self):
+        rep = User.objects.create_user(username="mama", password="x", rol=Rol.objects.create(nombre="Representante"))
+        docente = crear_docente("propio")
+        base = a_las(timezone.localdate() + timedelta(days=10), 7)
+        propias = [crear_cita(docente, rep, base + timedelta(minutes=20 * i)).pk for i in range(30)]
+        self.client.force_login(rep)
+        vistas, url = [], reverse("rep_mis_citas")
+        while url:
+            r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            vistas += [c.pk for c in r.context["citas"]]
+            url = r.context["citas"].url_siguiente and reverse("rep_mis_citas") + r.context["citas"].url_siguiente
+        self.assertEqual(vistas, propias[::-1])
+
+
+class CorreoQueFalla(BaseEmailBackend):
+    """Backend de prueba: rechaza los mensajes para falla@...; el resto va a mail.outbox."""
+
+    conexiones = 0
+
+    def open(self):
+        if not getattr(self, "abierta", False):
+            self.abierta = True
+            CorreoQueFalla.conexiones += 1
+        return True
+
+    def close(self):
+        self.abierta = False
+
+    def send_messages(self, mensajes):
+        for m in mensajes:
+            if any(d.startswith("falla@") for d in m.to):
+                raise smtplib.SMTPRecipientsRefused({m.to[0]: (550, b"no existe")})
+            mail.outbox.append(m)
+        return len(mensajes)
+
+
+@override_settings(CACHES=CACHE_LOCAL, EMAIL_BACKEND="turnos.tests.CorreoQueFalla")
+class BandejaSalidaTests(TestCase):
+    """Bandeja de salida: una vez por clave, en la transacción del cambio y con reintentos exponenciales."""
+
+    def setUp(self):
+        cache.clear()
+        CorreoQueFalla.conexiones = 0
+
+    def encolar(self, clave, destinatarios):
+        encolar_notificacion(clave, "Asunto", "emails/cita_creada.html", {"inicio": timezone.now()}, destinatarios)
+
+    def test_una_sola_vez_por_clave(self):
+        self.encolar("a", ["uno@colegio.test", "uno@colegio.test", ""])
+        self.encolar("a", ["otro@colegio.test"])
+        self.assertEqual(list(NotificacionPendiente.objects.values_list("clave", "destinatarios")),
+                         [("a", ["uno@colegio.test"])])
+
+    def test_sin_destinatarios_no_se_encola(self):
+        self.encolar("vacia", [None, ""])
+        self.assertFalse(NotificacionPendiente.objects.exists())
+
+    def test_se_revierte_con_la_transaccion(self):
+        docente = crear_docente()
+        rep = crear_representantes(1)[0]
+        inicio = a_las(timezone.localdate() + timedelta(days=3), 9)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            reservar_cita(docente=docente, representante=rep, curso_estudiante="1A", nombre_estudiante="Est",
+                          motivo="m", inicio=inicio)
+            self.assertTrue(NotificacionPendiente.objects.exists())
+            raise RuntimeError
+        self.assertFalse(NotificacionPendiente.objects.exists())
+        cita = reservar_cita(docente=docente, representante=rep, curso_estudiante="1A", nombre_estudiante="Est",
+                             motivo="m", inicio=inicio)
+        self.assertTrue(NotificacionPendiente.objects.filter(clave=f"cita:{cita.pk}:creada").exists())
+
+    def test_lote_por_una_conexion(self):
+        for i in range(5):
+            self.encolar(f"n{i}", [f"p{i}@colegio.test"])
+        self.assertEqual(enviar_pendientes(), {"enviadas": 5, "fallidas": 0})
+        self.assertEqual(CorreoQueFalla.conexiones, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertEqual(NotificacionPendiente.objects.filter(estado=EstadoNotificacion.ENVIADA).count(), 5)
+        self.assertEqual(enviar_pendientes(), {"enviadas": 0, "fallidas": 0})
+
+    def test_fallo_reintenta_con_espera_creciente(self):
+        self.encolar("mala", ["falla@colegio.test"])
+        self.encolar("buena", ["bien@colegio.test"])
+        self.assertEqual(enviar_pendientes(), {"enviadas": 1, "fallidas": 1})
+        self.assertEqual([m.to for m in mail.outbox], [["bien@colegio.test"]])
+
+        mala = NotificacionPendiente.objects.get(clave="mala")
+        for intento in range(1, MAX_INTENTOS):
+            self.assertEqual((mala.estado, mala.intentos, mala.reservada_por), (EstadoNotificacion.PENDIENTE, intento, ""))
+            self.assertIn("SMTPRecipientsRefused", mala.ultimo_error)
+            espera = mala.proximo_intento - timezone.now()
+            self.assertAlmostEqual(espera.total_seconds(), (ESPERA_BASE * 2 ** (intento - 1)).total_seconds(), delta=5)
+            # antes de tiempo no se vuelve a intentar
+            self.assertEqual(enviar_pendientes(), {"enviadas": 0, "fallidas": 0})
+            NotificacionPendiente.objects.filter(pk=mala.pk).update(proximo_intento=timezone.now())
+            self.assertEqual(enviar_pendientes(), {"enviadas": 0, "fallidas": 1})
+            mala.refresh_from_db()
+        self.assertEqual((mala.estado, mala.intentos), (EstadoNotificacion.FALLIDA, MAX_INTENTOS))
+
+    def test_un_lote_reservado_no_se_toma_dos_veces(self):
+        self.encolar("a", ["uno@colegio.test"])
+        self.assertEqual(len(_reservar_lote(10)), 1)
+        self.assertEqual(_reservar_lote(10), [])
+
+    def test_purgar_enviadas(self):
+        self.encolar("vieja", ["uno@colegio.test"])
+        enviar_pendientes()
+        self.assertEqual(purgar_enviadas(30), 0)
+        NotificacionPendiente.objects.update(enviada_en=timezone.now() - timedelta(days=31))
+        self.assertEqual(purgar_enviadas(30), 1)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ResumenAvisosTests(TestCase):
+    """Copias a administradores: inmediatas como destinatario, el resto agrupadas en un resumen."""
+
+    def setUp(self):
+        cache.clear()
+        rol = Rol.objects.create(nombre="Administrador")
+        self.inmediato = User.objects.create(username="adm1", email="adm1@colegio.test", rol=rol)
+        self.diario = User.objects.create(username="adm2", email="adm2@colegio.test", rol=rol,
+                                          frecuencia_avisos=FrecuenciaAvisos.DIA)
+        self.horario = User.objects.create(username="adm3", email="adm3@colegio.test", rol=rol,
+                                           frecuencia_avisos=FrecuenciaAvisos.HORA)
+
+    def avisar(self, clave):
+        encolar_notificacion(clave, f"Aviso {clave}", "emails/cita_creada.html",
+                             {"docente": "Doc", "representante": "Rep", "inicio": timezone.now()},
+                             ["doc@colegio.test"], copia_admins=True)
+
+    def test_inmediatos_copiados_y_el_resto_como_evento(self):
+        self.avisar("c1")
+        self.avisar("c1")  # repetida: ni otro correo ni otro evento
+        self.assertEqual(NotificacionPendiente.objects.get().destinatarios, ["doc@colegio.test", "adm1@colegio.test"])
+        self.assertEqual(sorted(EventoResumen.objects.values_list("usuario__username", "clave")),
+                         [("adm2", "c1"), ("adm3", "c1")])
+
+    def test_un_resumen_por_destinatario(self):
+        for clave in ("c1", "c2", "c3"):
+            self.avisar(clave)
+        NotificacionPendiente.objects.all().delete()
+        self.assertEqual(enviar_resumenes(FrecuenciaAvisos.DIA), 1)
+        resumen = NotificacionPendiente.objects.get()
+        self.assertEqual((resumen.destinatarios, resumen.asunto),
+                         (["adm2@colegio.test"], "Resumen diario: 3 aviso(s) de citas"))
+        self.assertIn("Aviso c2", resumen.texto)
+        # los eventos incluidos se borran; los del resumen por hora siguen esperando
+        self.assertEqual(set(EventoResumen.objects.values_list("usuario__username", flat=True)), {"adm3"})
+        self.assertEqual(enviar_resumenes(FrecuenciaAvisos.DIA), 0)
+
+    def test_vuelto_a_inmediata_recibe_lo_pendiente(self):
+        self.avisar("c1")
+        self.diario.frecuencia_avisos = FrecuenciaAvisos.INMEDIATA
+        self.diario.save()
+        self.assertEqual(enviar_resumenes(FrecuenciaAvisos.HORA), 2)
+        self.assertFalse(EventoResumen.objects.exists())
+
+    def test_lista_de_admins_en_cache_e_invalidada(self):
+        def emails():
+            return [a["email"] for a in _admins()]
+
+        self.assertEqual(emails(), ["adm1@colegio.test", "adm2@colegio.test", "adm3@colegio.test"])
+        with self.assertNumQueries(0):
+            emails()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.horario.is_active = False
+            self.horario.save()
+        self.assertEqual(emails(), ["adm1@colegio.test", "adm2@colegio.test"])
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(username="adm4", email="adm4@colegio.test", rol=self.inmediato.rol)
+        self.assertIn("adm4@colegio.test", emails())
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class RecordatoriosTests(TestCase):
+    """Recordatorios: uno por cita activa de la ventana, nunca dos."""
+
+    def setUp(self):
+        self.docente = crear_docente(hora_inicio=dtime(0, 0), hora_fin=dtime(23, 59))
+        reps = crear_representantes(5)
+        base = timezone.now().replace(second=0, microsecond=0)
+        base -= timedelta(minutes=base.minute % 20)
+        self.pronto = crear_cita(self.docente, reps[0], base + timedelta(hours=2))
+        self.confirmada = crear_cita(self.docente, reps[1], base + timedelta(hours=5), estado=EstadoCita.CONFIRMADA)
+        self.cancelada = crear_cita(self.docente, reps[2], base + timedelta(hours=3), estado=EstadoCita.CANCELADA)
+        self.lejana = crear_cita(self.docente, reps[3], base + timedelta(hours=30))
+        self.pasada = crear_cita(self.docente, reps[4], base - timedelta(hours=1))
+
+    def recordadas(self):
+        return set(Cita.objects.filter(recordatorio_enviado_en__isnull=False).values_list("pk", flat=True))
+
+    def test_solo_citas_activas_de_la_ventana(self):
+        avances = []
+        self.assertEqual(enviar_recordatorios(horas=24, tam_lote=1, progreso=avances.append), 2)
+        self.assertEqual(avances, [1, 2])
+        self.assertEqual(self.recordadas(), {self.pronto.pk, self.confirmada.pk})
+        self.assertEqual(sorted(NotificacionPendiente.objects.values_list("clave", flat=True)),
+                         sorted(f"cita:{c.pk}:recordatorio" for c in (self.pronto, self.confirmada)))
+        self.assertEqual(NotificacionPendiente.objects.get(clave=f"cita:{self.pronto.pk}:recordatorio").destinatarios,
+                         [self.docente.usuario.email])
+
+    def test_segunda_ejecucion_no_envia_nada(self):
+        enviar_recordatorios(horas=24)
+        with self.assertNumQueries(3):  # savepoint, lectura vacía, liberación
+            self.assertEqual(enviar_recordatorios(horas=24), 0)
+        self.assertEqual(NotificacionPendiente.objects.count(), 2)
+
+    def test_la_clave_evita_el_duplicado_aunque_se_desmarque(self):
+        enviar_recordatorios(horas=24)
+        Cita.objects.update(recordatorio_enviado_en=None)
+        self.assertEqual(enviar_recordatorios(horas=24), 2)
+        self.assertEqual(NotificacionPendiente.objects.count(), 2)
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command("enviar_recordatorios", "--horas", "24", stdout=salida)
+        self.assertIn("Recordatorios encolados: 2", salida.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("enviar_recordatorios", "--horas", "0")
+
+
+class RecordatoriosConcurrentesTests(HilosTestCase):
+    """Dos ejecuciones cruzadas del comando no duplican recordatorios."""
+
+    HILOS = 4
+
+    def test_un_recordatorio_por_cita(self):
+        docente = crear_docente(hora_inicio=dtime(0, 0), hora_fin=dtime(23, 59))
+        reps = crear_representantes(40)
+        base = timezone.now().replace(second=0, microsecond=0)
+        base -= timedelta(minutes=base.minute % 20)
+        for i, rep in enumerate(reps):
+            crear_cita(docente, rep, base + timedelta(hours=1, minutes=20 * i))
+
+        def recordar(i):
+            try:
+                enviar_recordatorios(horas=24, tam_lote=7)
+            except OperationalError:  # SQLite ocupada: esa ejecución termina y la retoma la próxima
+                pass
+
+        self.assertEqual(en_hilos(self.HILOS, recordar), [])
+        enviar_recordatorios(horas=24)
+        self.assertEqual(NotificacionPendiente.objects.count(), 40)
+        self.assertFalse(Cita.objects.filter(recordatorio_enviado_en__isnull=True).exists())
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class SlotLibreSenalesTests(TestCase):
+    """SlotLibre sigue a cada escritura que cambia la agenda y coincide con el cálculo al vuelo."""
+
+    def setUp(self):
+        cache.clear()
+        self.docente = crear_docente(hora_inicio=dtime(8, 0), hora_fin=dtime(10, 0))
+        reconstruir_slots_libres(dias=14)
+        self.fecha = timezone.localdate() + timedelta(days=3)
+
+    def materializados(self, fecha=None):
+        fecha = fecha or self.fecha
+        return list(SlotLibre.objects.filter(docente=self.docente, fecha=fecha).order_by("inicio")
+                    .values_list("inicio", flat=True))
+
+    def al_vuelo(self, fecha=None):
+        fecha = fecha or self.fecha
+        self.docente.refresh_from_db()
+        return generar_slots_docentes([self.docente], fecha, fecha, antelacion=False)[self.docente.pk][fecha]
+
+    def test_reconstruir_igual_al_calculo(self):
+        self.assertEqual(len(self.materializados()), 6)
+        self.assertEqual(self.materializados(), self.al_vuelo())
+        self.assertFalse(SlotLibre.objects.filter(fecha__gte=timezone.localdate() + timedelta(days=14)).exists())
+
+    def test_cita_reservada_y_cancelada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cita = crear_cita(self.docente, crear_representantes(1)[0], a_las(self.fecha, 8, 20))
+        self.assertNotIn(a_las(self.fecha, 8, 20), self.materializados())
+        with self.captureOnCommitCallbacks(execute=True):
+            cita.estado = EstadoCita.CANCELADA
+            cita.save()
+        self.assertIn(a_las(self.fecha, 8, 20), self.materializados())
+
+    def test_excepcion_disponibilidad_y_perfil(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ExcepcionDisponibilidad.objects.create(docente=self.docente, fecha=self.fecha,
+                                                   hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0))
+        self.assertEqual(self.materializados(), self.al_vuelo())
+        self.assertEqual(len(self.materializados()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DisponibilidadSemanal.objects.filter(docente=self.docente).update(hora_fin=dtime(11, 0))
+            # update() no emite señales: se guarda una franja para disparar el recálculo del día
+            franja = DisponibilidadSemanal.objects.get(docente=self.docente, dia_semana=self.fecha.weekday())
+            franja.save()
+        self.assertEqual(self.materializados(), self.al_vuelo())
+        self.assertEqual(len(self.materializados()), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.docente.minutos_por_bloque = 30
+            self.docente.save()
+        otro_dia = self.fecha + timedelta(days=1)
+        self.assertEqual(self.materializados(otro_dia), self.al_vuelo(otro_dia))
+        self.assertEqual(len(self.materializados(otro_dia)), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.docente.activo = False
+            self.docente.save()
+        self.assertFalse(SlotLibre.objects.filter(docente=self.docente).exists())
+
+    def test_comando_reconstruir_slots(self):
+        SlotLibre.objects.all().delete()
+        salida = io.StringIO()
+        call_command("reconstruir_slots", "--dias", "5", stdout=salida)
+        self.assertIn("Slots libres reconstruidos: 30 bloques", salida.getvalue())
+        self.assertEqual(cubierto_hasta(), timezone.localdate() + timedelta(days=4))
@@ -0,0 +1,194 @@
+# turnos/trabajos.py
+"""
+Cola de trabajos en base de datos (modelo Trabajo).
+
+Las vistas de carga CSV y de bloqueo masivo solo encolan; `manage.py
+run_worker` reclama los trabajos pendientes y los ejecuta. Cada ejecutor
+confirma por lotes (las importaciones, una transacción cada TAM_LOTE filas;
+el bloqueo masivo, cada LOTE_DOCENTES docentes), así que el bloqueo de
+escritura de SQLite se libera entre lotes y el resto del sitio sigue
+respondiendo. El avance se guarda con un UPDATE fuera de esas transacciones
+para que la página de estado lo vea mientras corre.
+"""
+import csv
+from datetime import date, time, timedelta
+from typing import Callable, Dict, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .bloqueos import aplicar_excepciones, cancelar_citas_afectadas, citas_afectadas, docentes_destino
+from .importacion import contar_lineas, importar_docentes, importar_estudiantes, lineas_csv
+from .models import EstadoTrabajo, FeriadoInstitucional, TipoTrabajo, Trabajo
+
+LOTE_DOCENTES = 50
+MAX_ERRORES_GUARDADOS = 200
+MAX_LINEAS_DIFF = 500
+
+
+def encolar(tipo: str, usuario=None, parametros: Optional[Dict] = None, archivo=None) -> Trabajo:
+    """Crea el trabajo PENDIENTE. 'archivo' (subida) se copia a MEDIA_ROOT/trabajos/."""
+    trabajo = Trabajo(tipo=tipo, creado_por=usuario, parametros=parametros or {})
+    if archivo is not None:
+        trabajo.archivo.save(archivo.name, archivo, save=False)
+    trabajo.save()
+    return trabajo
+
+
+def reclamar() -> Optional[Trabajo]:
+    """
+    Toma el pendiente más antiguo. El UPDATE condicionado al estado hace que
+    dos workers no puedan reclamar el mismo trabajo.
+    """
+    while True:
+        pk = (Trabajo.objects.filter(estado=EstadoTrabajo.PENDIENTE)
+              .order_by("creado_en", "pk").values_list("pk", flat=True).first())
+        if pk is None:
+            return None
+        ahora = timezone.now()
+        if Trabajo.objects.filter(pk=pk, estado=EstadoTrabajo.PENDIENTE).update(
+            estado=EstadoTrabajo.EN_CURSO, iniciado_en=ahora, actualizado_en=ahora
+        ):
+            return Trabajo.objects.get(pk=pk)
+
+
+def marcar_interrumpidos(minutos: int) -> int:
+    """EN_CURSO sin avance en 'minutos' (worker caído) -> FALLIDO."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return Trabajo.objects.filter(estado=EstadoTrabajo.EN_CURSO, actualizado_en__lt=limite).update(
+        estado=EstadoTrabajo.FALLIDO, terminado_en=timezone.now(),
+        resultado="Interrumpido: el worker dejó de reportar avance.",
+    )
+
+
+def _avance(trabajo: Trabajo) -> Callable:
+    def avance(procesados: int, errores=(), total: Optional[int] = None) -> None:
+        campos = {
+            "procesados": procesados,
+            "total_errores": len(errores),
+            "errores": [list(e) for e in errores[:MAX_ERRORES_GUARDADOS]],
+            "actualizado_en": timezone.now(),
+        }
+        if total is not None:
+            campos["total"] = total
+        Trabajo.objects.filter(pk=trabajo.pk).update(**campos)
+    return avance
+
+
+def ejecutar(trabajo: Trabajo) -> Trabajo:
+    """Corre el trabajo reclamado y deja su estado final. Relanza el error si falla."""
+    try:
+        resultado = EJECUTORES[trabajo.tipo](trabajo, _avance(trabajo))
+    except Exception as e:
+        Trabajo.objects.filter(pk=trabajo.pk).update(
+            estado=EstadoTrabajo.FALLIDO, terminado_en=timezone.now(), resultado=f"Error: {e}"[:2000],
+        )
+        raise
+    Trabajo.objects.filter(pk=trabajo.pk).update(
+        estado=EstadoTrabajo.COMPLETADO, terminado_en=timezone.now(), resultado=resultado,
+    )
+    if trabajo.archivo:
+        trabajo.archivo.delete(save=False)
+        Trabajo.objects.filter(pk=trabajo.pk).update(archivo="")
+    trabajo.refresh_from_db()
+    return trabajo
+
+
+# ---------------------------------
+# Ejecutores
+# ---------------------------------
+def _contar_filas(trabajo: Trabajo) -> int:
+    """Filas de datos aproximadas (líneas - encabezado), para el porcentaje y el ETA."""
+    with trabajo.archivo.open("rb") as f:
+        return max(0, contar_lineas(f) - 1)
+
+
+def _importar(funcion, trabajo: Trabajo, avance, **kwargs) -> Dict:
+    try:
+        avance(0, total=_contar_filas(trabajo))
+        with trabajo.archivo.open("rb") as f:
+            return funcion(csv.DictReader(lineas_csv(f)),
+                           progreso=lambda r: avance(r["filas"], r["errores"]), **kwargs)
+    except (UnicodeDecodeError, OSError, EOFError) as e:
+        # UTF-16 inválido, gzip dañado o truncado
+        raise ValueError(f"No se pudo leer el archivo: {e}")
+
+
+def _importar_estudiantes(trabajo: Trabajo, avance) -> str:
+    r = _importar(importar_estudiantes, trabajo, avance)
+    avance(r["filas"], r["errores"], total=r["filas"])
+    return f"Se importaron {r['estudiantes']} estudiantes y {r['relaciones']} relaciones."
+
+
+def _importar_docentes(trabajo: Trabajo, avance) -> str:
+    simular = trabajo.parametros.get("simular", False)
+    r = _importar(importar_docentes, trabajo, avance, simular=simular)
+    avance(r["filas"], r["errores"], total=r["filas"])
+    resumen = (f"Nuevos: {r['creados']}, Actualizados: {r['actualizados']}, "
+               f"Franjas creadas: {r['franjas_creadas']}, Franjas borradas: {r['franjas_borradas']}.")
+    if not simular:
+        return f"Docentes cargados. {resumen}"
+    diff = r["diff"][:MAX_LINEAS_DIFF] + ([f"... y {len(r['diff']) - MAX_LINEAS_DIFF} más"]
+                                          if len(r["diff"]) > MAX_LINEAS_DIFF else [])
+    return "\n".join([f"Simulación (sin cambios guardados). {resumen}"] + diff)
+
+
+def _bloqueo_masivo(trabajo: Trabajo, avance) -> str:
+    """
+    Mismos pasos que aplicaba bloqueo_masivo, por lotes de docentes: cada
+    lote cancela sus citas afectadas y (modo excepciones) crea sus BLOQUEO
+    en su propia transacción. El feriado (una fila) se registra al final; en
+    modo excepciones, con bloquea_agenda=False, como referencia.
+    """
+    p = trabajo.parametros
+    fi, ff = date.fromisoformat(p["fecha_inicio"]), date.fromisoformat(p["fecha_fin"])
+    hi = time.fromisoformat(p["hora_inicio"]) if p.get("hora_inicio") else None
+    hf = time.fromisoformat(p["hora_fin"]) if p.get("hora_fin") else None
+    nombre, depto, reemplazar = p["nombre"], p.get("departamento", ""), p.get("reemplazar", False)
+
+    docente_ids = list(docentes_destino(depto).values_list("pk", flat=True))
+    avance(0, total=len(docente_ids))
+    canceladas = creadas = borradas = 0
+    for i in range(0, len(docente_ids), LOTE_DOCENTES):
+        lote = docente_ids[i:i + LOTE_DOCENTES]
+        with transaction.atomic():
+            if p.get("cancelar_citas"):
+                canceladas += cancelar_citas_afectadas(
+                    citas_afectadas(lote, fi, ff, hi, hf), trabajo.creado_por, f"Bloqueo institucional: {nombre}",
+                    ids=p.get("citas"),
+                )
+            if p["modo"] == "excepciones":
+                r = aplicar_excepciones(lote, fi, ff, hi, hf, nombre=nombre, reemplazar=reemplazar)
+                creadas += r["creadas"]
+                borradas += r["borradas"]
+        avance(i + len(lote))
+
+    excepciones = p["modo"] == "excepciones"
+    with transaction.atomic():
+        if excepciones:
+            detalle = f"Excepciones creadas: {creadas}." + (f" Reemplazadas: {borradas}." if reemplazar else "")
+        else:
+            reemplazados = 0
+            if reemplazar:
+                # Feriados del mismo alcance que se cruzan con el rango
+                reemplazados, _ = FeriadoInstitucional.objects.filter(
+                    fecha_inicio__lte=ff, fecha_fin__gte=fi, departamento__iexact=depto, bloquea_agenda=True,
+                ).delete()
+            detalle = f"Reemplazados: {reemplazados}." if reemplazar else ""
+        # En modo excepciones la fila queda solo como referencia: el bloqueo ya está en las excepciones
+        FeriadoInstitucional.objects.create(
+            nombre=nombre, fecha_inicio=fi, fecha_fin=ff, hora_inicio=hi, hora_fin=hf, departamento=depto,
+            bloquea_agenda=not excepciones,
+        )
+
+    partes = [f"Bloqueo aplicado: {nombre}.", f"Docentes: {len(docente_ids)}.", detalle]
+    if canceladas:
+        partes.append(f"Citas canceladas: {canceladas}.")
+    return " ".join(x for x in partes if x)
+
+
+EJECUTORES = {
+    TipoTrabajo.IMPORTAR_ESTUDIANTES: _importar_estudiantes,
+    TipoTrabajo.IMPORTAR_DOCENTES: _importar_docentes,
+    TipoTrabajo.BLOQUEO_MASIVO: _bloqueo_masivo,
+}
@@ -14,16 +14,23 @@ urlpatterns = [
     path("panel/admin/docentes/cargar/", views_admin.cargar_docentes, name="cargar_docentes"),
     path("panel/admin/docentes/formato/", views_admin.formato_docentes, name="formato_docentes"),
     path("slots/", views_slots.api_slots, name="api_slots"),
+    path("slots/primeros/", views_slots.api_slots_primeros, name="api_slots_primeros"),
+    path("slots/lote/", views_slots.api_slots_lote, name="api_slots_lote"),
     path("panel/admin/bloqueos/", views_admin.bloqueo_masivo, name="bloqueo_masivo"),
+    path("panel/admin/bloqueos/<int:feriado_id>/eliminar/", views_admin.eliminar_feriado, name="eliminar_feriado"),
+    path("panel/admin/trabajos/<int:pk>/", views_admin.trabajo_estado, name="trabajo_estado"),
+    path("panel/admin/trabajos/<int:pk>/progreso/", views_admin.trabajo_progreso, name="trabajo_progreso"),
 
     #COORDINADOR.    
     # Descarga CSV usando ?export=1 (no necesita ruta extra)
     path("panel/coordinador/hoy/", views_coordinador.resumen_hoy, name="resumen_hoy"),
     path("panel/coordinador/semana/", views_coordinador.resumen_semana, name="resumen_semana"),
+    path("panel/coordinador/tendencia/", views_coordinador.resumen_tendencia, name="resumen_tendencia"),
   
 
     #DOCENTE
     path("docente/", views_docente.dashboard_docente, name="dashboard_docente"),
+    path("docente/alta/", views_docente.docente_alta, name="docente_alta"),
     path("docente/disponibilidad/", views_docente.disponibilidad_list, name="disp_list"),
     path("docente/disponibilidad/nuevo/", views_docente.disponibilidad_create, name="disp_create"),
     path("docente/disponibilidad/<int:pk>/eliminar/", views_docente.disponibilidad_delete, name="disp_delete"),
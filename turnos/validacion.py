@@ -0,0 +1,97 @@
+# turnos/validacion.py
+"""
+Validación de una reserva en una sola pasada.
+
+Carga las citas activas del día del docente y de la semana del
+representante (máximo dos consultas) y evalúa todas las reglas en memoria.
+La usan reservar_cita() y Cita.clean(). Las consultas van con order_by()
+vacío: el ordering de Cita (docente -> usuario__username) agregaría JOINs.
+"""
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .models import Cita, EstadoCita, inicio_del_dia
+
+ESTADOS_ACTIVOS = [EstadoCita.PENDIENTE, EstadoCita.CONFIRMADA]
+CUPO_DIA_REPRESENTANTE = 1
+CUPO_SEMANA_REPRESENTANTE = 2
+
+
+class Rechazo(NamedTuple):
+    codigo: str
+    mensaje: str
+
+
+def validar_reserva(
+    docente,
+    inicio: datetime,
+    fin: datetime,
+    representante=None,
+    excluir_pk: Optional[int] = None,
+) -> List[Rechazo]:
+    """
+    Devuelve la lista de motivos de rechazo (vacía si la cita es válida).
+
+    Reglas: no en el pasado, antelación ≥ 24h, fin > inicio, duración y
+    alineación al bloque del docente, máximo diario del docente, solape
+    con otras citas del docente y, si se pasa 'representante', sus cupos
+    (1 por día, 2 por semana). 'excluir_pk' ignora la propia cita al editar.
+    """
+    tz = timezone.get_current_timezone()
+    ahora = timezone.now()
+    motivos: List[Rechazo] = []
+
+    if inicio < ahora:
+        motivos.append(Rechazo("pasado", "No se permiten citas en el pasado."))
+    elif inicio < ahora + timedelta(hours=24):
+        motivos.append(Rechazo("antelacion", "Debes reservar con al menos 24 horas de antelación."))
+
+    if fin <= inicio:
+        motivos.append(Rechazo("rango", "La hora fin debe ser mayor que la hora inicio."))
+        return motivos
+
+    local = timezone.localtime(inicio, tz)
+    tam = docente.minutos_por_bloque
+    if int((fin - inicio).total_seconds() // 60) != tam:
+        motivos.append(Rechazo("duracion", f"La duración de la cita debe ser exactamente {tam} minutos."))
+    if (local.hour * 60 + local.minute) % tam != 0 or local.second != 0 or local.microsecond != 0:
+        motivos.append(Rechazo("alineacion", "La hora de inicio debe coincidir con el tamaño del bloque del docente."))
+
+    # Consulta 1: citas activas del docente que tocan el día local de la cita
+    fecha = local.date()
+    dia_ini, dia_fin = inicio_del_dia(fecha, tz), inicio_del_dia(fecha + timedelta(days=1), tz)
+    del_dia = [
+        c for c in Cita.objects.filter(
+            docente=docente, estado__in=ESTADOS_ACTIVOS,
+            inicio__lt=max(dia_fin, fin), fin__gt=min(dia_ini, inicio),
+        ).order_by().values_list("pk", "inicio", "fin")
+        if c[0] != excluir_pk
+    ]
+    if docente.maximo_citas_diarias:
+        if sum(1 for _, i, _ in del_dia if dia_ini <= i < dia_fin) >= docente.maximo_citas_diarias:
+            motivos.append(Rechazo("maximo_diario", "El docente alcanzó el máximo de citas para ese día."))
+    if any(i < fin and f > inicio for _, i, f in del_dia):
+        motivos.append(Rechazo("solape", "El docente ya tiene una cita en ese rango de tiempo."))
+
+    # Consulta 2: citas activas del representante en la semana (lunes a domingo)
+    if representante is not None:
+        de_la_semana = [
+            (pk, i) for pk, i in Cita.objects.filter(
+                representante=representante, estado__in=ESTADOS_ACTIVOS,
+            ).en_semana(fecha).order_by().values_list("pk", "inicio")
+            if pk != excluir_pk
+        ]
+        if sum(1 for _, i in de_la_semana if dia_ini <= i < dia_fin) >= CUPO_DIA_REPRESENTANTE:
+            motivos.append(Rechazo("cupo_dia", "Máximo 1 cita por día."))
+        if len(de_la_semana) >= CUPO_SEMANA_REPRESENTANTE:
+            motivos.append(Rechazo("cupo_semana", "Máximo 2 citas por semana."))
+
+    return motivos
+
+
+def error_de(motivos: List[Rechazo]) -> ValidationError:
+    """Motivos -> ValidationError con un error por motivo (code = codigo)."""
+    return ValidationError([ValidationError(m.mensaje, code=m.codigo) for m in motivos])
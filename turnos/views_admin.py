@@ -1,21 +1,21 @@
-import csv, io, re
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from user.decorators import requiere_rol
 from user.models import Rol
 from turnos.forms import CargaCSVForm
-from turnos.models import Estudiante, RelacionRepresentacion, FuenteRelacion
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q
-from .models import PerfilDocente, DisponibilidadSemanal, ExcepcionDisponibilidad, TipoExcepcion, FeriadoInstitucional
+from .models import PerfilDocente, DisponibilidadSemanal, ExcepcionDisponibilidad, FeriadoInstitucional
 from .forms import PerfilDocenteForm, DisponibilidadSemanalForm, ExcepcionDisponibilidadForm, BloqueoMasivoForm
+from .models import Trabajo, TipoTrabajo
+from .trabajos import encolar
+from .bloqueos import docentes_destino, citas_afectadas, ids_citas, plan_excepciones
 
 from turnos.forms import CargaCSVDocentesForm
 
-from datetime import timedelta, datetime
-from django.db import transaction
 from django.utils import timezone
 from user.decorators import requiere_roles
 
@@ -23,92 +23,16 @@ from user.decorators import requiere_roles
 
 User = get_user_model()
 
+MAX_ERRORES_PROGRESO = 50
+
+
 @requiere_roles("Administrador", "DocenteAdministrador")
 def cargar_estudiantes(request):
     if request.method == "POST":
         form = CargaCSVForm(request.POST, request.FILES)
         if form.is_valid():
-            archivo = form.cleaned_data["archivo"]
-            try:
-                data = archivo.read().decode("utf-8")
-            except UnicodeDecodeError:
-                messages.error(request, "El archivo debe estar en UTF-8.")
-                return redirect("cargar_estudiantes")
-
-            reader = csv.DictReader(io.StringIO(data))
-            total_est = total_rel = 0
-            rol_rep, _ = Rol.objects.get_or_create(nombre="Representante", defaults={"descripcion":"Padre/Madre/Apoderado"})
-
-            for row in reader:
-                cedula = (row.get("cedula") or "").strip()
-                nombre = (row.get("nombre") or "").strip()
-                curso = (row.get("curso") or "").strip()
-
-                if not cedula or not nombre:
-                    continue
-
-                est, created = Estudiante.objects.get_or_create(
-                    cedula=cedula, defaults={"nombre": nombre, "curso": curso}
-                )
-                if not created:
-                    cambios = []
-                    if est.nombre != nombre:
-                        est.nombre = nombre; cambios.append("nombre")
-                    if curso and est.curso != curso:
-                        est.curso = curso; cambios.append("curso")
-                    if cambios:
-                        est.save(update_fields=cambios)
-                total_est += 1
-
-                rep_cedula = (row.get("representante_cedula") or "").strip()
-                rep_email = (row.get("representante_email") or "").strip().lower()
-
-                if not rep_cedula and not rep_email:
-                    # Solo carga estudiante
-                    continue
-
-                rep = None
-                if rep_cedula:
-                    rep = User.objects.filter(cedula=rep_cedula).first()
-                if not rep and rep_email:
-                    rep = User.objects.filter(email=rep_email).first()
-
-                if not rep:
-                    if rep_cedula:
-                        rep = User.objects.create_user(
-                            username=rep_cedula, cedula=rep_cedula, email=rep_email or None, password="12345678"
-                        )
-                    else:
-                        rep = User.objects.create_user(
-                            username=rep_email, email=rep_email, password="12345678"
-                        )
-
-                actualizar = []
-                if rep_cedula and not getattr(rep, "cedula", None):
-                    rep.cedula = rep_cedula; actualizar.append("cedula")
-                if rep_email and not rep.email:
-                    rep.email = rep_email; actualizar.append("email")
-                if not rep.rol:
-                    rep.rol = rol_rep; actualizar.append("rol")
-                if actualizar:
-                    rep.save(update_fields=actualizar)
-
-                parentesco = (row.get("parentesco") or "").strip()
-                verificado = (row.get("verificado") or "0").strip() in ["1", "true", "True"]
-                RelacionRepresentacion.objects.update_or_create(
-                    estudiante=est,
-                    representante=rep,
-                    defaults={
-                        "parentesco": parentesco,
-                        "verificado": verificado,
-                        "fuente": FuenteRelacion.IMPORT,
-                        "activo": True,
-                    },
-                )
-                total_rel += 1
-
-            messages.success(request, f"Se importaron {total_est} estudiantes y {total_rel} relaciones.")
-            return redirect("cargar_estudiantes")
+            trabajo = encolar(TipoTrabajo.IMPORTAR_ESTUDIANTES, request.user, archivo=form.cleaned_data["archivo"])
+            return redirect("trabajo_estado", pk=trabajo.pk)
     else:
         form = CargaCSVForm()
 
@@ -215,134 +139,14 @@ def eliminar_excepcion(request, exc_id):
     messages.info(request, "Excepción eliminada.")
     return redirect("gestionar_disponibilidad_docente", docente_id=docente_id)
 
-ABREV_DIA = {"LUN":0,"MAR":1,"MIE":2,"JUE":3,"VIE":4,"SAB":5,"DOM":6}
-RANGO_RE = re.compile(r"^\s*(\d{2}:\d{2})\s*-\s*(\d{2}:\d{2})\s*$")
-
-def _parsear_disponibilidad(cadena:str):
-    if not cadena: 
-        return [], []
-    items = [p.strip() for p in cadena.split("|") if p.strip()]
-    resultado, errores = [], []
-    for seg in items:
-        try:
-            abrev, rango = seg.split(None, 1)
-        except ValueError:
-            errores.append(f"Formato inválido: '{seg}'"); 
-            continue
-        abrev = abrev.upper()
-        if abrev not in ABREV_DIA:
-            errores.append(f"Día inválido: '{abrev}'"); 
-            continue
-        m = RANGO_RE.match(rango)
-        if not m:
-            errores.append(f"Rango inválido: '{rango}' (usa HH:MM-HH:MM)")
-            continue
-        ini, fin = m.group(1), m.group(2)
-        if ini >= fin:
-            errores.append(f"Inicio >= fin en '{seg}'")
-            continue
-        resultado.append((ABREV_DIA[abrev], ini, fin))
-    return resultado, errores
-
 @requiere_roles("Administrador", "DocenteAdministrador")
 def cargar_docentes(request):
     if request.method == "POST":
         form = CargaCSVDocentesForm(request.POST, request.FILES)
         if form.is_valid():
-            try:
-                data = form.cleaned_data["archivo"].read().decode("utf-8")
-            except UnicodeDecodeError:
-                messages.error(request, "El archivo debe estar en UTF-8.")
-                return redirect("cargar_docentes")
-
-            reader = csv.DictReader(io.StringIO(data))
-            rol_doc, _ = Rol.objects.get_or_create(nombre="Docente", defaults={"descripcion":"Docente"})
-            creados = actualizados = franjas_creadas = 0
-
-            for row in reader:
-                cedula = (row.get("cedula") or "").strip()
-                if not cedula:
-                    continue
-                email = (row.get("email") or "").strip().lower() or None
-                nombres = (row.get("nombres") or "").strip()
-                apellidos = (row.get("apellidos") or "").strip()
-                telefono = (row.get("telefono") or "").strip()
-                departamento = (row.get("departamento") or "").strip()
-                try:
-                    minutos_por_bloque = int(row.get("minutos_por_bloque") or 20)
-                except ValueError:
-                    minutos_por_bloque = 20
-                try:
-                    mcd = row.get("maximo_citas_diarias")
-                    maximo_citas_diarias = int(mcd) if mcd not in (None,""," ") else None
-                except ValueError:
-                    maximo_citas_diarias = None
-                activo = str(row.get("activo") or "1").strip() in ("1","true","True","TRUE")
-                disponibilidad_raw = (row.get("disponibilidad") or "").strip()
-                reemplazar = str(row.get("reemplazar_disponibilidad") or "0").strip() in ("1","true","True","TRUE")
-
-                # Usuario (username = cedula)
-                user = User.objects.filter(cedula=cedula).first()
-                if not user:
-                    user = User.objects.create_user(username=cedula, cedula=cedula, email=email, password="12345678")
-                    cambios = []
-                    if hasattr(user,"first_name") and nombres: user.first_name = nombres; cambios.append("first_name")
-                    if hasattr(user,"last_name") and apellidos: user.last_name = apellidos; cambios.append("last_name")
-                    if cambios: user.save(update_fields=cambios)
-                    creados += 1
-                else:
-                    cambios = []
-                    if email and not user.email: user.email = email; cambios.append("email")
-                    if hasattr(user,"first_name") and nombres and user.first_name != nombres:
-                        user.first_name = nombres; cambios.append("first_name")
-                    if hasattr(user,"last_name") and apellidos and user.last_name != apellidos:
-                        user.last_name = apellidos; cambios.append("last_name")
-                    if cambios: user.save(update_fields=cambios)
-                    actualizados += 1
-
-                # Rol Docente
-                if not user.rol:
-                    user.rol = rol_doc
-                    user.save(update_fields=["rol"])
-
-                # PerfilDocente
-                perfil, _ = PerfilDocente.objects.get_or_create(usuario=user)
-                cambios = []
-                if perfil.minutos_por_bloque != minutos_por_bloque:
-                    perfil.minutos_por_bloque = minutos_por_bloque; cambios.append("minutos_por_bloque")
-                if perfil.maximo_citas_diarias != maximo_citas_diarias:
-                    perfil.maximo_citas_diarias = maximo_citas_diarias; cambios.append("maximo_citas_diarias")
-                if perfil.departamento != departamento:
-                    perfil.departamento = departamento; cambios.append("departamento")
-                if perfil.telefono != telefono:
-                    perfil.telefono = telefono; cambios.append("telefono")
-                if perfil.activo != activo:
-                    perfil.activo = activo; cambios.append("activo")
-                if cambios:
-                    perfil.save(update_fields=cambios)
-
-                # Disponibilidad inicial (opcional)
-                # Disponibilidad inicial (opcional)
-                if disponibilidad_raw:
-                    franjas, errs = _parsear_disponibilidad(disponibilidad_raw)
-                    if errs:
-                        # Acumula errores con número de fila (usa reader.line_num si prefieres)
-                        messages.warning(request, f"Fila con cédula {cedula}: {', '.join(errs[:3])}" + (" ..." if len(errs) > 3 else ""))
-                    else:
-                        if reemplazar:
-                            DisponibilidadSemanal.objects.filter(docente=perfil).delete()
-                        for dia, h_ini, h_fin in franjas:
-                            existe = DisponibilidadSemanal.objects.filter(
-                                docente=perfil, dia_semana=dia, hora_inicio=h_ini, hora_fin=h_fin
-                            ).exists()
-                            if not existe:
-                                DisponibilidadSemanal.objects.create(
-                                    docente=perfil, dia_semana=dia, hora_inicio=h_ini, hora_fin=h_fin
-                                )
-                                franjas_creadas += 1
-
-            messages.success(request, f"Docentes cargados. Nuevos: {creados}, Actualizados: {actualizados}, Franjas creadas: {franjas_creadas}.")
-            return redirect("cargar_docentes")
+            trabajo = encolar(TipoTrabajo.IMPORTAR_DOCENTES, request.user, archivo=form.cleaned_data["archivo"],
+                              parametros={"simular": form.cleaned_data["simular"]})
+            return redirect("trabajo_estado", pk=trabajo.pk)
     else:
         form = CargaCSVDocentesForm()
 
@@ -360,15 +164,19 @@ def formato_docentes(request):
     return resp
 
 
-def _daterange(d1, d2):
-    cur = d1
-    while cur <= d2:
-        yield cur
-        cur += timedelta(days=1)
-
 @requiere_roles("Administrador", "DocenteAdministrador")
-@transaction.atomic
 def bloqueo_masivo(request):
+    """
+    Dos modos:
+      - feriado: registra un FeriadoInstitucional (una sola fila) que el motor
+        de slots aplica al calcular, para todos o para un departamento.
+      - excepciones: un BLOQUEO por docente y día, por conjuntos (turnos/bloqueos.py),
+        y el evento queda como FeriadoInstitucional de referencia (bloquea_agenda=False).
+    Primero se previsualiza (citas afectadas, filas a crear/borrar); al aplicar
+    se encola un Trabajo (con la opción de cancelar esas citas) y se redirige
+    a su página de estado.
+    """
+    preview = None
     if request.method == "POST":
         form = BloqueoMasivoForm(request.POST)
         if form.is_valid():
@@ -378,49 +186,81 @@ def bloqueo_masivo(request):
             hi = form.cleaned_data.get("hora_inicio")
             hf = form.cleaned_data.get("hora_fin")
             aplicar_a = form.cleaned_data["aplicar_a"]
-            depto = (form.cleaned_data.get("departamento") or "").strip()
+            depto = (form.cleaned_data.get("departamento") or "").strip() if aplicar_a == "departamento" else ""
             reemplazar = form.cleaned_data["reemplazar"]
+            modo = form.cleaned_data["modo"]
 
             # Docentes destino
-            docentes = PerfilDocente.objects.filter(activo=True)
-            if aplicar_a == "departamento":
-                docentes = docentes.filter(departamento__iexact=depto)
-
-            total_doc = docentes.count()
+            docente_ids = list(docentes_destino(depto).values_list("pk", flat=True))
+            total_doc = len(docente_ids)
             if total_doc == 0:
                 messages.warning(request, "No hay docentes que coincidan con el filtro.")
                 return redirect("bloqueo_masivo")
-
-            # Registrar feriado (opcional) para referencia
-            feriado = FeriadoInstitucional.objects.create(
-                nombre=nombre,
-                fecha_inicio=fi, fecha_fin=ff,
-                hora_inicio=hi, hora_fin=hf
-            )
-
-            creadas = 0
-            for fecha in _daterange(fi, ff):
-                for d in docentes:
-                    qs = ExcepcionDisponibilidad.objects.filter(docente=d, fecha=fecha, tipo=TipoExcepcion.BLOQUEO)
-                    if reemplazar:
-                        qs.delete()
-                    # Evitar duplicado exacto
-                    existe = qs.filter(hora_inicio=hi or datetime.min.time(), hora_fin=hf or datetime.max.time()).exists() if (hi and hf) else qs.filter(hora_inicio__isnull=False, hora_fin__isnull=False, hora_inicio__lte="00:00", hora_fin__gte="23:59").exists()
-                    # Simplifiquemos: si no se especifica hora => bloquea día completo 00:00–23:59
-                    h_ini = hi or datetime.strptime("00:00","%H:%M").time()
-                    h_fin = hf or datetime.strptime("23:59","%H:%M").time()
-                    if not ExcepcionDisponibilidad.objects.filter(docente=d, fecha=fecha, tipo=TipoExcepcion.BLOQUEO, hora_inicio=h_ini, hora_fin=h_fin).exists():
-                        ExcepcionDisponibilidad.objects.create(
-                            docente=d, fecha=fecha,
-                            hora_inicio=h_ini, hora_fin=h_fin,
-                            tipo=TipoExcepcion.BLOQUEO,
-                            motivo=nombre
-                        )
-                        creadas += 1
-
-            messages.success(request, f"Bloqueo aplicado: {feriado.nombre}. Docentes: {total_doc}. Excepciones creadas: {creadas}.")
-            return redirect("bloqueo_masivo")
+            afectadas = citas_afectadas(docente_ids, fi, ff, hi, hf)
+
+            if request.POST.get("accion") != "aplicar":
+                preview = {
+                    "modo": modo,
+                    "docentes": total_doc,
+                    "dias": (ff - fi).days + 1,
+                    "citas": afectadas.count(),
+                    # Se reenvían al aplicar: solo estas citas pueden cancelarse
+                    "ids": ",".join(str(pk) for pk in afectadas.order_by("pk").values_list("pk", flat=True)),
+                    "muestra": afectadas.select_related("docente__usuario", "representante").order_by("inicio")[:20],
+                }
+                if modo == "excepciones":
+                    plan = plan_excepciones(docente_ids, fi, ff, hi, hf, reemplazar)
+                    preview.update(crear=len(plan["crear"]), borrar=plan["borrar"], existentes=plan["existentes"])
+            else:
+                # Se ejecuta en el worker, por lotes de docentes (turnos/trabajos.py)
+                trabajo = encolar(TipoTrabajo.BLOQUEO_MASIVO, request.user, parametros={
+                    "modo": modo, "nombre": nombre,
+                    "fecha_inicio": fi.isoformat(), "fecha_fin": ff.isoformat(),
+                    "hora_inicio": hi.isoformat() if hi else None, "hora_fin": hf.isoformat() if hf else None,
+                    "departamento": depto, "reemplazar": reemplazar,
+                    "cancelar_citas": form.cleaned_data["cancelar_citas"],
+                    "citas": ids_citas(request.POST.get("citas_vistas")),
+                })
+                return redirect("trabajo_estado", pk=trabajo.pk)
     else:
         form = BloqueoMasivoForm()
 
-    return render(request, "bloqueo_masivo.html", {"form": form})
+    feriados = FeriadoInstitucional.objects.filter(fecha_fin__gte=timezone.localdate()).order_by("fecha_inicio")
+    return render(request, "bloqueo_masivo.html", {"form": form, "feriados": feriados, "preview": preview})
+
+
+@requiere_roles("Administrador", "DocenteAdministrador")
+@require_POST
+def eliminar_feriado(request, feriado_id):
+    feriado = get_object_or_404(FeriadoInstitucional, pk=feriado_id)
+    feriado.delete()
+    messages.info(request, f"Feriado/evento eliminado: {feriado.nombre}.")
+    return redirect("bloqueo_masivo")
+
+
+# --- Trabajos en segundo plano (importaciones, bloqueo masivo) ---
+
+@requiere_roles("Administrador", "DocenteAdministrador")
+def trabajo_estado(request, pk):
+    trabajo = get_object_or_404(Trabajo, pk=pk)
+    return render(request, "trabajo_estado.html", {"trabajo": trabajo})
+
+
+@requiere_roles("Administrador", "DocenteAdministrador")
+def trabajo_progreso(request, pk):
+    """Avance en JSON para la página de estado (la consulta cada pocos segundos)."""
+    t = get_object_or_404(Trabajo, pk=pk)
+    return JsonResponse({
+        "id": t.pk,
+        "tipo": t.get_tipo_display(),
+        "estado": t.estado,
+        "estado_display": t.get_estado_display(),
+        "terminado": t.terminado,
+        "procesados": t.procesados,
+        "total": t.total,
+        "porcentaje": t.porcentaje(),
+        "eta_segundos": t.eta_segundos(),
+        "total_errores": t.total_errores,
+        "errores": t.errores[:MAX_ERRORES_PROGRESO],
+        "resultado": t.resultado,
+    })
@@ -1,14 +1,15 @@
 # turnos/views_coordinador.py
 from datetime import timedelta, datetime
-from django.db.models import Count, Q
+from django.db.models import Q
 from django.shortcuts import render
 from django.utils import timezone
 
 from user.decorators import requiere_roles
+from .estadisticas import tendencia_semanal, totales_por_estado
+from .exportacion import TAM_BLOQUE, hora_local, nombre_completo, respuesta_csv
+from .paginacion import paginar
 from .models import Cita, EstadoCita
 
-from django.http import HttpResponse
-
 TZ = timezone.get_current_timezone()
 
 def _rango_semana(base_date):
@@ -30,80 +31,133 @@ def _rango_semana(base_date):
     df = di + timedelta(days=6)
     return di, df
 
-def _aplicar_filtros(request, qs):
-    """Aplica filtros GET: desde, hasta, estado, departamento. 
-       Si es DocenteAdministrador, opcionalmente puedes limitar al departamento del usuario.
+def _filtros(request):
+    """Filtros GET: desde, hasta, estado, departamento.
+       Si es DocenteAdministrador, se agrega el departamento del usuario.
     """
     g = request.GET
-    desde = _parse_date(g.get("desde", ""))
-    hasta = _parse_date(g.get("hasta", ""))
     estado = (g.get("estado") or "").strip().upper()
-    departamento = (g.get("departamento") or "").strip()
-
-    if desde:
-        qs = qs.filter(inicio__date__gte=desde)
-    if hasta:
-        qs = qs.filter(inicio__date__lte=hasta)
-    if estado in dict(EstadoCita.choices):
-        qs = qs.filter(estado=estado)
-    if departamento:
-        qs = qs.filter(docente__departamento__iexact=departamento)
+    departamentos = [(g.get("departamento") or "").strip()]
 
     # Si deseas **forzar** que un DocenteAdministrador solo vea su departamento:
     if getattr(getattr(request.user, "rol", None), "nombre", None) == "DocenteAdministrador":
-        dep_usuario = getattr(getattr(request.user, "perfil_docente", None), "departamento", "")
-        if dep_usuario:
-            qs = qs.filter(docente__departamento__iexact=dep_usuario)
+        departamentos.append(getattr(getattr(request.user, "perfil_docente", None), "departamento", ""))
 
+    return {
+        "desde": _parse_date(g.get("desde", "")),
+        "hasta": _parse_date(g.get("hasta", "")),
+        "estado": estado if estado in dict(EstadoCita.choices) else "",
+        "departamentos": [d for d in departamentos if d],
+    }
+
+def _aplicar_filtros(request, qs):
+    """Aplica los filtros GET (ver _filtros) a un queryset de Cita."""
+    f = _filtros(request)
+    qs = qs.entre(f["desde"], f["hasta"])
+    if f["estado"]:
+        qs = qs.filter(estado=f["estado"])
+    for departamento in f["departamentos"]:
+        qs = qs.filter(docente__departamento__iexact=departamento)
     return qs
 
-def _csv_desde_qs(qs):
-    # Encabezados
-    rows = ["inicio,fin,estado,docente,departamento,representante,estudiante,curso,motivo"]
-    for c in qs:
-        docente = c.docente.usuario.get_full_name() or c.docente.usuario.username
-        depto = c.docente.departamento or ""
-        rep = c.representante.get_full_name() or c.representante.username
-        est = c.nombre_estudiante.replace(",", " ")
-        mot = (c.motivo or "").replace("\n"," ").replace("\r"," ").replace(",", " ")
-        rows.append(f"{c.inicio:%Y-%m-%d %H:%M},{c.fin:%H:%M},{c.estado},{docente},{depto},{rep},{est},{c.curso_estudiante},{mot}")
-    return "\n".join(rows)
+def _filtros_estadisticas(request, di, df, con_estado=True):
+    """
+    Los mismos filtros, para leer EstadisticaDiaria dentro de [di, df].
+    None si no puede haber resultados (rango vacío o departamentos distintos).
+    """
+    f = _filtros(request)
+    desde, hasta = max(di, f["desde"] or di), min(df, f["hasta"] or df)
+    if desde > hasta or len({d.lower() for d in f["departamentos"]}) > 1:
+        return None
+    return {
+        "desde": desde, "hasta": hasta, "estado": f["estado"] if con_estado else "",
+        "departamento": f["departamentos"][0] if f["departamentos"] else "",
+    }
+
+def _totales(request, di, df):
+    """{estado: n} desde la tabla de estadísticas, sin contar las citas del rango."""
+    filtros = _filtros_estadisticas(request, di, df)
+    return totales_por_estado(**filtros) if filtros else {}
+
+def _csv_desde_qs(qs, nombre):
+    filas = (
+        (hora_local(ini), hora_local(fin, "%H:%M"), estado, nombre_completo(d_nom, d_ape, d_usuario), depto or "",
+         nombre_completo(r_nom, r_ape, r_usuario), estudiante, curso, motivo or "")
+        for ini, fin, estado, d_nom, d_ape, d_usuario, depto, r_nom, r_ape, r_usuario, estudiante, curso, motivo
+        in qs.order_by("inicio", "pk").values_list(
+            "inicio", "fin", "estado", "docente__usuario__first_name", "docente__usuario__last_name",
+            "docente__usuario__username", "docente__departamento", "representante__first_name",
+            "representante__last_name", "representante__username", "nombre_estudiante", "curso_estudiante",
+            "motivo",
+        ).iterator(chunk_size=TAM_BLOQUE)
+    )
+    return respuesta_csv(
+        ["inicio", "fin", "estado", "docente", "departamento", "representante", "estudiante", "curso", "motivo"],
+        filas,
+        nombre,
+    )
+
+def _rango_export(request, di, df):
+    """Rango del CSV: desde/hasta del GET si vienen (sin el tope de hoy/semana de la vista)."""
+    desde = _parse_date(request.GET.get("desde", "")) or di
+    hasta = _parse_date(request.GET.get("hasta", "")) or max(df, desde)
+    return desde, hasta
 
 @requiere_roles("Administrador", "DocenteAdministrador")
 def resumen_hoy(request):
     hoy = timezone.localdate()
+    if request.GET.get("export") == "1":
+        desde, hasta = _rango_export(request, hoy, hoy)
+        qs = _aplicar_filtros(request, Cita.objects.entre(desde, hasta))
+        return _csv_desde_qs(qs, f"citas_{desde}_a_{hasta}.csv" if (desde, hasta) != (hoy, hoy) else f"citas_hoy_{hoy}.csv")
+
     qs = (Cita.objects
-          .filter(inicio__date=hoy)
-          .select_related("docente__usuario", "representante")
-          .order_by("inicio"))
+          .en_fecha(hoy)
+          .select_related("docente__usuario", "representante"))
     qs = _aplicar_filtros(request, qs)
 
-    if request.GET.get("export") == "1":
-        data = _csv_desde_qs(qs)
-        resp = HttpResponse(data, content_type="text/csv; charset=utf-8")
-        resp["Content-Disposition"] = f'attachment; filename="citas_hoy_{hoy}.csv"'
-        return resp
-
-    totales = dict(qs.values("estado").annotate(n=Count("id")).values_list("estado", "n"))
-    ctx = {"titulo": "Resumen de Citas — Hoy", "rango": (hoy, hoy), "citas": qs, "totales": totales}
+    totales = _totales(request, hoy, hoy)
+    citas = paginar(request, qs, total=sum(totales.values()))
+    ctx = {"titulo": "Resumen de Citas — Hoy", "rango": (hoy, hoy), "citas": citas, "totales": totales}
     return render(request, "resumen_coordinador.html", ctx)
 
 @requiere_roles("Administrador", "DocenteAdministrador")
 def resumen_semana(request):
     base = timezone.localdate()
     di, df = _rango_semana(base)
+    if request.GET.get("export") == "1":
+        desde, hasta = _rango_export(request, di, df)
+        qs = _aplicar_filtros(request, Cita.objects.entre(desde, hasta))
+        return _csv_desde_qs(qs, f"citas_semana_{desde}_a_{hasta}.csv")
+
     qs = (Cita.objects
-          .filter(inicio__date__range=(di, df))
-          .select_related("docente__usuario", "representante")
-          .order_by("inicio"))
+          .entre(di, df)
+          .select_related("docente__usuario", "representante"))
     qs = _aplicar_filtros(request, qs)
 
-    if request.GET.get("export") == "1":
-        data = _csv_desde_qs(qs)
-        resp = HttpResponse(data, content_type="text/csv; charset=utf-8")
-        resp["Content-Disposition"] = f'attachment; filename="citas_semana_{di}_a_{df}.csv"'
-        return resp
-
-    totales = dict(qs.values("estado").annotate(n=Count("id")).values_list("estado", "n"))
-    ctx = {"titulo": "Resumen de Citas — Semana", "rango": (di, df), "citas": qs, "totales": totales}
+    totales = _totales(request, di, df)
+    citas = paginar(request, qs, total=sum(totales.values()))
+    ctx = {"titulo": "Resumen de Citas — Semana", "rango": (di, df), "citas": citas, "totales": totales}
     return render(request, "resumen_coordinador.html", ctx)
+
+SEMANAS_TENDENCIA = 16
+
+@requiere_roles("Administrador", "DocenteAdministrador")
+def resumen_tendencia(request):
+    """Citas por semana y estado del periodo (por defecto, las últimas SEMANAS_TENDENCIA semanas)."""
+    _, df = _rango_semana(timezone.localdate())
+    di = df - timedelta(days=7 * SEMANAS_TENDENCIA - 1)
+    desde = _parse_date(request.GET.get("desde", "")) or di
+    hasta = _parse_date(request.GET.get("hasta", "")) or df
+    filtros = _filtros_estadisticas(request, desde, hasta, con_estado=False)
+    semanas = tendencia_semanal(**filtros) if filtros else []
+
+    maximo = max([s["PENDIENTE"] + s["CONFIRMADA"] + s["CANCELADA"] for s in semanas] + [1])
+    for s in semanas:
+        s["total"] = s["PENDIENTE"] + s["CONFIRMADA"] + s["CANCELADA"]
+        s["horas"] = round(s["minutos"] / 60, 1)
+        # Anchos (%) de las barras apiladas
+        s["barras"] = [(e, round(100 * s[e] / maximo, 1)) for e in ("CONFIRMADA", "PENDIENTE", "CANCELADA")]
+    ctx = {"titulo": "Tendencia de Citas por Semana", "rango": (desde, hasta), "semanas": semanas,
+           "totales": {e: sum(s[e] for s in semanas) for e in EstadoCita.values}}
+    return render(request, "tendencia_coordinador.html", ctx)
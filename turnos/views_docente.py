@@ -1,5 +1,7 @@
 # turnos/views_docente.py
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import wraps
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
@@ -7,20 +9,44 @@ from django.utils import timezone
 from user.decorators import requiere_rol
 from .models import PerfilDocente, DisponibilidadSemanal, ExcepcionDisponibilidad, Cita
 from .forms import DisponibilidadSemanalForm, ExcepcionDisponibilidadForm
-from .services import generar_slots
+from .services import generar_slots, generar_slots_rango
 from user.decorators import requiere_roles
 
+def con_perfil_docente(view):
+    """
+    Pasa a la vista el PerfilDocente que ya vino con request.user
+    (user/backends.py), sin consultarlo ni crearlo. Si el docente aún no
+    tiene perfil, lo lleva al alta (docente_alta).
+    """
+    @wraps(view)
+    def _wrapped(request, *args, **kwargs):
+        docente = getattr(request.user, "perfil_docente", None)
+        if docente is None:
+            messages.info(request, "Antes de continuar, completa el alta de tu perfil de docente.")
+            return redirect("docente_alta")
+        return view(request, docente, *args, **kwargs)
+    return _wrapped
+
+@requiere_roles("Docente", "DocenteAdministrador")
+def docente_alta(request):
+    """Único lugar donde un docente crea su perfil (valores por defecto, editables por el admin)."""
+    if getattr(request.user, "perfil_docente", None) is not None:
+        return redirect("dashboard_docente")
+    if request.method == "POST":
+        _, creado = PerfilDocente.objects.get_or_create(
+            usuario=request.user,
+            defaults={"minutos_por_bloque": 20, "activo": True},
+        )
+        if creado:
+            messages.success(request, "Se creó tu perfil de docente con valores por defecto.")
+        return redirect("dashboard_docente")
+    return render(request, "docente/alta.html", {"minutos_por_bloque": 20})
+
 @requiere_roles("Docente", "DocenteAdministrador")
-def dashboard_docente(request):
-    print("INICIE AL USUARIO DOCENTE.")
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")    
+@con_perfil_docente
+def dashboard_docente(request, docente):
     hoy = timezone.localdate()
-    citas_hoy = Cita.objects.filter(docente=docente, inicio__date=hoy).order_by("inicio")
+    citas_hoy = Cita.objects.filter(docente=docente).en_fecha(hoy).order_by("inicio")
     return render(request, "docente/dashboard.html", {
         "docente": docente,
         "citas_hoy": citas_hoy,
@@ -28,24 +54,14 @@ def dashboard_docente(request):
 
 # -------- Disponibilidad semanal --------
 @requiere_roles("Docente", "DocenteAdministrador")
-def disponibilidad_list(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def disponibilidad_list(request, docente):
     items = DisponibilidadSemanal.objects.filter(docente=docente).order_by("dia_semana","hora_inicio")
     return render(request, "docente/disponibilidad_list.html", {"items": items})
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def disponibilidad_create(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def disponibilidad_create(request, docente):
     if request.method == "POST":
         form = DisponibilidadSemanalForm(request.POST)
         if form.is_valid():
@@ -63,13 +79,8 @@ def disponibilidad_create(request):
     return render(request, "docente/disponibilidad_form.html", {"form": form})
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def disponibilidad_delete(request, pk):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def disponibilidad_delete(request, docente, pk):
     obj = get_object_or_404(DisponibilidadSemanal, pk=pk, docente=docente)
     if request.method == "POST":
         obj.delete()
@@ -79,24 +90,14 @@ def disponibilidad_delete(request, pk):
 
 # -------- Excepciones (EXTRA / BLOQUEO) --------
 @requiere_roles("Docente", "DocenteAdministrador")
-def excepciones_list(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def excepciones_list(request, docente):
     items = ExcepcionDisponibilidad.objects.filter(docente=docente).order_by("-fecha","hora_inicio")
     return render(request, "docente/excepciones_list.html", {"items": items})
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def excepciones_create(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def excepciones_create(request, docente):
     if request.method == "POST":
         form = ExcepcionDisponibilidadForm(request.POST)
         if form.is_valid():
@@ -114,13 +115,8 @@ def excepciones_create(request):
     return render(request, "docente/excepciones_form.html", {"form": form})
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def excepciones_delete(request, pk):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def excepciones_delete(request, docente, pk):
     obj = get_object_or_404(ExcepcionDisponibilidad, pk=pk, docente=docente)
     if request.method == "POST":
         obj.delete()
@@ -130,17 +126,12 @@ def excepciones_delete(request, pk):
 
 # -------- Agenda --------
 @requiere_roles("Docente", "DocenteAdministrador")
-def agenda_dia(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def agenda_dia(request, docente):
     fecha_str = request.GET.get("fecha")
     fecha = timezone.localdate() if not fecha_str else datetime.strptime(fecha_str, "%Y-%m-%d").date()
     starts = generar_slots(docente, fecha)  # datetimes aware de inicio
-    citas = Cita.objects.filter(docente=docente, inicio__date=fecha).order_by("inicio")
+    citas = Cita.objects.filter(docente=docente).en_fecha(fecha).order_by("inicio")
     # armar pares (inicio, fin) usando minutos_del_docente
     minuto = docente.minutos_por_bloque or 20
     slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
@@ -149,23 +140,22 @@ def agenda_dia(request):
     })
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def agenda_semana(request):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def agenda_semana(request, docente):
     base = timezone.localdate()
     di = base - timezone.timedelta(days=base.weekday())
-    dias = [di + timezone.timedelta(days=i) for i in range(7)]
+    df = di + timezone.timedelta(days=6)
     minuto = docente.minutos_por_bloque or 20
+
+    # Citas de toda la semana en una consulta, agrupadas por día local
+    citas_por_dia = defaultdict(list)
+    for c in Cita.objects.filter(docente=docente).entre(di, df).order_by("inicio"):
+        citas_por_dia[timezone.localtime(c.inicio).date()].append(c)
+
     data = []
-    for d in dias:
-        starts = generar_slots(docente, d)
+    for d, starts in generar_slots_rango(docente, di, df).items():
         slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
-        citas = Cita.objects.filter(docente=docente, inicio__date=d).order_by("inicio")
-        data.append((d, slots, citas))
+        data.append((d, slots, citas_por_dia.get(d, [])))
     return render(request, "docente/agenda_semana.html", {"data": data, "di": di})
 
 # turnos/views_docente.py (añade)
@@ -173,14 +163,9 @@ from django.views.decorators.http import require_POST
 from .models import EstadoCita
 
 @requiere_roles("Docente", "DocenteAdministrador")
+@con_perfil_docente
 @require_POST
-def cita_confirmar(request, pk):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+def cita_confirmar(request, docente, pk):
     c = get_object_or_404(Cita, pk=pk, docente=docente)
     c.estado = EstadoCita.CONFIRMADA
     c.full_clean(); c.save()
@@ -188,13 +173,8 @@ def cita_confirmar(request, pk):
     return redirect(request.META.get("HTTP_REFERER", "turnos:agenda_dia"))
 
 @requiere_roles("Docente", "DocenteAdministrador")
-def cita_cancelar(request, pk):
-    docente, creado = PerfilDocente.objects.get_or_create(
-        usuario=request.user,
-        defaults={"minutos_por_bloque": 20, "activo": True},
-    )
-    if creado:
-        messages.info(request, "Se creó tu perfil de docente con valores por defecto.")
+@con_perfil_docente
+def cita_cancelar(request, docente, pk):
     c = get_object_or_404(Cita, pk=pk, docente=docente)
     if request.method == "POST":
         motivo = (request.POST.get("motivo") or "").strip()
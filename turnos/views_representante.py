@@ -9,11 +9,12 @@ from django.views.decorators.http import require_http_methods, require_POST
 from user.decorators import requiere_rol
 from .models import PerfilDocente, Cita, EstadoCita
 from .forms_representante import BuscarSlotsForm, ReservaCitaForm
-from .services import generar_slots, reservar_cita
+from .services import reservar_cita, SlotOcupado
+from .cache_slots import slots_cacheados, slots_rango_cacheados
+from .paginacion import paginar
 
 from django.core.exceptions import ValidationError
 from .services import cancelar_cita_por_representante
-from .emailing import enviar_notificacion, obtener_emails_admins
 
 from datetime import timedelta
 from .forms_representante import BuscarSemanaForm
@@ -41,7 +42,7 @@ def rep_buscar_slots(request):
         fecha = form.cleaned_data["fecha"]                # date
         minuto = docente.minutos_por_bloque or 20
 
-        starts = generar_slots(docente, fecha)            # list[datetime]
+        starts = slots_cacheados(docente, fecha)            # list[datetime]
         slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
 
         # Opcional: mensaje de diagnóstico si no hay slots
@@ -82,7 +83,7 @@ def rep_reservar_cita(request):
         minuto = None
         if docente and fecha:
             minuto = docente.minutos_por_bloque or 20
-            starts = generar_slots(docente, fecha)
+            starts = slots_cacheados(docente, fecha)
             slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
 
         buscar_form = BuscarSlotsForm(initial={"docente": docente, "fecha": fecha})
@@ -113,11 +114,16 @@ def rep_reservar_cita(request):
         messages.success(request, "Cita creada exitosamente. Queda pendiente de confirmación.")
         return redirect("rep_mis_citas")
     except Exception as e:
-        messages.error(request, str(e))
+        if isinstance(e, SlotOcupado):
+            messages.warning(request, "; ".join(e.messages))
+        elif isinstance(e, ValidationError):
+            messages.error(request, "; ".join(e.messages))
+        else:
+            messages.error(request, str(e))
         # Mismo fallback de arriba para reintento:
         fecha = inicio.date()
         minuto = docente.minutos_por_bloque or 20
-        starts = generar_slots(docente, fecha)
+        starts = slots_cacheados(docente, fecha)
         slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
         buscar_form = BuscarSlotsForm(initial={"docente": docente, "fecha": fecha})
         return render(request, "representante/buscar_slots.html", {
@@ -130,8 +136,9 @@ def rep_reservar_cita(request):
 
 @requiere_rol("Representante")
 def rep_mis_citas(request):
-    qs = Cita.objects.filter(representante=request.user).order_by("-inicio")
-    return render(request, "representante/mis_citas.html", {"citas": qs})
+    # Más recientes primero, por cursor sobre el índice (representante, inicio)
+    qs = Cita.objects.filter(representante=request.user).select_related("docente__usuario")
+    return render(request, "representante/mis_citas.html", {"citas": paginar(request, qs, descendente=True)})
 
 @requiere_rol("Representante")
 @require_http_methods(["GET", "POST"])
@@ -141,19 +148,8 @@ def rep_cita_cancelar(request, pk):
         motivo = (request.POST.get("motivo") or "").strip()
         try:
             cancelar_cita_por_representante(cita=cita, usuario=request.user, motivo=motivo)
+            # El servicio ya encoló el aviso (clave "cita:<pk>:cancelada", una sola vez)
             messages.info(request, "Cita cancelada correctamente.")
-            enviar_notificacion(
-                asunto="Cita cancelada",
-                template="emails/cita_cancelada.html",
-                contexto={
-                    "nombre_receptor": cita.representante.get_full_name() or cita.representante.username,
-                    "docente": cita.docente.usuario.get_full_name() or cita.docente.usuario.username,
-                    "representante": cita.representante.get_full_name() or cita.representante.username,
-                    "inicio": cita.inicio,
-                    "motivo_cancelacion": cita.motivo_cancelacion,
-                },
-                destinatarios=[cita.representante.email, cita.docente.usuario.email] + obtener_emails_admins(),
-            )
             return redirect("rep_mis_citas")
         except ValidationError as e:
             messages.error(request, "; ".join(e.messages))
@@ -182,9 +178,8 @@ def rep_buscar_semana(request):
         df = di + timedelta(days=6)
         minuto = docente.minutos_por_bloque or 20
 
-        for i in range(7):
-            dia = di + timedelta(days=i)
-            starts = generar_slots(docente, dia)
+        # Una sola carga para los 7 días
+        for dia, starts in slots_rango_cacheados(docente, di, df).items():
             slots = [(s, s + timezone.timedelta(minutes=minuto)) for s in starts]
             semana.append((dia, slots))
 
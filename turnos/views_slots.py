@@ -1,11 +1,16 @@
 # turnos/views_slots.py
+import base64
+from datetime import timedelta
+from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
 from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from .models import PerfilDocente
-from .services import generar_slots
+from .services import buscar_primeros_slots, obtener_minutos_docentes
+from .intervalos import MINUTOS_DIA
+from .cache_slots import slots_cacheados
 
 @require_GET
 def api_slots(request):
@@ -21,7 +26,7 @@ def api_slots(request):
 
     docente = get_object_or_404(PerfilDocente, pk=docente_id, activo=True)
 
-    slots = generar_slots(docente, fecha)  # datetimes aware
+    slots = slots_cacheados(docente, fecha)  # datetimes aware
     # Formato ISO local (America/Guayaquil)
     tz = timezone.get_current_timezone()
     data = [timezone.localtime(s, tz).strftime("%Y-%m-%d %H:%M") for s in slots]
@@ -33,3 +38,139 @@ def api_slots(request):
         "minutos_por_bloque": docente.minutos_por_bloque,
         "slots": data
     })
+
+
+MAX_DIAS_BUSQUEDA = 56
+MAX_RESULTADOS = 100
+MAX_DOCENTES_LOTE = 100
+
+
+def _error(mensaje):
+    return JsonResponse({"ok": False, "error": mensaje}, status=400)
+
+
+def _docentes_y_ventana(request, dias_defecto):
+    """
+    Parámetros comunes: departamento=<nombre> y/o docente_ids=1,2,3 ; desde, hasta (YYYY-MM-DD).
+    Devuelve (docentes, desde, hasta) o una JsonResponse de error.
+    """
+    departamento = (request.GET.get("departamento") or "").strip()
+    ids_str = (request.GET.get("docente_ids") or "").strip()
+
+    if not departamento and not ids_str:
+        return _error("Parámetros requeridos: departamento o docente_ids.")
+
+    try:
+        ids = [int(x) for x in ids_str.split(",") if x.strip()]
+    except ValueError:
+        return _error("docente_ids debe ser una lista de enteros separados por coma.")
+
+    hoy = timezone.localdate()
+    desde_str = request.GET.get("desde")
+    hasta_str = request.GET.get("hasta")
+    desde = parse_date(desde_str) if desde_str else hoy
+    if not desde:
+        return _error("Fecha 'desde' inválida. Use YYYY-MM-DD.")
+    hasta = parse_date(hasta_str) if hasta_str else desde + timedelta(days=dias_defecto - 1)
+    if not hasta or hasta < desde:
+        return _error("Fecha 'hasta' inválida. Use YYYY-MM-DD (≥ desde).")
+    if (hasta - desde).days >= MAX_DIAS_BUSQUEDA:
+        return _error(f"La ventana máxima es de {MAX_DIAS_BUSQUEDA} días.")
+
+    docentes = PerfilDocente.objects.filter(activo=True).select_related("usuario")
+    if departamento:
+        docentes = docentes.filter(departamento__iexact=departamento)
+    if ids:
+        docentes = docentes.filter(pk__in=ids)
+    return docentes, desde, hasta
+
+
+@login_required(login_url="login")
+@require_GET
+def api_slots_primeros(request):
+    """
+    Los N slots libres más tempranos entre varios docentes.
+    GET: departamento=<nombre> y/o docente_ids=1,2,3 ; desde, hasta (YYYY-MM-DD, opcionales) ; n
+    Por defecto: desde hoy, ventana de 4 semanas, 10 resultados.
+    """
+    parametros = _docentes_y_ventana(request, dias_defecto=28)
+    if isinstance(parametros, JsonResponse):
+        return parametros
+    docentes, desde, hasta = parametros
+
+    try:
+        n = min(int(request.GET.get("n") or 10), MAX_RESULTADOS)
+    except ValueError:
+        return _error("n debe ser un entero.")
+
+    tz = timezone.get_current_timezone()
+    data = []
+    for inicio, docente in buscar_primeros_slots(docentes, desde, hasta, n):
+        fin = inicio + timedelta(minutes=docente.minutos_por_bloque or 20)
+        data.append({
+            "docente_id": docente.id,
+            "docente": docente.usuario.get_full_name() or docente.usuario.username,
+            "inicio": timezone.localtime(inicio, tz).strftime("%Y-%m-%d %H:%M"),
+            "fin": timezone.localtime(fin, tz).strftime("%Y-%m-%d %H:%M"),
+        })
+
+    return JsonResponse({
+        "ok": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "slots": data,
+    })
+
+
+def _bitmap(minutos, bloque):
+    """Inicios -> base64 de un bit por bloque del día (bit k = inicio k*bloque, MSB primero)."""
+    bits = bytearray((MINUTOS_DIA // bloque + 7) // 8)
+    for m in minutos:
+        k = m // bloque
+        bits[k >> 3] |= 0x80 >> (k & 7)
+    return base64.b64encode(bytes(bits)).decode("ascii")
+
+
+@login_required(login_url="login")
+@require_GET
+def api_slots_lote(request):
+    """
+    Slots libres de varios docentes y días en una sola respuesta.
+    GET: departamento=<nombre> y/o docente_ids=1,2,3 ; desde, hasta (YYYY-MM-DD, opcionales; por defecto 7 días)
+         formato=offsets (defecto) | bitmap
+    Respuesta compacta por docente y día (los días sin slots se omiten):
+      - offsets: minutos desde la medianoche local de la fecha (zona 'tz'), p. ej. [480, 500, 520]
+      - bitmap: base64 con un bit por bloque de 'minutos_por_bloque' desde las 00:00
+    Lee SlotLibre (una consulta para todo el conjunto); fuera del horizonte
+    materializado usa el motor por lotes.
+    """
+    formato = request.GET.get("formato") or "offsets"
+    if formato not in ("offsets", "bitmap"):
+        return _error("formato debe ser 'offsets' o 'bitmap'.")
+
+    parametros = _docentes_y_ventana(request, dias_defecto=7)
+    if isinstance(parametros, JsonResponse):
+        return parametros
+    docentes, desde, hasta = parametros
+    docentes = list(docentes[:MAX_DOCENTES_LOTE + 1])
+    if len(docentes) > MAX_DOCENTES_LOTE:
+        return _error(f"Máximo {MAX_DOCENTES_LOTE} docentes por consulta.")
+
+    por_docente = obtener_minutos_docentes(docentes, desde, hasta)
+    data = {}
+    for d in docentes:
+        bloque = d.minutos_por_bloque or 20
+        dias = {}
+        for fecha, mins in por_docente.get(d.pk, {}).items():
+            if mins:
+                dias[fecha.isoformat()] = _bitmap(mins, bloque) if formato == "bitmap" else mins
+        data[str(d.pk)] = {"minutos_por_bloque": bloque, "dias": dias}
+
+    return JsonResponse({
+        "ok": True,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "tz": timezone.get_current_timezone_name(),
+        "formato": formato,
+        "docentes": data,
+    })
@@ -23,7 +23,7 @@ class UserAdmin(BaseUserAdmin):
     fieldsets = (
         (None, {"fields": ("email", "username", "password")}),  # username solo-lectura en el form (viene del modelo)
         ("Información personal", {"fields": ("cedula", "first_name", "last_name")}),
-        ("Rol y estado", {"fields": ("rol", "is_active", "is_staff", "is_superuser")}),
+        ("Rol y estado", {"fields": ("rol", "is_active", "is_staff", "is_superuser", "frecuencia_avisos")}),
         ("Permisos", {"fields": ("groups", "user_permissions")}),
         ("Cambiar contraseña", {"fields": ("password1", "password2")}),
     )
@@ -0,0 +1,23 @@
+# user/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class UsuarioConPerfilesBackend(ModelBackend):
+    """
+    ModelBackend que carga al usuario de la sesión junto con su rol y sus
+    perfiles (docente / representante) en una sola consulta. request.user
+    se resuelve una vez por request, así los decoradores de rol y las vistas
+    leen user.rol y user.perfil_docente sin volver a la base; un perfil que
+    no existe queda como tal (acceder lanza DoesNotExist sin consultar).
+    """
+
+    def get_user(self, user_id):
+        User = get_user_model()
+        try:
+            user = (User._default_manager
+                    .select_related("rol", "perfil_docente", "perfil_representante")
+                    .get(pk=user_id))
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
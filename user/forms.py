@@ -71,15 +71,22 @@ class LoginForm(AuthenticationForm):
 class PerfilUsuarioForm(forms.ModelForm):
     class Meta:
         model = User
-        fields = ["first_name", "last_name", "cedula", "email", "imgPerfil"]
+        fields = ["first_name", "last_name", "cedula", "email", "imgPerfil", "frecuencia_avisos"]
         widgets = {
             "first_name": forms.TextInput(attrs={"class":"form-control", "placeholder":"Nombres"}),
             "last_name": forms.TextInput(attrs={"class":"form-control", "placeholder":"Apellidos"}),
             "cedula": forms.TextInput(attrs={"class":"form-control", "readonly":"readonly"}),  # username
             "email": forms.EmailInput(attrs={"class":"form-control", "placeholder":"correo@dominio.com"}),
-            "imgPerfil": forms.FileInput(attrs={"class":"form-control"})
+            "imgPerfil": forms.FileInput(attrs={"class":"form-control"}),
+            "frecuencia_avisos": forms.Select(attrs={"class":"form-select"}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Solo los administradores reciben copia de cada reserva/cancelación
+        if getattr(self.instance.rol, "nombre", None) != "Administrador":
+            self.fields.pop("frecuencia_avisos")
+
     def clean_email(self):
         email = (self.cleaned_data.get("email") or "").strip().lower()
         return email or None
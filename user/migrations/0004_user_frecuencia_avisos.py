@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_user_cedula_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='frecuencia_avisos',
+            field=models.CharField(choices=[('INMEDIATA', 'Un correo por evento'), ('HORA', 'Resumen cada hora'), ('DIA', 'Resumen diario')], default='INMEDIATA', max_length=10),
+        ),
+    ]
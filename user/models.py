@@ -14,6 +14,11 @@ class Rol(models.Model):
     def __str__(self):
         return self.nombre
 
+class FrecuenciaAvisos(models.TextChoices):
+    INMEDIATA = "INMEDIATA", "Un correo por evento"
+    HORA = "HORA", "Resumen cada hora"
+    DIA = "DIA", "Resumen diario"
+
 class User(AbstractUser):
     cedula = models.CharField(
         max_length=20, unique=True, null=True, blank=True,
@@ -22,6 +27,10 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, null=True, blank=True)
     imgPerfil = models.ImageField(upload_to="users/", default="imageDefault.png")
     rol = models.ForeignKey("user.Rol", null=True, blank=True, on_delete=models.SET_NULL, related_name="usuarios")
+    # Copias de reservas/cancelaciones que recibe un Administrador (turnos/emailing.py)
+    frecuencia_avisos = models.CharField(
+        max_length=10, choices=FrecuenciaAvisos.choices, default=FrecuenciaAvisos.INMEDIATA
+    )
 
     def save(self, *args, **kwargs):
         # Normaliza
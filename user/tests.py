@@ -1,3 +1,86 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from turnos.models import PerfilDocente, PerfilRepresentante
+from .backends import UsuarioConPerfilesBackend
+from .models import Rol, User
+
+CACHE_LOCAL = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def crear_usuario(username, rol, **campos):
+    return User.objects.create_user(username=username, email=f"{username}@colegio.test", password="clave-segura-1",
+                                    rol=Rol.objects.get_or_create(nombre=rol)[0], **campos)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class UsuarioConPerfilesBackendTests(TestCase):
+    """El usuario de la sesión llega con su rol y perfiles en una sola consulta."""
+
+    def setUp(self):
+        self.backend = UsuarioConPerfilesBackend()
+        self.docente = crear_usuario("0100000001", "Docente")
+        PerfilDocente.objects.create(usuario=self.docente, departamento="Ciencias")
+
+    def test_rol_y_perfiles_sin_consultas_extra(self):
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.docente.pk)
+            self.assertEqual(user.rol.nombre, "Docente")
+            self.assertEqual(user.perfil_docente.departamento, "Ciencias")
+            # el perfil que no existe tampoco consulta
+            with self.assertRaises(PerfilRepresentante.DoesNotExist):
+                user.perfil_representante
+
+    def test_inactivo_o_inexistente(self):
+        self.assertIsNone(self.backend.get_user(0))
+        User.objects.filter(pk=self.docente.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.docente.pk))
+
+    def test_autentica_como_model_backend(self):
+        self.assertEqual(self.backend.authenticate(None, username="0100000001", password="clave-segura-1"),
+                         self.docente)
+        self.assertIsNone(self.backend.authenticate(None, username="0100000001", password="otra"))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class AltaDocenteTests(TestCase):
+    """Las vistas de docente usan el perfil precargado; solo docente_alta lo crea."""
+
+    def setUp(self):
+        self.usuario = crear_usuario("0100000002", "Docente")
+        self.client.force_login(self.usuario)
+
+    def test_sin_perfil_va_al_alta(self):
+        for nombre in ("dashboard_docente", "disp_list", "exc_list"):
+            r = self.client.get(reverse(nombre))
+            self.assertRedirects(r, reverse("docente_alta"), fetch_redirect_response=False)
+        self.assertFalse(PerfilDocente.objects.filter(usuario=self.usuario).exists())
+
+    def test_alta_crea_el_perfil_una_vez(self):
+        self.assertEqual(self.client.get(reverse("docente_alta")).status_code, 200)
+        self.assertFalse(PerfilDocente.objects.exists())
+        r = self.client.post(reverse("docente_alta"))
+        self.assertRedirects(r, reverse("dashboard_docente"), fetch_redirect_response=False)
+        perfil = PerfilDocente.objects.get(usuario=self.usuario)
+        self.assertEqual((perfil.minutos_por_bloque, perfil.activo), (20, True))
+        # con perfil, el alta redirige al panel sin crear otro
+        r = self.client.post(reverse("docente_alta"))
+        self.assertRedirects(r, reverse("dashboard_docente"), fetch_redirect_response=False)
+        self.assertEqual(PerfilDocente.objects.count(), 1)
+
+    def test_paginas_de_docente_no_escriben_ni_releen_el_perfil(self):
+        PerfilDocente.objects.create(usuario=self.usuario)
+        for nombre in ("dashboard_docente", "disp_list", "exc_list"):
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.client.get(reverse(nombre)).status_code, 200)
+            sql = [q["sql"] for q in consultas]
+            self.assertFalse([s for s in sql if s.startswith("INSERT")], nombre)
+            self.assertFalse([s for s in sql if 'FROM "user_rol"' in s or 'FROM "turnos_perfildocente"' in s], nombre)
+
+    def test_otro_rol_no_entra(self):
+        self.client.force_login(crear_usuario("0900000001", "Representante"))
+        self.assertRedirects(self.client.get(reverse("docente_alta")), reverse("mi_perfil"),
+                             fetch_redirect_response=False)
+        self.assertFalse(PerfilDocente.objects.exists())